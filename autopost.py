@@ -1,405 +1,234 @@
-﻿import requests
-import facebook
-import openai
-import asyncio
+﻿import asyncio
 import random
 import time
 import json
 import re
 import os
 import sys
-from spider import getnews, setn_fetch_url, fetch_news_preview
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired
-
-# ----------------- 載入設定（環境變數優先，若無則 fallback 到 config.json） -----------------
-def load_config():
-    # 環境變數
-    API_KEY = os.getenv("API_KEY")
-    FB_TOKEN = os.getenv("FB_TOKEN")
-    NEWS = os.getenv("NEWS")
-    MODE = os.getenv("MODE")
-    POST_DELAY_MIN = os.getenv("POST_DELAY_MIN")
-    POST_DELAY_MAX = os.getenv("POST_DELAY_MAX")
-    IG_USERNAME = os.getenv("IG_USERNAME")
-    IG_PASSWORD = os.getenv("IG_PASSWORD")
-    IG_SESSIONID = os.getenv("IG_SESSIONID")
-    IG_SETTINGS_PATH = os.getenv("IG_SETTINGS_PATH")
-    IG_SETTINGS_JSON = os.getenv("IG_SETTINGS_JSON")
-    IG_PROXY = os.getenv("IG_PROXY")
-    # Pre-upload / warmup controls
-    IG_PRE_UPLOAD_WAIT_ENABLED = os.getenv("IG_PRE_UPLOAD_WAIT_ENABLED")
-    IG_PRE_UPLOAD_WAIT_SECONDS = os.getenv("IG_PRE_UPLOAD_WAIT_SECONDS")
-    IG_PRE_UPLOAD_WAIT_MIN = os.getenv("IG_PRE_UPLOAD_WAIT_MIN")
-    IG_PRE_UPLOAD_WAIT_MAX = os.getenv("IG_PRE_UPLOAD_WAIT_MAX")
-    # 控制是否讀寫本地檔案（在 Railway/雲端部署時可設為 false）
-    USE_LOCAL_FILES = os.getenv("USE_LOCAL_FILES")
-    POST_TO_FACEBOOK = os.getenv("POST_TO_FACEBOOK")
-    POST_TO_INSTAGRAM = os.getenv("POST_TO_INSTAGRAM")
-
-    # 若至少有一個必要參數不存在，嘗試從 config.json 讀取（方便本地測試）
-    if not (API_KEY and FB_TOKEN and NEWS and MODE):
-        try:
-            with open("config.json", encoding="utf-8") as f:
-                data = json.load(f)
-            API_KEY = API_KEY or data.get("API_KEY")
-            FB_TOKEN = FB_TOKEN or data.get("FB_TOKEN")
-            NEWS = NEWS or data.get("NEWS")
-            MODE = MODE or data.get("MODE")
-            POST_DELAY_MIN = POST_DELAY_MIN or data.get("POST_DELAY_MIN")
-            POST_DELAY_MAX = POST_DELAY_MAX or data.get("POST_DELAY_MAX")
-            IG_USERNAME = IG_USERNAME or data.get("IG_USERNAME")
-            IG_PASSWORD = IG_PASSWORD or data.get("IG_PASSWORD")
-            # 這些可選項通常在雲端以環境變數提供，若存在於 config.json 也允許讀取
-            IG_SESSIONID = IG_SESSIONID or data.get("IG_SESSIONID")
-            IG_SETTINGS_PATH = IG_SETTINGS_PATH or data.get("IG_SETTINGS_PATH")
-            IG_SETTINGS_JSON = IG_SETTINGS_JSON or data.get("IG_SETTINGS_JSON")
-            IG_PROXY = IG_PROXY or data.get("IG_PROXY")
-            IG_PRE_UPLOAD_WAIT_ENABLED = IG_PRE_UPLOAD_WAIT_ENABLED if IG_PRE_UPLOAD_WAIT_ENABLED is not None else data.get("IG_PRE_UPLOAD_WAIT_ENABLED")
-            IG_PRE_UPLOAD_WAIT_SECONDS = IG_PRE_UPLOAD_WAIT_SECONDS or data.get("IG_PRE_UPLOAD_WAIT_SECONDS")
-            IG_PRE_UPLOAD_WAIT_MIN = IG_PRE_UPLOAD_WAIT_MIN or data.get("IG_PRE_UPLOAD_WAIT_MIN")
-            IG_PRE_UPLOAD_WAIT_MAX = IG_PRE_UPLOAD_WAIT_MAX or data.get("IG_PRE_UPLOAD_WAIT_MAX")
-            USE_LOCAL_FILES = USE_LOCAL_FILES if USE_LOCAL_FILES is not None else data.get("USE_LOCAL_FILES")
-            POST_TO_FACEBOOK = POST_TO_FACEBOOK if POST_TO_FACEBOOK is not None else data.get("POST_TO_FACEBOOK")
-            POST_TO_INSTAGRAM = POST_TO_INSTAGRAM if POST_TO_INSTAGRAM is not None else data.get("POST_TO_INSTAGRAM")
-        except FileNotFoundError:
-            # 沒有 config.json 也 OK，之後會檢查必要變數
-            pass
-
-    # 型別轉換與預設值
-    try:
-        POST_DELAY_MIN = int(POST_DELAY_MIN) if POST_DELAY_MIN is not None else 30 * 60
-    except ValueError:
-        POST_DELAY_MIN = 30 * 60
-
-    try:
-        POST_DELAY_MAX = int(POST_DELAY_MAX) if POST_DELAY_MAX is not None else 3 * 60 * 60
-    except ValueError:
-        POST_DELAY_MAX = 3 * 60 * 60
+import hashlib
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import cached_property
+import llm_client
+import batch_generation
+from generation_cache import GenerationCache, generation_key
+from compaction import ArticleCompactor, estimate_tokens
+from seen_store import SeenStore
+from near_dup import NearDuplicateIndex
+from post_queue import PostQueue
+from job_queue import JobQueue
+from scheduler import Scheduler
+import config as config_module
+from image_output import EncodedImage, ScratchDir, encode_jpeg
+from publisher import Post, Publisher
+# 以下平台套件與重量級元件在第一次用到時才匯入（見 App）：
+# facebook、instagrapi、ig_session、image_renderer (Pillow)、spider (aiohttp)、openai (llm_client)
+
+class App:
+    """
+    執行期間共用的設定、平台客戶端與元件，全部在第一次用到時才讀取、匯入與初始化：
+    manual 模式沒有要發文就不會登入 IG，停用的平台不會匯入它的套件，
+    text 模式不會載入爬蟲，OpenAI SDK 在第一次生成時才匯入（見 llm_client）
+    """
 
-    MODE = MODE or "setn"
-    
-    # 轉換布林值
-    if isinstance(POST_TO_FACEBOOK, str):
-        POST_TO_FACEBOOK = POST_TO_FACEBOOK.lower() in ['true', '1', 'yes']
-    if isinstance(POST_TO_INSTAGRAM, str):
-        POST_TO_INSTAGRAM = POST_TO_INSTAGRAM.lower() in ['true', '1', 'yes']
-    # 轉換 IG_PRE_UPLOAD_WAIT_ENABLED
-    if isinstance(IG_PRE_UPLOAD_WAIT_ENABLED, str):
-        IG_PRE_UPLOAD_WAIT_ENABLED = IG_PRE_UPLOAD_WAIT_ENABLED.lower() in ['true', '1', 'yes']
+    def __init__(self, config=None):
+        self._config = config
+        self._graph = None
+        self._ig_session = None
+        self._ig_login_failed = False
+
+    # ---------- 設定 ----------
+    @property
+    def config(self):
+        """目前的 Config（環境變數優先，未設定的欄位從 config.json 補）"""
+        if self._config is None:
+            self._config = config_module.load_config()
+            for warning in self._config.warnings:
+                print(f"⚠️ 設定：{warning}")
+            # OpenAI 共用連線（第一次生成時才建立）
+            llm_client.configure(
+                api_key=self._config.api_key,
+                timeout=self._config.openai_timeout,
+                max_retries=self._config.openai_max_retries,
+            )
+        return self._config
+
+    def check_config(self):
+        """檢查必要變數，缺少時結束程式"""
+        missing = self.config.missing()
+        if missing:
+            print("錯誤：缺少必要環境變數或 config.json 欄位：", ", ".join(missing))
+            print("請在 Railway 的 Environment Variables 中設定，或放入本機 config.json。")
+            sys.exit(1)
+
+    def reload_config(self):
+        """
+        config.json 變更後重新讀取：只套用發文間隔與平台開關，
+        其他元件（含已登入的 IG session）保持不變
+        Returns:
+            {欄位: 新值}
+        """
+        config, changes, ignored = config_module.reload_config(self.config)
+        if ignored:
+            print(f"ℹ️ 以下設定需要重新啟動才會生效：{', '.join(name.upper() for name in ignored)}")
+        if changes:
+            self._config = config
+            print("🔄 已套用新設定：" + "、".join(f"{name.upper()}={value}" for name, value in changes.items()))
+        return changes
+
+    async def watch_config(self, scheduler=None):
+        """CONFIG_WATCH=true 時監看 config.json；發文間隔改變時重新排時段"""
+        if not self.config.config_watch:
+            return
 
-    try:
-        IG_PRE_UPLOAD_WAIT_SECONDS = int(IG_PRE_UPLOAD_WAIT_SECONDS) if IG_PRE_UPLOAD_WAIT_SECONDS is not None else None
-    except ValueError:
-        IG_PRE_UPLOAD_WAIT_SECONDS = None
+        def _apply():
+            changes = self.reload_config()
+            if scheduler is not None and ({"post_delay_min", "post_delay_max"} & set(changes)):
+                scheduler.replan()
+
+        print(f"👀 監看 {config_module.CONFIG_PATH}，每 {self.config.config_watch_seconds:g} 秒檢查一次")
+        watcher = config_module.ConfigWatcher(interval=self.config.config_watch_seconds)
+        await watcher.watch(_apply)
+
+    # ---------- 平台與元件 ----------
+    @cached_property
+    def generation_cache(self):
+        # 生成結果快取：同一篇新聞重試或重跑時不再重複呼叫 OpenAI
+        return GenerationCache(
+            path=os.path.join("downloads", "generation_cache") if self.config.use_local_files else None,
+            max_age=self.config.generation_cache_ttl_hours * 3600,
+            enabled=self.config.generation_cache,
+        )
 
-    try:
-        IG_PRE_UPLOAD_WAIT_MIN = int(IG_PRE_UPLOAD_WAIT_MIN) if IG_PRE_UPLOAD_WAIT_MIN is not None else 5 * 60
-    except ValueError:
-        IG_PRE_UPLOAD_WAIT_MIN = 5 * 60
+    @cached_property
+    def compactor(self):
+        # 文章壓縮：去除版型文字與重複段落，控制送進 OpenAI 的 token 數
+        return ArticleCompactor(budget=self.config.prompt_token_budget)
+
+    @property
+    def graph(self):
+        """Facebook Graph API；未啟用 FB 時為 None（之後啟用時才建立）"""
+        if not self.config.post_to_facebook:
+            return None
+        if self._graph is None:
+            import facebook
+
+            self._graph = facebook.GraphAPI(access_token=self.config.fb_token)
+        return self._graph
+
+    @property
+    def ig_session(self):
+        """
+        登入後的 IGSession（優先使用既有 session / settings 以降低雲端登入驗證）；
+        未啟用 IG 或登入失敗時為 None。第一次存取會呼叫 IG，請在 ig_executor 中存取。
+        停用後再啟用 IG 時沿用同一個已登入的 session。
+        """
+        if not (self.config.post_to_instagram and self.config.ig_username):
+            return None
+        if self._ig_session is None and not self._ig_login_failed:
+            self._ig_session = self._login_instagram()
+            self._ig_login_failed = self._ig_session is None
+        return self._ig_session
+
+    def _login_instagram(self):
+        config = self.config
+        try:
+            from instagrapi import Client
+            from ig_session import IGSession
 
-    try:
-        IG_PRE_UPLOAD_WAIT_MAX = int(IG_PRE_UPLOAD_WAIT_MAX) if IG_PRE_UPLOAD_WAIT_MAX is not None else 15 * 60
-    except ValueError:
-        IG_PRE_UPLOAD_WAIT_MAX = 15 * 60
-
-    # 轉換 USE_LOCAL_FILES
-    if isinstance(USE_LOCAL_FILES, str):
-        USE_LOCAL_FILES = USE_LOCAL_FILES.lower() in ['true', '1', 'yes']
-    if USE_LOCAL_FILES is None:
-        USE_LOCAL_FILES = True
-    
-    # 預設值
-    POST_TO_FACEBOOK = POST_TO_FACEBOOK if POST_TO_FACEBOOK is not None else True
-    POST_TO_INSTAGRAM = POST_TO_INSTAGRAM if POST_TO_INSTAGRAM is not None else False
-
-    return (
-        API_KEY,
-        FB_TOKEN,
-        NEWS,
-        MODE,
-        POST_DELAY_MIN,
-        POST_DELAY_MAX,
-        IG_USERNAME,
-        IG_PASSWORD,
-        IG_SESSIONID,
-        IG_SETTINGS_PATH,
-        IG_SETTINGS_JSON,
-        IG_PROXY,
-        POST_TO_FACEBOOK,
-        POST_TO_INSTAGRAM,
-        IG_PRE_UPLOAD_WAIT_ENABLED,
-        IG_PRE_UPLOAD_WAIT_SECONDS,
-        IG_PRE_UPLOAD_WAIT_MIN,
-        IG_PRE_UPLOAD_WAIT_MAX,
-        USE_LOCAL_FILES,
-    )
+            c = Client()
 
-API_KEY, FB_TOKEN, NEWS, MODE, POST_DELAY_MIN, POST_DELAY_MAX, IG_USERNAME, IG_PASSWORD, IG_SESSIONID, IG_SETTINGS_PATH, IG_SETTINGS_JSON, IG_PROXY, POST_TO_FACEBOOK, POST_TO_INSTAGRAM, IG_PRE_UPLOAD_WAIT_ENABLED, IG_PRE_UPLOAD_WAIT_SECONDS, IG_PRE_UPLOAD_WAIT_MIN, IG_PRE_UPLOAD_WAIT_MAX, USE_LOCAL_FILES = load_config()
-
-# 檢查必要變數
-missing = []
-if not API_KEY:
-    missing.append("API_KEY")
-if not FB_TOKEN:
-    missing.append("FB_TOKEN")
-if not NEWS:
-    missing.append("NEWS")
-if missing:
-    print("錯誤：缺少必要環境變數或 config.json 欄位：", ", ".join(missing))
-    print("請在 Railway 的 Environment Variables 中設定，或放入本機 config.json。")
-    sys.exit(1)
-
-# init FB graph
-if POST_TO_FACEBOOK:
-    graph = facebook.GraphAPI(access_token=FB_TOKEN)
-else:
-    graph = None
-
-# init Instagram client（優先使用既有 session / settings 以降低雲端登入驗證）
-ig_client = None
-if POST_TO_INSTAGRAM and IG_USERNAME:
-    try:
-        c = Client()
-
-        # 設定 Proxy（可選）
-        if IG_PROXY:
-            try:
-                c.set_proxy(IG_PROXY)
-                print("🔌 已設定 IG Proxy")
-            except Exception as e:
-                print(f"⚠️ 設定 Proxy 失敗: {e}")
-
-        # 既有設定檔的儲存位置（預設到 downloads/ 方便持久化）
-        settings_dump_path = IG_SETTINGS_PATH or os.path.join("downloads", "instagrapi_settings.json")
-        try:
-            os.makedirs(os.path.dirname(settings_dump_path), exist_ok=True)
-        except Exception:
-            pass
-
-        # 1) 先嘗試使用 sessionid 直接登入（最穩定）
-        if not ig_client and IG_SESSIONID:
-            try:
-                c.login_by_sessionid(IG_SESSIONID)
-                ig_client = c
-                print("✅ Instagram 透過 sessionid 登入成功")
+            # 設定 Proxy（可選）
+            if config.ig_proxy:
                 try:
-                    c.dump_settings(settings_dump_path)
+                    c.set_proxy(config.ig_proxy)
+                    print("🔌 已設定 IG Proxy")
                 except Exception as e:
-                    print(f"⚠️ 儲存 IG 設定失敗: {e}")
-            except Exception as e:
-                print(f"⚠️ sessionid 登入失敗: {e}")
-
-        # 2) 若未登入，嘗試載入既有 settings（JSON 或檔案路徑）
-        if not ig_client:
-            settings_loaded = False
-            if IG_SETTINGS_JSON:
-                try:
-                    # Railway 環境變數可能有單引號包裹或轉義問題，先清理
-                    cleaned_json = IG_SETTINGS_JSON.strip()
-                    # 移除可能的外層單引號
-                    if cleaned_json.startswith("'") and cleaned_json.endswith("'"):
-                        cleaned_json = cleaned_json[1:-1]
-                    # 嘗試解析
-                    settings = json.loads(cleaned_json)
-                    c.set_settings(settings)
-                    settings_loaded = True
-                    print("✅ 已載入 IG 設定 (JSON)")
-                except json.JSONDecodeError as e:
-                    print(f"⚠️ IG_SETTINGS_JSON 格式錯誤: {e}")
-                    print(f"提示：請確認 Railway 變數中的 JSON 格式正確，建議改用 IG_SESSIONID")
-                except Exception as e:
-                    print(f"⚠️ 載入 IG 設定(JSON)失敗: {e}")
-            elif settings_dump_path and os.path.exists(settings_dump_path):
-                try:
-                    c.load_settings(settings_dump_path)
-                    settings_loaded = True
-                    print(f"✅ 已載入 IG 設定檔: {settings_dump_path}")
-                except Exception as e:
-                    print(f"⚠️ 載入 IG 設定檔失敗: {e}")
+                    print(f"⚠️ 設定 Proxy 失敗: {e}")
+
+            # 登入狀態管理：settings 在載入設定時已解析，驗證結果在 TTL 內重用
+            # 既有設定檔的儲存位置（預設到 downloads/ 方便持久化）
+            session = IGSession(
+                c,
+                username=config.ig_username,
+                password=config.ig_password,
+                sessionid=config.ig_sessionid,
+                settings=config.ig_settings,
+                settings_path=config.ig_settings_path,
+                use_local_files=config.use_local_files or bool(config.ig_settings_path),
+                ttl=config.ig_session_ttl_minutes * 60,
+            )
+            return session if session.login() else None
+        except Exception as e:
+            print(f"⚠️ 初始化 Instagram 客戶端失敗: {e}")
+            return None
+
+    @property
+    def ig_client(self):
+        session = self.ig_session
+        return session.client if session is not None else None
+
+    @cached_property
+    def ig_executor(self):
+        # instagrapi 是同步阻塞的：所有 IG 呼叫都排進這個專用的單執行緒 executor，
+        # 不佔用事件迴圈，也不會有兩個執行緒同時操作同一個 ig_client
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="instagrapi")
+
+    @cached_property
+    def renderer(self):
+        # 圖片繪製器：字體與 LOGO/頁尾圖層只載入一次，每篇只畫標題
+        from image_renderer import ImageRenderer
+
+        return ImageRenderer()
+
+    @cached_property
+    def scratch(self):
+        # instagrapi 上傳只接受檔案路徑：上傳當下才寫入暫存目錄（上次中斷留下的檔案在 main() 啟動時清掉）
+        return ScratchDir(
+            os.path.join("downloads", "scratch") if self.config.use_local_files else os.path.join(tempfile.gettempdir(), "fb-ybot-scratch")
+        )
 
-            # 3) 使用帳密登入（若提供），重用已載入的裝置指紋與設定以降低挑戰機率
-            if IG_PASSWORD:
-                try:
-                    c.login(IG_USERNAME, IG_PASSWORD)
-                    ig_client = c
-                    print("✅ Instagram 登入成功")
-                    try:
-                        c.dump_settings(settings_dump_path)
-                        print(f"✅ 已儲存 IG 設定至: {settings_dump_path}")
-                        
-                        # 提取 sessionid 供後續使用
-                        try:
-                            settings = c.get_settings()
-                            sessionid = settings.get("authorization_data", {}).get("sessionid")
-                            if sessionid:
-                                print(f"\n💡 建議：將以下 sessionid 設定到 Railway 的 IG_SESSIONID 變數：")
-                                print(f"   {sessionid}\n")
-                        except Exception:
-                            pass
-                    except Exception as e:
-                        print(f"⚠️ 儲存 IG 設定失敗: {e}")
-                except Exception as e:
-                    print(f"⚠️ Instagram 登入失敗: {e}")
-                    print("建議解決方案：")
-                    print("1. 在本機完成登入後，從 downloads/instagrapi_settings.json 取得 sessionid")
-                    print("2. 在 Railway 設定 IG_SESSIONID 變數（而非完整 JSON）")
-                    print("3. 若持續失敗，設定 IG_PROXY 使用代理伺服器")
-                    ig_client = None
-            else:
-                print("⚠️ 未提供 IG_PASSWORD，無法進行帳密登入")
-                print("建議：在 Railway 設定 IG_SESSIONID 或 IG_SETTINGS_JSON")
+    @cached_property
+    def publisher(self):
+        # 每個平台一個獨立的 worker 與佇列：同一篇同時發到各平台，IG 等待或重試不會拖住 FB
+        # 兩個平台都註冊，每篇只派送給當下啟用的平台（平台開關可熱重載）
+        publisher = Publisher()
+        publisher.register("Facebook", _facebook_handler, timeout=self.config.fb_publish_timeout)
+        publisher.register("Instagram", _instagram_handler, timeout=self.config.ig_publish_timeout)
+        return publisher
 
-    except Exception as e:
-        print(f"⚠️ 初始化 Instagram 客戶端失敗: {e}")
-        ig_client = None
+app = App()
+
+def compact_article(article):
+    """回傳壓縮後的文章內文；壓縮後沒有內容時退回原文"""
+    text = app.compactor.compact(article.paragraphs, url=article.url) or article.text
+    print(f"✂️ 文章 {estimate_tokens(article.text)} → {estimate_tokens(text)} tokens")
+    return text
 
 # 驗證並確保 IG 已登入（避免 403 login_required）
 def ensure_ig_authenticated() -> bool:
     """
-    檢查並確保 ig_client 處於已登入狀態；必要時重試登入。
+    確保 ig_client 處於已登入狀態：TTL 內不打 API，過期時驗證一次，必要時重新登入。
+    第一次呼叫時才匯入 instagrapi 並登入（在 ig_executor 中執行）。
     回傳 True 表示可進行上傳；False 表示登入維持失敗。
     """
-    global ig_client
-    if not POST_TO_INSTAGRAM or not ig_client:
+    if not app.config.post_to_instagram:
         return False
-
-    def _is_logged_in() -> bool:
-        """以輕量方式驗證登入：優先使用私有 API (`account_info`)，避免 public lookup 導致 429。
-        如果 `IG_USERNAME` 看起來像 email (包含 '@')，則不要用 username 做 public 查詢。"""
-        try:
-            # 優先使用 account_info()（私有 API，依賴已登入 session）
-            try:
-                ig_client.account_info()
-                return True
-            except LoginRequired:
-                return False
-            except Exception:
-                # 若 account_info 不可用，退回到檢查 sessionid
-                pass
-
-            # 避免以 email 做 public lookup，這會觸發 /web_profile_info 與 429
-            if IG_USERNAME and "@" not in IG_USERNAME:
-                try:
-                    ig_client.user_info_by_username(IG_USERNAME)
-                    return True
-                except LoginRequired:
-                    return False
-                except Exception:
-                    # public lookup 失敗則回傳 False（但不要 raise，讓上層處理）
-                    return False
-
-            # 最後以 sessionid 作為弱驗證
-            return bool(getattr(ig_client, "sessionid", None))
-        except Exception:
-            return False
-
-    try:
-        # 先嘗試現況
-        if _is_logged_in():
-            return True
-
-        # 嘗試載入 settings（僅接受 instagrapi 產生過的結構，避免異常 key 如 pinned_channels_info）
-        try:
-            # 優先 JSON 變數
-            if IG_SETTINGS_JSON:
-                cleaned_json = IG_SETTINGS_JSON.strip()
-                if cleaned_json.startswith("'") and cleaned_json.endswith("'"):
-                    cleaned_json = cleaned_json[1:-1]
-                settings = json.loads(cleaned_json)
-                if isinstance(settings, dict) and (
-                    "authorization_data" in settings and "device_settings" in settings
-                ):
-                    ig_client.set_settings(settings)
-                else:
-                    # 不是 instagrapi 的設定格式就忽略
-                    pass
-            else:
-                # 只有在允許讀寫本地檔案時，才嘗試從磁碟載入 settings
-                if USE_LOCAL_FILES:
-                    settings_path = IG_SETTINGS_PATH or os.path.join("downloads", "instagrapi_settings.json")
-                    if os.path.exists(settings_path):
-                        ig_client.load_settings(settings_path)
-        except Exception:
-            # 設定載入失敗不影響後續登入嘗試
-            pass
-
-        # 以 sessionid 重新登入（環境變數或從 settings 中提取）
-        sessionid = None
-        if IG_SESSIONID:
-            sessionid = IG_SESSIONID
-        else:
-            # 從 JSON 設定或檔案提取 sessionid
-            try:
-                if IG_SETTINGS_JSON:
-                    sj = json.loads(IG_SETTINGS_JSON.strip().strip("'"))
-                    sessionid = sj.get("authorization_data", {}).get("sessionid")
-                if not sessionid:
-                    settings_path = IG_SETTINGS_PATH or os.path.join("downloads", "instagrapi_settings.json")
-                    if os.path.exists(settings_path):
-                        with open(settings_path, "r", encoding="utf-8") as f:
-                            s = json.load(f)
-                        sessionid = s.get("authorization_data", {}).get("sessionid")
-            except Exception:
-                sessionid = None
-
-        if sessionid:
-            try:
-                ig_client.login_by_sessionid(sessionid)
-                if _is_logged_in():
-                    return True
-            except Exception as e:
-                # 更精確地處理 429 / MaxRetryError 類型錯誤，避免大量重試
-                msg = str(e)
-                if "429" in msg or "too many 429" in msg or "MaxRetryError" in msg:
-                    print(f"⚠️ public requests 被速率限制 (429)：{e}")
-                    return False
-                print(f"⚠️ 透過 sessionid 重新登入失敗: {e}")
-
-        # 帳密登入（若提供）
-        if IG_USERNAME and IG_PASSWORD:
-            try:
-                ig_client.login(IG_USERNAME, IG_PASSWORD)
-                if _is_logged_in():
-                    # 成功後儲存設定並提示 sessionid
-                    try:
-                        settings_dump_path = os.path.join("downloads", "instagrapi_settings.json")
-                        os.makedirs(os.path.dirname(settings_dump_path), exist_ok=True)
-                        ig_client.dump_settings(settings_dump_path)
-                        # 顯示 sessionid 便於雲端使用
-                        try:
-                            settings = ig_client.get_settings()
-                            sid = settings.get("authorization_data", {}).get("sessionid")
-                            if sid:
-                                print("\n💡 建議：將以下 sessionid 設定到 Railway 的 IG_SESSIONID 變數：")
-                                print(f"   {sid}\n")
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
-                    return True
-            except Exception as e:
-                # 如果是 public request 的 retry 錯誤，提示並回傳 False
-                msg = str(e)
-                if "429" in msg or "too many 429" in msg or "MaxRetryError" in msg:
-                    print(f"⚠️ public requests 被速率限制 (429)：{e}")
-                    return False
-                print(f"❌ 帳密登入失敗: {e}")
-                return False
-
-        print("⚠️ 無法驗證 IG 登入狀態（缺少可用的 sessionid 或密碼）")
+    session = app.ig_session
+    if session is None:
         return False
+    try:
+        return session.ensure()
     except Exception as e:
         print(f"⚠️ 檢查 IG 登入狀態失敗: {e}")
         return False
 
 # 延遲時間
 def compute_delay():
-    _min = float(POST_DELAY_MIN)
-    _max = float(POST_DELAY_MAX)
-    if _min > _max:
-        _min, _max = _max, _min
-    return random.uniform(_min, _max)
+    # 已在載入設定時驗證 最短 <= 最長
+    return random.uniform(*app.config.delay_range)
 
 # GPT Prompt
 # prompt = """
@@ -407,200 +236,167 @@ def compute_delay():
 # 請使用繁體中文且吸引人，輸出僅包含內文，不要標題、盡可能簡短明瞭不超過50字。
 # """
 
-prompt_with_title = """
-你是一名專業的醫師，根據新聞內容生成社群媒體貼文，內容須像與民眾對話的感覺。
+# 標題、內文、標籤一次生成：同一篇新聞只送一次、只等一次回應
+prompt_post = """
+你是一名專業的醫師，也是社群媒體專家，根據新聞內容生成社群媒體貼文。
 請用繁體中文生成以下內容：
-1. 短標題：吸引觀眾的精簡標題，10-15字以內，適合放在圖片上
-2. 內文：像在跟民眾對話的感覺，簡短明瞭不超過50字
+1. title（短標題）：吸引觀眾的精簡標題，10-15字以內，適合放在圖片上
+2. text（內文）：像在跟民眾對話的感覺，簡短明瞭不超過50字
+3. hashtags（標籤）：5-10 個與新聞主題相關、具搜尋熱度的繁體中文標籤，每個以 # 開頭
 
-請按照以下格式輸出：
-標題：[你的短標題]
-內文：[你的內文]
+只輸出 JSON，格式為：
+{"title": "短標題", "text": "內文", "hashtags": ["#標籤1", "#標籤2"]}
 """
 
-async def text_api(msg: str) -> str:
-    """呼叫 OpenAI 生成內文，回傳內文文字（string）。"""
-    if not msg:
-        return ""
+POST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "text": {"type": "string"},
+        "hashtags": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "text", "hashtags"],
+    "additionalProperties": False,
+}
+
+DEFAULT_HASHTAGS = "#新聞 #健康 #醫療"
+POST_MODEL = "gpt-4o"
+POST_PARAMS = {"temperature": 1.0, "max_tokens": 500}
+
+def _post_response_formats():
+    """第一次用 structured outputs（json_schema），備援重試改用 json_object"""
+    yield {"type": "json_schema", "json_schema": {"name": "social_post", "strict": True, "schema": POST_SCHEMA}}
+    yield {"type": "json_object"}
+
+def validate_post(data):
+    """檢查模型輸出是否符合 POST_SCHEMA，回傳整理後的 dict；不符合時拋出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("輸出不是 JSON 物件")
+    title = data.get("title")
+    text = data.get("text")
+    tags = data.get("hashtags")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("缺少 title")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("缺少 text")
+    if isinstance(tags, str):
+        tags = tags.split()
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise ValueError("hashtags 必須是字串陣列")
+    # 確保每個標籤都有 #、去掉空白與重複
+    cleaned = []
+    for tag in tags:
+        tag = tag.strip().replace(" ", "")
+        if not tag:
+            continue
+        if not tag.startswith("#"):
+            tag = "#" + tag
+        if tag not in cleaned:
+            cleaned.append(tag)
+    return {
+        "title": title.strip(),
+        "text": text.strip(),
+        "hashtags": " ".join(cleaned) or DEFAULT_HASHTAGS,
+    }
+
+def _fallback_post():
+    text = "生成失敗"
+    return {"title": text, "text": text, "hashtags": DEFAULT_HASHTAGS}
+
+def _post_request(msg, response_format):
+    """chat.completions 的請求內容（即時生成與 Batch API 共用）"""
+    return {
+        "model": POST_MODEL,
+        "messages": [
+            {"role": "system", "content": prompt_post},
+            {"role": "user", "content": msg}
+        ],
+        "response_format": response_format,
+        **POST_PARAMS,
+    }
+
+def article_source(article):
+    """
+    生成快取的輸入：網址 + 原始內文的雜湊
+    壓縮後的內文會隨 ArticleCompactor 累積的樣板紀錄改變（重啟後又不同），不適合當快取鍵
+    """
+    return "article:" + hashlib.sha256(f"{article.url}\n{article.text}".encode("utf-8")).hexdigest()
 
-    def _call():
-        try:
-            client = openai.OpenAI(api_key=API_KEY)
-            result = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": prompt_with_title},
-                    {"role": "user", "content": msg}
-                ],
-                temperature=1.0,
-                max_tokens=300
-            )
+def _post_cache_key(msg, source=None):
+    return generation_key(POST_MODEL, prompt_post, {**POST_PARAMS, "schema": POST_SCHEMA}, source or msg)
 
-            # 支援不同回傳格式
-            try:
-                content = result.choices[0].message.content.strip()
-            except Exception:
-                # fallback: 可能為 dict 形式
-                if isinstance(result, dict) and "choices" in result and len(result["choices"])>0:
-                    ch = result["choices"][0]
-                    if isinstance(ch, dict) and "message" in ch and "content" in ch["message"]:
-                        content = ch["message"]["content"].strip()
-                    else:
-                        return "生成失敗"
-                else:
-                    return "生成失敗"
-
-            # 解析標題和內文（如有），回傳內文為主
-            lines = content.split('\n')
-            title = ""
-            text = ""
-            for line in lines:
-                if line.startswith("標題：") or line.startswith("標題:"):
-                    title = line.replace("標題：", "").replace("標題:", "").strip()
-                elif line.startswith("內文：") or line.startswith("內文:"):
-                    text = line.replace("內文：", "").replace("內文:", "").strip()
-
-            if not text:
-                parts = content.split('\n', 1)
-                if len(parts) == 2:
-                    text = parts[1].strip()
-                else:
-                    text = content.strip()
-
-            return text
-        except Exception as e:
-            print("GPT 發生錯誤:", e)
-            return "生成失敗"
+async def generate_post(msg: str, use_cache: bool = True, source: str = None, fallback: bool = True) -> dict:
+    """呼叫 OpenAI 一次生成短標題、內文與標籤
 
-    return await asyncio.to_thread(_call)
+    Args:
+        use_cache: False 時不讀取也不寫入生成快取（需要每次不同的內容時使用）
+        source: 快取鍵的輸入（新聞請傳 article_source(article)）；None 時以 msg 本身為鍵
+        fallback: False 時失敗改為拋出 RuntimeError（工作佇列據此稍後重試，不會把預設文字發出去）
 
-async def generate_hashtags(news_content: str) -> str:
-    """根據新聞內容生成相關標籤"""
-    if not news_content:
-        return "#新聞 #健康 #醫療"
-    
-    def _call():
+    Returns:
+        {"title": str, "text": str, "hashtags": str}；兩次嘗試都失敗時回傳 "生成失敗" 與預設標籤
+    """
+    if not msg:
+        if not fallback:
+            raise RuntimeError("沒有可生成的內容")
+        return _fallback_post()
+
+    cache_key = _post_cache_key(msg, source)
+    if use_cache:
+        cached = app.generation_cache.get(cache_key)
+        if cached is not None:
+            print(f"♻️ 使用快取的生成結果（{app.generation_cache.stats()}）")
+            return cached
+
+    for attempt, response_format in enumerate(_post_response_formats(), start=1):
         try:
-            client = openai.OpenAI(api_key=API_KEY)
-            result = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": """你是一個社群媒體專家。
-根據新聞內容生成相關的繁體中文標籤。
-標籤應該：
-1. 與新聞主題相關
-2. 具有搜尋熱度
-3. 每個標籤前面加 #
-4. 用空格分隔
-5. 數量不限，但建議 5-10 個
-
-只輸出標籤，不要其他解釋。"""},
-                    {"role": "user", "content": f"新聞內容：{news_content}"}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-            hashtags = result.choices[0].message.content.strip()
-            # 確保每個標籤都有 #
-            if not hashtags.startswith("#"):
-                hashtags = "#" + hashtags
-            return hashtags
+            result = await llm_client.chat_completion(**_post_request(msg, response_format))
+            content = result.choices[0].message.content
+            post = validate_post(json.loads(content or ""))
+            if use_cache:
+                app.generation_cache.put(cache_key, post)
+            return post
         except Exception as e:
-            print(f"生成標籤錯誤: {e}")
-            return "#新聞 #健康 #醫療"
-    
-    return await asyncio.to_thread(_call)
+            print(f"GPT 發生錯誤（第 {attempt} 次，{response_format['type']}）: {e}")
+            error = e
+    if not fallback:
+        raise RuntimeError(f"生成失敗：{error}")
+    return _fallback_post()
+
+async def text_api(msg: str) -> str:
+    """呼叫 OpenAI 生成內文，回傳內文文字（string）。"""
+    if not msg:
+        return ""
+    # 純文字模式每次都用同一個主題，走快取會一直發同一篇
+    return (await generate_post(msg, use_cache=False))["text"]
 
 # ================= 發文 ===================
 def post_to_facebook(text):
-    if not POST_TO_FACEBOOK or not graph:
-        return
+    """純文字發文；回傳是否成功"""
+    if not app.config.post_to_facebook or not app.graph:
+        return False
     try:
-        graph.put_object(parent_object='me', connection_name='feed', message=text)
+        app.graph.put_object(parent_object='me', connection_name='feed', message=text)
         print("✅ 已發布到 Facebook")
+        return True
     except Exception as e:
         print("❌ Facebook 發文錯誤:", e)
+        return False
 
-def get_chinese_font(size):
-    """取得繁體中文字體，支援 Windows、Mac、Linux/Railway
-    優先使用系統字體，若無則自動下載 Noto Sans TC
-    """
-    # 常見系統字體路徑（Railway Aptfile 安裝後的路徑在前）
-    font_paths = [
-        # Railway/Ubuntu 透過 Aptfile 安裝的 Noto CJK
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/noto-cjk/NotoSansTC-Regular.otf",
-        "/usr/share/fonts/truetype/noto/NotoSansTC-Regular.ttf",
-        # Windows
-        "C:/Windows/Fonts/msjh.ttc",      # 微軟正黑體
-        "C:/Windows/Fonts/kaiu.ttf",       # 標楷體
-        "C:/Windows/Fonts/mingliu.ttc",    # 細明體
-        # Mac
-        "/System/Library/Fonts/PingFang.ttc",  # Mac 蘋方體
-        # 專案內建字體
-        "fonts/NotoSansTC-Regular.ttf",
-        "fonts/NotoSansTC-Regular.otf",
-    ]
-    
-    # 嘗試系統字體
-    for font_path in font_paths:
-        try:
-            from PIL import ImageFont
-            font = ImageFont.truetype(font_path, size)
-            return font
-        except:
-            continue
-    
-    # Railway/Linux 環境：下載 Noto Sans TC（多重備援）
-    try:
-        import urllib.request
-        fonts_dir = "fonts"
-        os.makedirs(fonts_dir, exist_ok=True)
-        font_file = os.path.join(fonts_dir, "NotoSansTC-Regular.ttf")
-        
-        if not os.path.exists(font_file):
-            print("⬇️ 下載繁體中文字體 Noto Sans TC...")
-            
-            # 多重下載來源（按優先順序嘗試）
-            font_urls = [
-                # Google Fonts CDN (最穩定)
-                "https://raw.githubusercontent.com/google/fonts/main/ofl/notosanstc/NotoSansTC%5Bwght%5D.ttf",
-                # GitHub Noto CJK 倉庫
-                "https://github.com/notofonts/noto-cjk/raw/main/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
-                # jsDelivr CDN 備援
-                "https://cdn.jsdelivr.net/gh/notofonts/noto-cjk/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
-            ]
-            
-            downloaded = False
-            for url in font_urls:
-                try:
-                    print(f"  嘗試來源: {url[:50]}...")
-                    urllib.request.urlretrieve(url, font_file)
-                    # 驗證檔案大小（避免下載到錯誤頁面）
-                    if os.path.getsize(font_file) > 100000:  # 至少 100KB
-                        print(f"✅ 字體已下載至: {font_file}")
-                        downloaded = True
-                        break
-                    else:
-                        os.remove(font_file)
-                except Exception as e:
-                    print(f"  ⚠️ 此來源失敗: {e}")
-                    if os.path.exists(font_file):
-                        os.remove(font_file)
-                    continue
-            
-            if not downloaded:
-                raise Exception("所有字體下載來源均失敗")
-        
-        from PIL import ImageFont
-        return ImageFont.truetype(font_file, size)
-    except Exception as e:
-        print(f"⚠️ 無法載入中文字體: {e}")
-        print("建議：請在 Railway 手動設定 apt buildpack 安裝 fonts-noto-cjk")
-        from PIL import ImageFont
-        return ImageFont.load_default()
+def _upload_photo(encoded, caption):
+    with app.scratch.spill(encoded.data, suffix=".jpg") as image_path:
+        app.ig_client.photo_upload(image_path, caption)
 
-def post_to_instagram(text, image_title=None, news_url=None, hashtags=None):
+async def ig_call(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.ig_executor, functools.partial(func, *args, **kwargs))
+
+def _render_ig_image(title_text):
+    # 隨機淺色背景、頂部 LOGO、置中標題、底部提示；直接編碼成記憶體中的 JPEG（上傳前才寫成暫存檔）
+    img = app.renderer.render(title_text)
+    return encode_jpeg(img, quality=app.config.ig_jpeg_quality, subsampling=app.config.ig_jpeg_subsampling, optimize=app.config.ig_jpeg_optimize)
+
+async def post_to_instagram(text, image_title=None, news_url=None, hashtags=None, image=None):
     """發布貼文到 Instagram，生成隨機淺色背景圖片，標題置中，底部提示查看連結
     
     Args:
@@ -608,140 +404,27 @@ def post_to_instagram(text, image_title=None, news_url=None, hashtags=None):
         image_title: 圖片上顯示的短標題（如果沒有提供，則從 text 中提取）
         news_url: 新聞連結（如果 text 已包含則不再添加）
         hashtags: 自動生成的標籤
+        image: 已繪製好的圖片（EncodedImage），None 表示在這裡繪製
+    Returns:
+        是否發布成功
     """
-    if not POST_TO_INSTAGRAM or not ig_client:
-        return
+    if not app.config.post_to_instagram:
+        return False
     try:
-        # 上傳前先確認登入狀態，避免 403 login_required
-        if not ensure_ig_authenticated():
+        # 上傳前先確認登入狀態，避免 403 login_required（第一次發文時才登入）
+        if not await ig_call(ensure_ig_authenticated):
             print("❌ IG 未登入，跳過 Instagram 發文")
-            return
-        from PIL import Image, ImageDraw, ImageFont
-        import tempfile
-        
-        # 生成隨機淺色背景 (RGB 值範圍 200-255)
-        bg_r = random.randint(200, 255)
-        bg_g = random.randint(200, 255)
-        bg_b = random.randint(200, 255)
-        bg_color = (bg_r, bg_g, bg_b)
-        
-        # 創建圖片
-        img = Image.new('RGB', (1080, 1080), color=bg_color)
-        d = ImageDraw.Draw(img)
-        
-        # 載入繁體中文字體（跨平台支援）
-        font_title = get_chinese_font(85)
-        font_footer = get_chinese_font(40)
-        font_logo = get_chinese_font(50)
-        
-        # 繪製頂部 LOGO 文字
-        logo_text = "陳醫師談"
-        text_color = (40, 40, 40)  # 深灰色文字
-        
-        try:
-            bbox = d.textbbox((0, 0), logo_text, font=font_logo)
-            logo_width = bbox[2] - bbox[0]
-        except:
-            logo_width = len(logo_text) * 25
-        
-        logo_x = (1080 - logo_width) // 2
-        logo_y = 40
-        d.text((logo_x, logo_y), logo_text, fill=text_color, font=font_logo)
-        
+            return False
         # 使用短標題或從 text 中提取
         if image_title:
             title_text = image_title
         else:
             title_text = text.replace("🔗 新聞全文：", "").split("http")[0].strip()
-        
-        # 標題文字智慧換行處理：優先在標點符號（，、：、；）處換行
-        # 每行最多15個字（考慮 85px 大字體）
-        lines = []
-        current_line = ""
-        punctuation_marks = ["，", "：", "；", ",", ":", ";"]
-        remove_before_break = ["，", "、", ","]
-
-        i = 0
-        while i < len(title_text):
-            char = title_text[i]
-
-            # 遇到換行符
-            if char == '\n':
-                if current_line:
-                    # 換行前刪除指定標點
-                    if current_line and current_line[-1] in remove_before_break:
-                        current_line = current_line[:-1]
-                    lines.append(current_line)
-                current_line = ""
-                i += 1
-                continue
-
-            current_line += char
-
-            # 優先在標點符號處換行
-            if char in punctuation_marks:
-                # 換行前刪除指定標點
-                if current_line and current_line[-1] in remove_before_break:
-                    current_line = current_line[:-1]
-                lines.append(current_line)
-                current_line = ""
-                i += 1
-                continue
-
-            # 如果行長達到限制則換行
-            if len(current_line) >= 13:
-                # 換行前刪除指定標點
-                if current_line and current_line[-1] in remove_before_break:
-                    current_line = current_line[:-1]
-                lines.append(current_line)
-                current_line = ""
 
-            i += 1
+        # 繪圖與編碼是 CPU 工作，放到一般執行緒，不排在 IG 上傳後面
+        encoded = image or await asyncio.to_thread(_render_ig_image, title_text)
+        print(f"🖼️ 圖片 {encoded.summary()}")
 
-        # 添加剩餘文字
-        if current_line:
-            # 換行前刪除指定標點
-            if current_line and current_line[-1] in remove_before_break:
-                current_line = current_line[:-1]
-            lines.append(current_line)
-
-        
-        # 計算總高度以垂直置中（考慮頂部 LOGO 和更大字體）
-        line_height = 100  # 增加行間距以適應更大的字體
-        total_height = len(lines) * line_height
-        # 將標題往下移，給 LOGO 留出空間
-        start_y = (1080 - total_height) // 2 - 50
-        
-        # 繪製標題文字 (置中對齊)
-        for i, line in enumerate(lines[:8]):  # 最多8行
-            # 計算文字寬度以水平置中
-            try:
-                bbox = d.textbbox((0, 0), line.strip(), font=font_title)
-                text_width = bbox[2] - bbox[0]
-            except:
-                text_width = len(line.strip()) * 30
-            
-            x = (1080 - text_width) // 2
-            y = start_y + i * line_height
-            d.text((x, y), line.strip(), fill=text_color, font=font_title)
-        
-        # 底部提示文字
-        footer_text = "查看文章底下連結了解更多"
-        try:
-            bbox = d.textbbox((0, 0), footer_text, font=font_footer)
-            footer_width = bbox[2] - bbox[0]
-        except:
-            footer_width = len(footer_text) * 20
-        
-        footer_x = (1080 - footer_width) // 2
-        footer_y = 950
-        d.text((footer_x, footer_y), footer_text, fill=text_color, font=font_footer)
-        
-        # 保存臨時圖片
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            img.save(tmp.name, "JPEG", quality=95)
-            tmp_path = tmp.name
-        
         # 準備 Instagram 貼文內容
         # 如果 text 已經包含連結，則不再添加
         caption = text
@@ -753,210 +436,496 @@ def post_to_instagram(text, image_title=None, news_url=None, hashtags=None):
             caption = f"{caption}\n\n#新聞 #健康 #醫療"
         
         # 發布到 Instagram
-        # 1) 上傳前先確保 session 有效並做暖機/模擬讀取行為
-        try:
-            if not ensure_ig_authenticated():
-                print("⚠️ IG 未驗證，跳過 Instagram 發文")
+        # 等待（可由環境變數控制）：若被設定為禁用，則跳過等待
+        if app.config.ig_pre_upload_wait_enabled is False:
+            print("⚡ IG_PRE_UPLOAD_WAIT_ENABLED=false，跳過上傳前等待")
+        else:
+            if app.config.ig_pre_upload_wait_seconds:
+                wait_seconds = int(app.config.ig_pre_upload_wait_seconds)
             else:
-                # 暖機：使用私有 API 做最小檢查，避免觸發 public GraphQL（會導致 KeyError）
-                try:
-                    print("🔎 發文前執行 pre-upload 檢查: account_info() ...", end="", flush=True)
-                    ig_client.account_info()
-                    print(" ✅")
-                except Exception as e:
-                    # 不要打印完整堆棧，只記錄摘要
-                    error_msg = str(e)[:80]
-                    print(f" ⚠️ (account_info 失敗: {error_msg})")
-
-                # 等待（可由環境變數控制）：若被設定為禁用，則跳過等待
-                if IG_PRE_UPLOAD_WAIT_ENABLED is False:
-                    print("⚡ IG_PRE_UPLOAD_WAIT_ENABLED=false，跳過上傳前等待")
-                else:
-                    if IG_PRE_UPLOAD_WAIT_SECONDS:
-                        wait_seconds = int(IG_PRE_UPLOAD_WAIT_SECONDS)
-                    else:
-                        wait_seconds = random.randint(int(IG_PRE_UPLOAD_WAIT_MIN), int(IG_PRE_UPLOAD_WAIT_MAX))
-                    # 若等待時間過長（在測試或 CI），可快速通過
-                    if wait_seconds > 600 and os.getenv("CI"):
-                        wait_seconds = 10
-                    print(f"⏳ 上傳前等待 {wait_seconds} 秒（由 IG_PRE_UPLOAD_WAIT_* 控制）以暖機與模擬人類行為...")
-                    for _ in range(0, wait_seconds, 10):
-                        time.sleep(10)
-
-                # 嘗試上傳，並針對常見挑戰做明確處理
-                try:
-                    ig_client.photo_upload(tmp_path, caption)
-                    print("✅ 已發布到 Instagram")
-                except Exception as e:
-                    msg = str(e)
-                    # 檢查是否是挑戰或驗證型錯誤
-                    if "challenge_required" in msg or "challenge" in msg or (hasattr(e, 'response') and getattr(e.response, 'status_code', None) == 412):
-                        print(f"❌ Instagram 發文被拒（challenge_required / 412）：{msg}")
-                        print("建議：在手機/桌面版 Instagram 完成挑戰驗證，或使用本機重新登入取得新的 sessionid。跳過此次發文。")
-                    elif "login_required" in msg or "LoginRequired" in msg:
-                        print("⚠️ 上傳遭到 login_required，嘗試重新登入後重試一次...")
-                        if ensure_ig_authenticated():
-                            try:
-                                ig_client.photo_upload(tmp_path, caption)
-                                print("✅ 重新登入後已發布到 Instagram")
-                            except Exception as e2:
-                                print(f"❌ 第二次上傳失敗: {e2}")
-                        else:
-                            print("❌ 重新登入失敗，跳過 Instagram 發文")
-                    else:
-                        print(f"❌ Instagram 發文錯誤: {e}")
-        except Exception as e:
-            print(f"❌ 發文前準備或上傳流程發生錯誤: {e}")
-        
-        # 刪除臨時文件
+                wait_seconds = random.randint(int(app.config.ig_pre_upload_wait_min), int(app.config.ig_pre_upload_wait_max))
+            # 若等待時間過長（在測試或 CI），可快速通過
+            if wait_seconds > 600 and os.getenv("CI"):
+                wait_seconds = 10
+            print(f"⏳ 上傳前等待 {wait_seconds} 秒（由 IG_PRE_UPLOAD_WAIT_* 控制）以模擬人類行為...")
+            # 非阻塞等待：期間爬蟲與生成可以繼續進行
+            await asyncio.sleep(wait_seconds)
+
+        # 嘗試上傳：收到 LoginRequired 時 ig_session 會重新登入並重試一次
         try:
-            os.remove(tmp_path)
-        except:
-            pass
-            
+            await ig_call(app.ig_session.call, _upload_photo, encoded, caption)
+            print("✅ 已發布到 Instagram")
+            return True
+        except Exception as e:
+            from instagrapi.exceptions import LoginRequired
+
+            msg = str(e)
+            if isinstance(e, LoginRequired):
+                print("❌ 重新登入失敗，跳過 Instagram 發文")
+            # 檢查是否是挑戰或驗證型錯誤
+            elif "challenge_required" in msg or "challenge" in msg or (hasattr(e, 'response') and getattr(e.response, 'status_code', None) == 412):
+                print(f"❌ Instagram 發文被拒（challenge_required / 412）：{msg}")
+                print("建議：在手機/桌面版 Instagram 完成挑戰驗證，或使用本機重新登入取得新的 sessionid。跳過此次發文。")
+            else:
+                if "login_required" in msg:
+                    app.ig_session.invalidate()
+                print(f"❌ Instagram 發文錯誤: {e}")
+
     except Exception as e:
         print(f"❌ Instagram 發文錯誤: {e}")
+    return False
 
 def post_to_facebook_with_link(text: str, news_url: str):
     """
     使用 Graph API 的 feed endpoint 加上 link 參數，讓 FB 嘗試自動產生連結預覽（og:image）
-    如果失敗則退回純文字+連結。
+    如果失敗則退回純文字+連結。回傳是否成功。
     """
-    if not POST_TO_FACEBOOK or not graph:
-        return
+    if not app.config.post_to_facebook or not app.graph:
+        return False
     try:
-        graph.put_object(
+        app.graph.put_object(
             parent_object='me',
             connection_name='feed',
             message=text,
             link=news_url
         )
         print("✅ 已發布新聞卡片貼文（含縮圖＋連結）")
+        return True
     except Exception as e:
         print("⚠️ FB 無法產生預覽卡片或發文失敗，改用純文字發文:", e)
-        post_to_facebook(f"{text}\n\n🔗 {news_url}")
+        return post_to_facebook(f"{text}\n\n🔗 {news_url}")
+
+async def _facebook_handler(post):
+    # facebook-sdk 是同步阻塞的（含失敗後的純文字重試），放到執行緒，不擋住 IG 與事件迴圈
+    if post.news_url:
+        return await asyncio.to_thread(post_to_facebook_with_link, post.text, post.news_url)
+    return await asyncio.to_thread(post_to_facebook, post.text)
 
-def post_to_all_platforms(text, image_title=None, news_url=None, hashtags=None):
-    """發布到所有啟用的平台
+async def _instagram_handler(post):
+    return await post_to_instagram(post.text, post.image_title, post.news_url, post.hashtags, image=post.image)
+
+async def post_to_all_platforms(text, image_title=None, news_url=None, hashtags=None, image=None):
+    """同時發布到所有啟用的平台
     
     Args:
         text: 貼文內文
         image_title: Instagram 圖片上顯示的短標題
         news_url: 新聞連結
         hashtags: Instagram 使用的標籤
+        image: 預先繪製好的 Instagram 圖片
+    Returns:
+        {平台名稱: PublishResult}
     """
-    if POST_TO_FACEBOOK:
-        if news_url:
-            post_to_facebook_with_link(text, news_url)
-        else:
-            post_to_facebook(text)
-    
-    if POST_TO_INSTAGRAM:
-        post_to_instagram(text, image_title, news_url, hashtags)
+    return await app.publisher.publish(
+        Post(text, image_title=image_title, news_url=news_url, hashtags=hashtags, image=image),
+        platforms=app.config.platforms,
+    )
 
 # ================== 三種模式 =================
 async def text_auto_post():
     """純文字模式：根據醫療主題生成內容並發布"""
+    scheduler = open_scheduler()
+    await asyncio.gather(_text_post_loop(scheduler), app.watch_config(scheduler))
+
+async def _text_post_loop(scheduler):
     while True:
+        slot = scheduler.next_slot()
+        print(f"🗓️ 下次發文時段: {slot.describe()}")
+        await scheduler.wait_for_prep()
         # 生成醫療相關內容
+        started = time.monotonic()
         topic = "請生成一則關於健康或醫療的簡短建議"
         content = await text_api(topic)
+        scheduler.observe_prep(time.monotonic() - started)
         print("\n生成內容:", content)
-        post_to_all_platforms(content)
-        delay = compute_delay()
-        print(f"⏱ 下次發文: {delay:.1f} 秒後")
-        await asyncio.sleep(delay)
+        await scheduler.wait_for_slot()
+        _record_slot(scheduler)
+        await post_to_all_platforms(content)
+
+def open_seen_store():
+    """已發文網址索引；USE_LOCAL_FILES=false 時只存在記憶體"""
+    if not app.config.use_local_files:
+        return SeenStore(path=None, ttl=app.config.seen_ttl_days * 86400)
+    seen = SeenStore(path=os.path.join("downloads", "seen_urls.log"), ttl=app.config.seen_ttl_days * 86400)
+    # 匯入舊版 cache.txt 記錄的最後一篇
+    try:
+        with open("cache.txt", "r", encoding="utf-8") as f:
+            legacy_url = f.read().strip()
+        if legacy_url and legacy_url not in seen:
+            seen.add(legacy_url)
+    except OSError:
+        pass
+    return seen
+
+def open_near_dup_index():
+    """近似重複新聞指紋索引；NEAR_DUP_THRESHOLD<=0 時停用"""
+    if app.config.near_dup_threshold <= 0:
+        return None
+    path = os.path.join("downloads", "near_dups.log") if app.config.use_local_files else None
+    return NearDuplicateIndex(path=path, threshold=app.config.near_dup_threshold, window=app.config.near_dup_window_hours * 3600)
+
+def open_scheduler(jobs=None):
+    """發文時段規劃；有工作佇列時以最近兩天的發文紀錄計算每日上限與第一個時段"""
+    history = jobs.completed_since(time.time() - 2 * 86400) if jobs is not None else ()
+    return Scheduler(
+        delay=compute_delay,
+        quiet_hours=app.config.quiet_hours,
+        max_per_day=app.config.max_posts_per_day,
+        lead_time=app.config.schedule_lead_minutes * 60,
+        history=history,
+    )
+
+def _record_slot(scheduler, at=None):
+    """記錄發文時間與預定時段的落差（at 為開始發文的時間，預設為現在）"""
+    drift = scheduler.record_post(at)
+    stats = scheduler.drift_stats()
+    print(f"🎯 時段落差 {drift:+.0f} 秒（最近 {stats['count']} 篇平均 {stats['mean']:+.0f} 秒，最大 {stats['max']:+.0f} 秒）")
+
+def open_job_queue():
+    """分段處理的工作佇列；USE_LOCAL_FILES=false 時只存在記憶體"""
+    path = os.path.join("downloads", "jobs.sqlite3") if app.config.use_local_files else None
+    jobs = JobQueue(path=path)
+    jobs.prune()
+    resumed = jobs.recover()
+    if resumed:
+        print(f"♻️ 從上次中斷處繼續 {resumed} 則新聞：{jobs.counts()}")
+    return jobs
+
+def open_post_queue():
+    """預先生成的貼文佇列；USE_LOCAL_FILES=false 時只存在記憶體"""
+    path = os.path.join("downloads", "post_queue.json") if app.config.use_local_files else None
+    return PostQueue(path=path)
+
+async def batch_pregenerate(spider_client, post_queue, near_dups=None):
+    """批次模式：收集各來源待發的健康新聞，以 Batch API 一次生成文案並排入佇列"""
+    from spider import NEWS_SOURCES, fetch_article, fetch_listing_candidates
+
+    seen = spider_client.seen
+    results = await asyncio.gather(
+        *(fetch_listing_candidates(source, client=spider_client, limit=app.config.batch_size) for source in NEWS_SOURCES),
+        return_exceptions=True,
+    )
+    per_source = [r for r in results if isinstance(r, list)]
+    # 各來源輪流取一則，避免整批都來自同一家
+    candidates = []
+    for group in _round_robin(per_source):
+        for candidate in group:
+            if len(candidates) < app.config.batch_size and candidate.url not in post_queue:
+                candidates.append(candidate)
+    if not candidates:
+        print("📭 沒有需要預先生成的新聞")
+        return 0
+
+    articles = await asyncio.gather(
+        *(fetch_article(c.url, client=spider_client) for c in candidates), return_exceptions=True
+    )
+    requests_by_id = {}
+    pending = {}
+    queued = 0
+    for candidate, article in zip(candidates, articles):
+        if isinstance(article, Exception) or not article.ok:
+            print(f"⚠️ 無法獲取文章，略過：{candidate.url}")
+            continue
+        news_text = compact_article(article)
+        if near_dups is not None:
+            dup = near_dups.find_duplicate(news_text)
+            if dup:
+                print(f"🧬 與已發新聞內容相似 ({dup[1]:.0%})：{dup[0]}，跳過")
+                seen.add(candidate.url)
+                continue
+        source = article_source(article)
+        cached = app.generation_cache.get(_post_cache_key(news_text, source))
+        if cached is not None:
+            queued += post_queue.push(candidate.url, cached["title"], cached["text"], cached["hashtags"], news_text)
+            continue
+        custom_id = hashlib.sha1(candidate.url.encode("utf-8")).hexdigest()
+        requests_by_id[custom_id] = _post_request(news_text, next(_post_response_formats()))
+        pending[custom_id] = (candidate.url, news_text, source)
+
+    results = await batch_generation.run_batch(requests_by_id, poll_interval=app.config.batch_poll_seconds)
+    for custom_id, (content, error) in results.items():
+        news_url, news_text, source = pending[custom_id]
+        try:
+            if error:
+                raise ValueError(error)
+            post = validate_post(json.loads(content or ""))
+        except Exception as e:
+            # 失敗的文章留給發文迴圈即時生成
+            print(f"⚠️ 批次生成失敗：{news_url}（{e}）")
+            continue
+        app.generation_cache.put(_post_cache_key(news_text, source), post)
+        queued += post_queue.push(news_url, post["title"], post["text"], post["hashtags"], news_text)
+
+    print(f"📬 已排入 {queued} 篇貼文，佇列共 {len(post_queue)} 篇")
+    return queued
+
+def _round_robin(groups):
+    """[[a1, a2], [b1]] -> [a1, b1], [a2]"""
+    for i in range(max((len(g) for g in groups), default=0)):
+        yield [g[i] for g in groups if i < len(g)]
+
+async def batch_auto_post():
+    from spider import create_spider_client
+
+    cache_path = os.path.join("downloads", "http_cache") if app.config.use_local_files else None
+    post_queue = open_post_queue()
+    async with create_spider_client(cache_path=cache_path, seen=open_seen_store()) as spider_client:
+        near_dups = open_near_dup_index()
+        if app.config.use_local_files:
+            await batch_pregenerate(spider_client, post_queue, near_dups)
+            return
+        # 佇列無法保存到檔案，在同一個行程內同時發文：批次完成前發文迴圈照常即時生成，
+        # 批次結果一回來就排入佇列，之後的時段優先使用
+        print("💡 USE_LOCAL_FILES=false：佇列只在記憶體，批次生成的同時進入發文迴圈")
+        await asyncio.gather(
+            batch_pregenerate(spider_client, post_queue, near_dups),
+            run_pipeline(app.config.news, spider_client, open_job_queue(), near_dups, post_queue),
+        )
 
 async def setn_auto_post(url):
-    first = True
+    from spider import create_spider_client
+
+    # 整個執行期間共用一個爬蟲連線池，每輪都重用已建立的 keep-alive 連線
+    # 列表頁的條件式請求快取：允許寫本地檔案時保存到 downloads/，重啟後仍可用 304
+    cache_path = os.path.join("downloads", "http_cache") if app.config.use_local_files else None
+    seen = open_seen_store()
+    async with create_spider_client(cache_path=cache_path, stream_listings=app.config.spider_stream, seen=seen) as spider_client:
+        await run_pipeline(url, spider_client, open_job_queue(), open_near_dup_index(), open_post_queue())
+
+# 沒有新的新聞時，多久再檢查一次列表頁（秒）
+DISCOVER_INTERVAL = 5 * 60
+# 各階段 worker 沒有工作時的輪詢間隔（秒）
+STAGE_POLL_SECONDS = 2
+
+def _find_dup(near_dups, news_url, text):
+    """與已發新聞比對（忽略同一網址自己，例如發文失敗後重試）"""
+    if near_dups is None or not text:
+        return None
+    dup = near_dups.find_duplicate(text)
+    if dup and dup[0] == news_url:
+        return None
+    if dup:
+        print(f"🧬 與已發新聞內容相似 ({dup[1]:.0%})：{dup[0]}，跳過")
+    return dup
+
+# 各則新聞開始準備的時間（用來估計準備耗時，調整提前量）
+_prep_started = {}
+
+async def _discover(url, spider_client, jobs, scheduler, post_queue=None):
+    """discover：替下一個還沒有內容的時段找新聞；提前 lead time 開始，處理中的新聞夠多時先暫停"""
+    from spider import setn_fetch_url
+
+    seen = spider_client.seen
     while True:
-        news_url = await setn_fetch_url(url)
-        if not news_url:
-            print("抓取新聞失敗，30秒後重試")
+        pending = jobs.unpublished()
+        if pending >= app.config.pipeline_lookahead:
             await asyncio.sleep(30)
             continue
+        # 前 pending 個時段已有內容在準備，等到下一個時段的準備時間
+        if scheduler.prep_time(pending) > time.time():
+            await asyncio.sleep(min(60, scheduler.prep_time(pending) - time.time()))
+            continue
+        spider_client.new_cycle()
+
+        # 批次模式預先生成好的貼文直接進入繪圖階段，不必等待 OpenAI
+        queued = post_queue.pop(skip=lambda u: u in seen or u in jobs) if post_queue is not None else None
+        if queued:
+            print(f"\n📬 佇列中的貼文：{queued['title']}")
+            _prep_started[queued["url"]] = time.monotonic()
+            jobs.add(queued["url"], stage="render", payload={
+                "article_text": queued.get("article_text"),
+                "title": queued["title"],
+                "text": queued["text"],
+                "hashtags": queued["hashtags"],
+            })
+            continue
 
-        if not first:
-            try:
-                with open("cache.txt", "r", encoding="utf-8") as f:
-                    cached = f.read().strip()
-            except:
-                cached = ""
-
-            if cached == news_url:
-                print("新聞重複，跳過")
-                await asyncio.sleep(compute_delay())
-                continue
+        # 已在佇列中的新聞（含處理失敗放棄的）直接略過，改挑列表上的下一則
+        news_url = await setn_fetch_url(url, client=spider_client, skip=jobs.__contains__)
+        if not news_url:
+            print(f"沒有可發的新聞（或抓取失敗），{DISCOVER_INTERVAL // 60} 分鐘後再檢查")
+            await asyncio.sleep(DISCOVER_INTERVAL)
+            continue
+        print(f"\n📰 新的新聞：{news_url}")
+        _prep_started[news_url] = time.monotonic()
+        jobs.add(news_url)
+
+async def _extract(job, spider_client, jobs, near_dups):
+    from spider import fetch_article
+
+    # 抓文章內容（單次下載與解析，內文、縮圖與中繼資料一次取得）
+    article = await fetch_article(job.url, client=spider_client)
+    if not article.ok:
+        raise RuntimeError(f"無法獲取網頁內容，狀態碼：{article.status}")
+    news_text = compact_article(article)
+    # 其他媒體的同一則新聞已發過：在呼叫 OpenAI 之前就擋下
+    if _find_dup(near_dups, job.url, news_text):
+        spider_client.seen.add(job.url)
+        jobs.skip(job, "近似重複")
+        return
+    jobs.checkpoint(job, "generate", {"article_text": news_text, "source": article_source(article)})
+
+async def _generate(job, jobs):
+    # GPT 一次生成短標題、貼文文字與標籤
+    # 生成失敗時拋出例外，由 _stage_worker 交給 jobs.retry 退避重試，而不是發出「生成失敗」
+    post = await generate_post(job.payload["article_text"], source=job.payload.get("source"), fallback=False)
+    print(f"\n生成標題: {post['title']}")
+    print(f"生成內容: {post['text']}")
+    print(f"生成標籤: {post['hashtags']}")
+    jobs.checkpoint(job, "render", post)
+
+async def _render(job, jobs, scheduler):
+    # 只有發 IG 時才需要圖片；繪圖與編碼放到執行緒
+    image = None
+    meta = {}
+    if app.config.post_to_instagram:
+        encoded = await asyncio.to_thread(_render_ig_image, job.payload["title"])
+        image = encoded.data
+        # 圖片存成 BLOB，尺寸與編碼耗時放在 payload，發文時還原 EncodedImage
+        meta = {"image_width": encoded.width, "image_height": encoded.height, "image_elapsed": encoded.elapsed}
+    jobs.checkpoint(job, "publish", meta, image=image)
+    started = _prep_started.pop(job.url, None)
+    if started is not None:
+        scheduler.observe_prep(time.monotonic() - started)
+
+async def _publish(job, jobs, seen, near_dups):
+    """
+    發布到所有啟用的平台；完成後才記錄為已發（失敗而重試或放棄的不算）
+    Returns:
+        是否至少一個平台成功（或逾時而結果未知，可能已發出）
+    """
+    post = job.payload
+    news_url = job.url
+    # 內文已包含連結，不需要再添加
+    final_msg = f"{post['text']}\n\n🔗 新聞連結：{news_url}"
+    image = None
+    if job.image:
+        # 舊版佇列的工作沒有圖片資訊時，以繪製器的尺寸代替
+        image = EncodedImage(
+            job.image,
+            post.get("image_width") or app.renderer.size,
+            post.get("image_height") or app.renderer.size,
+            elapsed=post.get("image_elapsed", 0.0),
+        )
 
-        # 抓文章內容
-        news = await getnews(news_url)
+    try:
+        # 發布到所有啟用的平台（圖片使用短標題）
+        results = await post_to_all_platforms(
+            final_msg, image_title=post["title"], news_url=news_url, hashtags=post["hashtags"], image=image
+        )
+    except Exception as e:
+        jobs.retry(job, e)
+        return False
+    summary = "、".join(r.summary() for r in results.values())
+    if results and not any(r.ok or r.unknown for r in results.values()):
+        # 所有平台都確定失敗才重試；部分成功或逾時（可能已發出）時不重發，避免重複貼文
+        jobs.retry(job, summary)
+        return False
 
-        # GPT 生成短標題和貼文文字（使用 text_api）
-        text = await text_api(" ".join(news))
-        # 若 text 包含 "標題：" 前綴，則提取之作為 title
-        if text.startswith("標題："):
-            parts = text.split("\n", 1)
-            title = parts[0].replace("標題：", "").strip()
-            text = parts[1].strip() if len(parts) > 1 else text
-        else:
-            # 否則取前 15 字作為標題，剩餘為內文
-            title = text[:15] + "..." if len(text) > 15 else text
-        print(f"\n生成標題: {title}")
-        print(f"生成內容: {text}")
-        
-        # 生成相關標籤
-        hashtags = await generate_hashtags(" ".join(news))
-        print(f"生成標籤: {hashtags}")
-        
-        # 內文已包含連結，不需要再添加
-        final_msg = f"{text}\n\n🔗 新聞連結：{news_url}"
+    jobs.complete(job, summary)
+    seen.add(news_url)
+    if near_dups is not None and post.get("article_text"):
+        near_dups.add(news_url, post["article_text"])
+    return True
 
-        # 發布到所有啟用的平台（圖片使用短標題）
-        post_to_all_platforms(final_msg, image_title=title, news_url=news_url, hashtags=hashtags)
+async def _stage_worker(stage, jobs, handler):
+    """單一階段的 worker：取出工作 → 執行 → checkpoint；失敗只重試這一階段"""
+    while True:
+        job = jobs.claim(stage)
+        if job is None:
+            await asyncio.sleep(STAGE_POLL_SECONDS)
+            continue
+        try:
+            await handler(job)
+        except Exception as e:
+            will_retry = jobs.retry(job, e)
+            print(f"⚠️ [{stage}] {job.url} 失敗：{e}" + ("，稍後重試" if will_retry else "，放棄"))
 
-        with open("cache.txt", "w", encoding="utf-8") as f:
-            f.write(news_url)
+async def _publish_worker(jobs, seen, near_dups, scheduler):
+    """publish：在排定的時段發文，一個時段一則；等待期間其他階段持續準備下一則"""
+    announced = None
+    while True:
+        slot = scheduler.next_slot()
+        if slot is not announced:
+            print(f"🗓️ 下次發文時段: {slot.describe()}（待處理：{jobs.counts()}）")
+            announced = slot
+        await scheduler.wait_for_slot()
+        job = jobs.claim("publish")
+        if job is None:
+            await asyncio.sleep(STAGE_POLL_SECONDS)
+            continue
+        # 同時在處理的兩則可能是同一事件：發文前再比對一次
+        if _find_dup(near_dups, job.url, job.payload.get("article_text")):
+            seen.add(job.url)
+            jobs.skip(job, "近似重複")
+            continue
+        # IG 上傳前的等待期間其他階段仍持續準備下一則；發文失敗時不消耗時段，由下一則補上
+        started = time.time()
+        if await _publish(job, jobs, seen, near_dups):
+            _record_slot(scheduler, at=started)
 
-        first = False
-        delay = compute_delay()
-        print(f"⏱ 下次檢查: {delay:.1f} 秒後")
-        await asyncio.sleep(delay)
+async def run_pipeline(url, spider_client, jobs, near_dups=None, post_queue=None):
+    """
+    分段處理：discover → extract → generate → render → publish，各階段是獨立的 worker，
+    每段的產出都寫入 jobs，重啟後從中斷的階段繼續；發文時間由 scheduler 事先排定
+    """
+    seen = spider_client.seen
+    scheduler = open_scheduler(jobs)
+    await asyncio.gather(
+        _discover(url, spider_client, jobs, scheduler, post_queue),
+        _stage_worker("extract", jobs, lambda job: _extract(job, spider_client, jobs, near_dups)),
+        _stage_worker("generate", jobs, lambda job: _generate(job, jobs)),
+        _stage_worker("render", jobs, lambda job: _render(job, jobs, scheduler)),
+        _publish_worker(jobs, seen, near_dups, scheduler),
+        app.watch_config(scheduler),
+    )
 
 async def manual():
-    msg = input("輸入主題或網址：")
-    if re.match(r'https?://', msg):
-        news = await getnews(msg)
-        title, content = await text_api_with_title(" ".join(news))
-        print(f"\n生成標題: {title}")
-        print(f"生成內容: {content}")
-        
-        # 生成標籤
-        hashtags = await generate_hashtags(" ".join(news))
-        print(f"生成標籤: {hashtags}")
-        
-        content = f"{content}\n\n🔗 新聞連結：{msg}"
-        news_url = msg
-    else:
-        title, content = await text_api_with_title(msg)
-        print(f"\n生成標題: {title}")
-        print(f"生成內容: {content}")
-        
-        # 生成標籤
-        hashtags = await generate_hashtags(msg)
-        print(f"生成標籤: {hashtags}")
-        
-        news_url = None
-        
-    if input("要發佈嗎？(y/n): ").lower() == "y":
-        post_to_all_platforms(content, image_title=title, news_url=news_url)
-    await manual()
+    """手動模式：輸入主題或網址，確認後發布；爬蟲連線在第一次輸入網址時才建立，整個模式共用並在結束時關閉"""
+    async with AsyncExitStack() as stack:
+        spider_client = None
+        while True:
+            msg = input("輸入主題或網址：")
+            if re.match(r'https?://', msg):
+                from spider import create_spider_client, fetch_article
+
+                if spider_client is None:
+                    spider_client = await stack.enter_async_context(create_spider_client())
+                article = await fetch_article(msg, client=spider_client)
+                if not article.ok:
+                    print(f"❌ 無法獲取網頁內容，狀態碼：{article.status}")
+                    continue
+                post = await generate_post(compact_article(article), source=article_source(article))
+                news_url = msg
+            else:
+                post = await generate_post(msg)
+                news_url = None
+
+            title, content, hashtags = post["title"], post["text"], post["hashtags"]
+            print(f"\n生成標題: {title}")
+            print(f"生成內容: {content}")
+            print(f"生成標籤: {hashtags}")
+            if news_url:
+                content = f"{content}\n\n🔗 新聞連結：{news_url}"
+
+            if input("要發佈嗎？(y/n): ").lower() == "y":
+                await post_to_all_platforms(content, image_title=title, news_url=news_url, hashtags=hashtags)
 
 # ================== 啟動 ===================
-if MODE == "text":
-    asyncio.run(text_auto_post())
-elif MODE == "setn":
-    asyncio.run(setn_auto_post(NEWS))
-elif MODE == "manual":
-    asyncio.run(manual())
-else:
-    print(" MODE 設定錯誤，只能為 setn / text / manual ")
+def main():
+    app.check_config()
+    # 清掉上次中斷留下的暫存圖片（不需要 Pillow，不影響延後匯入）
+    app.scratch.cleanup()
+    if app.config.mode == "text":
+        asyncio.run(text_auto_post())
+    elif app.config.mode == "setn":
+        asyncio.run(setn_auto_post(app.config.news))
+    elif app.config.mode == "manual":
+        asyncio.run(manual())
+    elif app.config.mode == "batch":
+        asyncio.run(batch_auto_post())
+    else:
+        print(f" MODE 設定錯誤，只能為 {' / '.join(config_module.MODES)} ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+OpenAI Batch API：一次送出多篇文章的生成請求
+
+流程：組成 JSONL → 上傳檔案 (purpose=batch) → 建立 batch → 輪詢狀態 → 下載輸出檔。
+Batch 以非同步方式處理（最長 24 小時），費用約為一般請求的一半，
+適合在離峰時段先把待發新聞的文案生成好。
+
+測試時可用 scripts/fake_openai_server.py 啟動本地替身伺服器，
+並設定 OPENAI_BASE_URL=http://127.0.0.1:8765/v1。
+"""
+import asyncio
+import json
+import time
+
+import llm_client
+
+ENDPOINT = "/v1/chat/completions"
+# 已結束（不會再變化）的 batch 狀態
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_batch_file(requests):
+    """
+    Args:
+        requests: {custom_id: chat.completions 的 body dict}
+    Returns:
+        JSONL bytes
+    """
+    lines = [
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}, ensure_ascii=False)
+        for custom_id, body in requests.items()
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def submit_batch(requests, completion_window="24h"):
+    """上傳請求檔並建立 batch，回傳 batch 物件"""
+    client = llm_client.get_client()
+    uploaded = await client.files.create(file=("batch.jsonl", build_batch_file(requests)), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=ENDPOINT,
+        completion_window=completion_window,
+    )
+    print(f"📦 已送出 batch {batch.id}（{len(requests)} 筆請求）")
+    return batch
+
+
+async def wait_for_batch(batch_id, poll_interval=30.0, timeout=24 * 3600):
+    """輪詢直到 batch 結束或逾時，回傳最後一次取得的 batch 物件"""
+    client = llm_client.get_client()
+    deadline = time.monotonic() + timeout
+    last_status = None
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status != last_status:
+            counts = getattr(batch, "request_counts", None)
+            progress = f"（{counts.completed}/{counts.total}）" if counts else ""
+            print(f"⏳ batch {batch_id} 狀態：{batch.status}{progress}")
+            last_status = batch.status
+        if batch.status in FINAL_STATUSES:
+            return batch
+        if time.monotonic() >= deadline:
+            print(f"⏱ batch {batch_id} 超過 {timeout:.0f} 秒仍未完成")
+            return batch
+        await asyncio.sleep(poll_interval)
+
+
+async def fetch_batch_results(batch):
+    """
+    下載輸出檔與錯誤檔
+    Returns:
+        {custom_id: (content, error)}；成功時 error 為 None，失敗時 content 為 None
+    """
+    client = llm_client.get_client()
+    results = {}
+    for file_id in (getattr(batch, "output_file_id", None), getattr(batch, "error_file_id", None)):
+        if not file_id:
+            continue
+        response = await client.files.content(file_id)
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            custom_id = row.get("custom_id")
+            response_row = row.get("response") or {}
+            body = response_row.get("body") or {}
+            if row.get("error") or response_row.get("status_code") != 200:
+                error = row.get("error") or body.get("error") or f"HTTP {response_row.get('status_code')}"
+                results[custom_id] = (None, error)
+                continue
+            try:
+                results[custom_id] = (body["choices"][0]["message"]["content"], None)
+            except (KeyError, IndexError, TypeError):
+                results[custom_id] = (None, "回應格式不正確")
+    return results
+
+
+async def run_batch(requests, poll_interval=30.0, timeout=24 * 3600):
+    """送出、等待並取回結果；未出現在輸出中的請求視為失敗"""
+    if not requests:
+        return {}
+    batch = await submit_batch(requests)
+    batch = await wait_for_batch(batch.id, poll_interval=poll_interval, timeout=timeout)
+    results = await fetch_batch_results(batch)
+    for custom_id in requests:
+        results.setdefault(custom_id, (None, f"batch {batch.status}，沒有結果"))
+    return results
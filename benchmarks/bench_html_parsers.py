@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+HTML 解析後端基準：以各來源的列表頁解析與 parse_article，比較 selectolax / lxml / html.parser
+
+fixtures 放在 benchmarks/fixtures/：<來源代碼>.html 為列表頁，<來源代碼>_article.html 為文章頁
+（來源說明見 fixtures/README.md）；沒有 fixture 的來源會產生模擬列表頁。
+
+用法：
+    python benchmarks/bench_html_parsers.py          # 使用 fixtures 跑基準
+    python benchmarks/bench_html_parsers.py --save   # 先下載目前的列表頁與一篇文章覆蓋 fixtures
+"""
+import asyncio
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import spider  # noqa: E402
+from html_backend import available_backends, set_default_backend  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+SOURCES = ("setn", "udn", "cna", "ltn")
+# 模擬列表頁中每則新聞的標記（對應各來源目前的選擇器）
+ITEM_TEMPLATES = {
+    "setn": '<div class="news-item"><a href="/news/{i}">{title}</a><span>{i}</span></div>',
+    "udn": '<dt class="story-list__text"><a href="/health/story/{i}">{title}</a></dt>',
+    "cna": '<div class="listInfo"><h2 class="mainListTitle"><a href="/news/ahel/{i}.aspx">{title}</a></h2></div>',
+    "ltn": '<h3 class="title"><a href="/article/breakingnews/{i}">{title}</a></h3><p class="text">摘要{i}</p>',
+}
+FILLER = "今日台灣政府宣布新的政策市場股價上漲民眾關注醫師提醒流感疫苗健康睡眠飲食運動"
+
+
+def synthetic_page(source, items=400, seed=7):
+    """產生接近真實大小的列表頁（含大量導覽列與雜訊標記）"""
+    rng = random.Random(seed)
+    nav = "".join(f'<li class="nav-item"><a href="/c/{i}">分類{i}</a></li>' for i in range(120))
+    body = []
+    for i in range(items):
+        title = "".join(rng.choice(FILLER) for _ in range(rng.randint(12, 28)))
+        body.append(ITEM_TEMPLATES[source].format(i=i, title=title))
+        body.append('<div class="ad"><script>var x = 1;</script><img src="/ad.png"></div>')
+    return (
+        "<!DOCTYPE html><html><head><title>列表</title>"
+        + "".join(f'<meta name="m{i}" content="{i}">' for i in range(40))
+        + f"</head><body><nav><ul>{nav}</ul></nav><main>{''.join(body)}</main>"
+        + "<footer>" + "<p>版權所有</p>" * 50 + "</footer></body></html>"
+    )
+
+
+def _read_fixture(name):
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def load_fixtures():
+    pages = {}
+    for source in SOURCES:
+        html = _read_fixture(source)
+        pages[source] = (html, "fixture") if html is not None else (synthetic_page(source), "模擬")
+    return pages
+
+
+def load_article_fixtures():
+    """{來源: 文章頁 HTML}（只含有 fixture 的來源）"""
+    articles = {}
+    for source in SOURCES:
+        html = _read_fixture(f"{source}_article")
+        if html is not None:
+            articles[source] = html
+    return articles
+
+
+def _write_fixture(name, html):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"✅ 已儲存 {name} ({len(html) // 1024} KB)")
+
+
+async def save_fixtures():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    async with spider.create_spider_client() as client:
+        for source in SOURCES:
+            url = spider.NEWS_SOURCES[source]["health_section"]
+            try:
+                status, html = await client.get_text(url, source=source)
+            except Exception as e:
+                print(f"⚠️ {source} 下載失敗: {e}")
+                continue
+            if html is None:
+                print(f"⚠️ {source} 下載失敗: {status}")
+                continue
+            _write_fixture(source, html)
+            # 列表上的第一則新聞作為文章頁 fixture
+            entries = spider.parse_listing(source, html, url) or []
+            if not entries:
+                continue
+            try:
+                status, article_html = await client.get_text(entries[0][1], source=source)
+            except Exception as e:
+                print(f"⚠️ {source} 文章下載失敗: {e}")
+                continue
+            if article_html is not None:
+                _write_fixture(f"{source}_article", article_html)
+
+
+def main():
+    if "--save" in sys.argv:
+        asyncio.run(save_fixtures())
+
+    pages = load_fixtures()
+    backends = available_backends()
+    print(f"可用後端：{', '.join(backends)}\n")
+
+    # 列印解析過程的 print 會干擾計時，暫時關掉
+    import builtins
+    real_print = builtins.print
+
+    for source, (html, origin) in pages.items():
+        url = spider.NEWS_SOURCES[source]["health_section"]
+        real_print(f"── {source}（{origin}，{len(html) // 1024} KB）──")
+        baseline = None
+        for backend in reversed(backends):  # 以原本的 html.parser 結果為基準
+            set_default_backend(backend)
+            builtins.print = lambda *a, **k: None
+            try:
+                entries = spider.parse_listing(source, html, url)
+                best = min(timeit.repeat(lambda: spider.parse_listing(source, html, url), number=1, repeat=5))
+            finally:
+                builtins.print = real_print
+            if baseline is None:
+                baseline = (backend, entries)
+            same = "一致" if entries == baseline[1] else f"與 {baseline[0]} 不一致"
+            count = len(entries) if entries else 0
+            print(f"  {backend:<12} {best * 1000:8.2f} ms  {count:4d} 則  {same}")
+        print()
+
+    for source, html in load_article_fixtures().items():
+        url = spider.NEWS_SOURCES[source]["health_section"]
+        real_print(f"── {source} 文章頁（fixture，{len(html) // 1024} KB）──")
+        baseline = None
+        for backend in reversed(backends):
+            set_default_backend(backend)
+            text = spider.parse_article(html, url).text
+            best = min(timeit.repeat(lambda: spider.parse_article(html, url), number=1, repeat=5))
+            if baseline is None:
+                baseline = (backend, text)
+            same = "一致" if text == baseline[1] else f"與 {baseline[0]} 不一致"
+            print(f"  {backend:<12} {best * 1000:8.2f} ms  {len(text):5d} 字  {same}")
+        print()
+
+    set_default_backend("auto")
+
+
+if __name__ == "__main__":
+    main()
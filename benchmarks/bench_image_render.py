@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Instagram 圖片繪製基準：原本每篇都重新找字體、重畫 LOGO/頁尾 vs ImageRenderer
+
+用法：
+    python benchmarks/bench_image_render.py                   # 使用 image_renderer 找到的字體
+    python benchmarks/bench_image_render.py --font path.ttf   # 指定字體檔（環境沒有中文字體時）
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+import image_renderer  # noqa: E402
+
+TITLES = [
+    "流感疫苗開打，65歲以上長者優先接種",
+    "醫師提醒：天冷血管收縮，心血管疾病患者要注意保暖",
+    "睡前滑手機傷眼又傷睡眠",
+    "每天走路30分鐘，降低失智風險",
+    "COVID-19 新變異株 XEC 擴散，專家：高風險族群盡快打疫苗",
+]
+
+
+def legacy_wrap(title_text, max_chars=13):
+    """原本的標題換行：優先在標點符號（，、：、；）處換行，每行最多 max_chars 個字"""
+    lines = []
+    current_line = ""
+    punctuation_marks = ["，", "：", "；", ",", ":", ";"]
+    remove_before_break = ["，", "、", ","]
+
+    def _flush():
+        # 換行前刪除指定標點
+        line = current_line
+        if line and line[-1] in remove_before_break:
+            line = line[:-1]
+        lines.append(line)
+
+    for char in title_text:
+        # 遇到換行符
+        if char == "\n":
+            if current_line:
+                _flush()
+            current_line = ""
+            continue
+        current_line += char
+        # 優先在標點符號處換行；行長達到限制也換行
+        if char in punctuation_marks or len(current_line) >= max_chars:
+            _flush()
+            current_line = ""
+
+    # 添加剩餘文字
+    if current_line:
+        _flush()
+    return lines
+
+
+def legacy_font(size, font_path):
+    """原本的 get_chinese_font：每次都依序嘗試所有路徑"""
+    for path in image_renderer.FONT_PATHS + [font_path]:
+        try:
+            return ImageFont.truetype(path, size)
+        except Exception:
+            continue
+    return ImageFont.load_default()
+
+
+def legacy_render(title, font_path):
+    """原本 post_to_instagram 內的繪製流程（不含上傳）"""
+    img = Image.new("RGB", (1080, 1080), color=image_renderer.random_background())
+    d = ImageDraw.Draw(img)
+    font_title = legacy_font(85, font_path)
+    font_footer = legacy_font(40, font_path)
+    font_logo = legacy_font(50, font_path)
+    color = (40, 40, 40)
+
+    logo = "陳醫師談"
+    d.text(((1080 - image_renderer.text_width(d, logo, font_logo)) // 2, 40), logo, fill=color, font=font_logo)
+    lines = legacy_wrap(title)
+    start_y = (1080 - len(lines) * 100) // 2 - 50
+    for i, line in enumerate(lines[:8]):
+        x = (1080 - image_renderer.text_width(d, line.strip(), font_title)) // 2
+        d.text((x, start_y + i * 100), line.strip(), fill=color, font=font_title)
+    footer = "查看文章底下連結了解更多"
+    d.text(((1080 - image_renderer.text_width(d, footer, font_footer)) // 2, 950), footer, fill=color, font=font_footer)
+    return img
+
+
+def measure(label, render, count):
+    render(TITLES[0])  # 暖機（字體快取、靜態圖層）
+    started = time.perf_counter()
+    for i in range(count):
+        render(TITLES[i % len(TITLES)])
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<16} {count / elapsed:7.1f} 張/秒  ({elapsed / count * 1000:6.2f} ms/張)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--font", help="字體檔路徑")
+    parser.add_argument("-n", type=int, default=50, help="每種方式繪製張數")
+    args = parser.parse_args()
+
+    if args.font:
+        image_renderer.set_font_path(args.font)
+    font_path = image_renderer.find_font_path()
+    print(f"字體：{font_path or 'Pillow 內建'}，每種 {args.n} 張\n")
+
+    random.seed(1)
+    renderer = image_renderer.ImageRenderer()
+    legacy = measure("原本流程", lambda t: legacy_render(t, font_path), args.n)
+    cached = measure("ImageRenderer", renderer.render, args.n)
+    print(f"\n  加速 {legacy / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
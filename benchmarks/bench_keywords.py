@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+關鍵字比對微基準：舊的逐一 `keyword in text` 掃描 vs Aho-Corasick 自動機
+
+用法：
+    python benchmarks/bench_keywords.py [標題數量，預設 5000]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spider import KEYWORDS, is_health_related, match_keywords  # noqa: E402
+
+FILLER = "今日台灣政府宣布新的政策市場股價上漲民眾關注颱風天氣交通事故地方選舉體育比賽明星演唱會科技公司發表手機"
+
+
+def linear_is_health_related(text):
+    """原本的實作：對每個關鍵字做子字串搜尋"""
+    if not text:
+        return False
+    for keyword in KEYWORDS:
+        if keyword in text:
+            return True
+    return False
+
+
+def linear_match_keywords(text):
+    return [k for k in KEYWORDS if k in text]
+
+
+def build_corpus(n, seed=42):
+    """產生 n 則 12~30 字的模擬標題，約三成含有健康關鍵字"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        length = rng.randint(12, 30)
+        title = "".join(rng.choice(FILLER) for _ in range(length))
+        if rng.random() < 0.3:
+            pos = rng.randint(0, length)
+            title = title[:pos] + rng.choice(KEYWORDS) + title[pos:]
+        corpus.append(title)
+    return corpus
+
+
+def bench(label, fn, corpus, repeat=5):
+    best = min(timeit.repeat(lambda: [fn(t) for t in corpus], number=1, repeat=repeat))
+    per_item = best / len(corpus) * 1e6
+    print(f"{label:<32} {best * 1000:8.2f} ms  ({per_item:6.2f} µs/標題)")
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    corpus = build_corpus(n)
+
+    # 正確性：兩種實作的判斷必須一致
+    mismatch = [t for t in corpus if linear_is_health_related(t) != is_health_related(t)]
+    assert not mismatch, f"判斷結果不一致: {mismatch[:3]}"
+
+    print(f"語料：{n} 則標題，{len(KEYWORDS)} 個關鍵字\n")
+    print("── 布林判斷（is_health_related）──")
+    t_old = bench("線性掃描 keyword in text", linear_is_health_related, corpus)
+    t_new = bench("Aho-Corasick search()", is_health_related, corpus)
+    print(f"加速：{t_old / t_new:.2f}x\n")
+
+    print("── 取得所有命中關鍵字 ──")
+    t_old = bench("線性掃描（列出命中）", linear_match_keywords, corpus)
+    t_new = bench("Aho-Corasick find_all()", match_keywords, corpus)
+    print(f"加速：{t_old / t_new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+啟動時間基準：以 python -X importtime 量測 import autopost 的耗時
+
+autopost 匯入時只讀設定，平台套件與重量級元件（facebook、instagrapi、openai、aiohttp、Pillow）
+在第一次用到時才匯入；這裡同時列出這些套件各自的匯入成本，作為延後匯入省下的時間。
+
+用法：
+    python benchmarks/bench_startup.py           # 各量測 5 次取中位數
+    python benchmarks/bench_startup.py -n 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 延後匯入的套件（未安裝者略過）
+LAZY_MODULES = ["openai", "aiohttp", "instagrapi", "facebook", "PIL.Image", "spider", "image_renderer"]
+
+
+def importtime(statement):
+    """
+    在全新的直譯器執行 statement
+    Returns:
+        (整體秒數, {模組: 累計匯入微秒}, 錯誤訊息或 None)
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, env=env, capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    elapsed = time.perf_counter() - started
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative)
+    error = proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+    return elapsed, modules, error
+
+
+def median_run(statement, runs):
+    results = [importtime(statement) for _ in range(runs)]
+    error = next((e for _, _, e in results if e), None)
+    wall = statistics.median(r[0] for r in results)
+    return wall, results[-1][1], error
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5, help="每項量測次數（取中位數）")
+    parser.add_argument("--top", type=int, default=10, help="列出累計耗時最高的幾個模組")
+    args = parser.parse_args()
+
+    baseline, _, _ = median_run("pass", args.n)
+    wall, modules, error = median_run("import autopost", args.n)
+    if error:
+        print(f"❌ import autopost 失敗：{error}")
+        return 1
+
+    print(f"直譯器本身：{baseline * 1000:7.1f} ms")
+    print(f"import autopost：{wall * 1000:7.1f} ms（含直譯器），匯入 {modules.get('autopost', 0) / 1000:.1f} ms\n")
+    print(f"累計匯入耗時最高的 {args.top} 個模組：")
+    for name, us in sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    print("\n延後匯入的套件（第一次用到時才付出的成本）：")
+    for module in LAZY_MODULES:
+        _, lazy_modules, lazy_error = median_run(f"import {module}", 1)
+        if lazy_error:
+            print(f"  {'—':>8}     {module}（未安裝）")
+            continue
+        loaded = "⚠️ 已在啟動時匯入" if module in modules else ""
+        print(f"  {lazy_modules.get(module, 0) / 1000:8.1f} ms  {module} {loaded}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+執行設定
+
+- 一次讀完：環境變數優先，未設定的欄位再從 config.json 補（不再只有缺必要變數時才讀檔）
+- Config 為不可變 (frozen) 的 dataclass，欄位有型別與預設值；數值格式錯誤時使用預設值並提出警告
+- 衍生值在載入時算好：ig_settings（已解析的 IG_SETTINGS_JSON）、delay_range、IG 發文逾時
+- 可選的熱重載：config.json 變更時只套用 RELOADABLE 中的欄位（發文間隔與平台開關），
+  其他欄位需要重新啟動；環境變數已設定的欄位以環境變數為準
+"""
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field, fields, replace
+from typing import Optional, get_type_hints
+
+from ig_session import parse_settings_json
+from scheduler import parse_quiet_hours
+
+CONFIG_PATH = "config.json"
+MODES = ("setn", "text", "manual", "batch")
+REQUIRED = ("api_key", "fb_token", "news")
+# 不必重新啟動就能套用的欄位
+RELOADABLE = ("post_delay_min", "post_delay_max", "post_to_facebook", "post_to_instagram")
+SUBSAMPLINGS = ("4:4:4", "4:2:2", "4:2:0")
+
+
+@dataclass(frozen=True)
+class Config:
+    """每個欄位對應同名的大寫環境變數／config.json 鍵（例如 post_delay_min ↔ POST_DELAY_MIN）"""
+
+    api_key: Optional[str] = field(default=None, repr=False)
+    fb_token: Optional[str] = field(default=None, repr=False)
+    news: Optional[str] = None
+    mode: str = "setn"
+    post_delay_min: int = 30 * 60
+    post_delay_max: int = 3 * 60 * 60
+
+    ig_username: Optional[str] = None
+    ig_password: Optional[str] = field(default=None, repr=False)
+    ig_sessionid: Optional[str] = field(default=None, repr=False)
+    ig_settings_path: Optional[str] = None
+    ig_settings_json: Optional[str] = field(default=None, repr=False)
+    ig_proxy: Optional[str] = None
+    post_to_facebook: bool = True
+    post_to_instagram: bool = False
+    # 上傳前等待（暖機與模擬人類行為）
+    ig_pre_upload_wait_enabled: bool = True
+    ig_pre_upload_wait_seconds: Optional[int] = None
+    ig_pre_upload_wait_min: int = 5 * 60
+    ig_pre_upload_wait_max: int = 15 * 60
+
+    # 控制是否讀寫本地檔案（在 Railway/雲端部署時可設為 false）
+    use_local_files: bool = True
+    spider_stream: bool = False
+    seen_ttl_days: float = 14
+    near_dup_threshold: float = 0.5
+    near_dup_window_hours: float = 72
+    openai_timeout: float = 60
+    openai_max_retries: int = 3
+    generation_cache: bool = True
+    generation_cache_ttl_hours: float = 7 * 24
+    prompt_token_budget: int = 800
+    batch_size: int = 10
+    batch_poll_seconds: float = 60
+    ig_jpeg_quality: int = 90
+    ig_jpeg_subsampling: str = "4:2:0"
+    ig_jpeg_optimize: bool = True
+    fb_publish_timeout: float = 120
+    ig_publish_timeout: Optional[float] = None  # None：上傳前等待上限再加 10 分鐘
+    ig_session_ttl_minutes: float = 30
+    pipeline_lookahead: int = 2
+    quiet_hours: Optional[tuple] = None  # "23-7" -> (23, 7)
+    max_posts_per_day: int = 0
+    schedule_lead_minutes: float = 10
+    # config.json 變更時自動套用發文間隔與平台開關
+    config_watch: bool = False
+    config_watch_seconds: float = 10
+
+    # ---- 衍生值（載入時計算，不對應環境變數）----
+    ig_settings: Optional[dict] = field(default=None, repr=False, compare=False)
+    warnings: tuple = field(default=(), repr=False, compare=False)
+
+    @property
+    def delay_range(self):
+        """(最短, 最長) 發文間隔秒數"""
+        return (self.post_delay_min, self.post_delay_max)
+
+    @property
+    def platforms(self):
+        """目前啟用的平台名稱"""
+        names = []
+        if self.post_to_facebook:
+            names.append("Facebook")
+        if self.post_to_instagram:
+            names.append("Instagram")
+        return names
+
+    def missing(self):
+        """缺少的必要設定（環境變數名稱）"""
+        return [name.upper() for name in REQUIRED if not getattr(self, name)]
+
+
+_DERIVED = {"ig_settings", "warnings"}
+
+
+def _settable_fields():
+    hints = get_type_hints(Config)
+    for f in fields(Config):
+        if f.name in _DERIVED:
+            continue
+        kind = hints[f.name]
+        optional = getattr(kind, "__origin__", None) is not None and type(None) in kind.__args__
+        if optional:
+            kind = next(arg for arg in kind.__args__ if arg is not type(None))
+        yield f, kind
+
+
+def _convert(value, kind):
+    if kind is bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes")
+        return bool(value)
+    if kind is int:
+        return int(value)
+    if kind is float:
+        return float(value)
+    if kind is tuple:
+        return parse_quiet_hours(value)
+    return str(value)
+
+
+def _read_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 讀取 {path} 失敗: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _validate(values, warnings):
+    """範圍檢查與衍生值；有問題的值改用合理值並記錄警告"""
+    low, high = values["post_delay_min"], values["post_delay_max"]
+    if low < 0 or high < 0:
+        warnings.append("POST_DELAY_MIN / POST_DELAY_MAX 不可為負數，改用 0")
+        low, high = max(0, low), max(0, high)
+    if low > high:
+        warnings.append("POST_DELAY_MIN 大於 POST_DELAY_MAX，已對調")
+        low, high = high, low
+    values["post_delay_min"], values["post_delay_max"] = low, high
+
+    if not 1 <= values["ig_jpeg_quality"] <= 95:
+        values["ig_jpeg_quality"] = min(95, max(1, values["ig_jpeg_quality"]))
+        warnings.append(f"IG_JPEG_QUALITY 超出 1-95，改用 {values['ig_jpeg_quality']}")
+    if values["ig_jpeg_subsampling"] not in SUBSAMPLINGS:
+        warnings.append(f"IG_JPEG_SUBSAMPLING 只能為 {' / '.join(SUBSAMPLINGS)}，改用 4:2:0")
+        values["ig_jpeg_subsampling"] = "4:2:0"
+    if not 0 <= values["near_dup_threshold"] <= 1:
+        warnings.append("NEAR_DUP_THRESHOLD 應介於 0 與 1，改用 0.5")
+        values["near_dup_threshold"] = 0.5
+    values["pipeline_lookahead"] = max(1, values["pipeline_lookahead"])
+    values["max_posts_per_day"] = max(0, values["max_posts_per_day"])
+    if values["ig_pre_upload_wait_min"] > values["ig_pre_upload_wait_max"]:
+        warnings.append("IG_PRE_UPLOAD_WAIT_MIN 大於 IG_PRE_UPLOAD_WAIT_MAX，已對調")
+        values["ig_pre_upload_wait_min"], values["ig_pre_upload_wait_max"] = (
+            values["ig_pre_upload_wait_max"], values["ig_pre_upload_wait_min"])
+
+    if values["ig_publish_timeout"] is None:
+        longest_wait = max(values["ig_pre_upload_wait_max"], values["ig_pre_upload_wait_seconds"] or 0)
+        values["ig_publish_timeout"] = longest_wait + 10 * 60
+    values["ig_settings"] = parse_settings_json(values["ig_settings_json"])
+
+
+def load_config(path=CONFIG_PATH, environ=None):
+    """
+    讀取環境變數與 config.json，回傳 Config
+    Args:
+        path: config.json 路徑（不存在也 OK）
+        environ: 環境變數 dict，預設為 os.environ
+    """
+    environ = os.environ if environ is None else environ
+    data = _read_file(path)
+    values = {}
+    warnings = []
+    for f, kind in _settable_fields():
+        key = f.name.upper()
+        raw = environ.get(key)
+        if raw is None or raw == "":
+            raw = data.get(key)
+        if raw is None or raw == "":
+            values[f.name] = f.default
+            continue
+        try:
+            values[f.name] = _convert(raw, kind)
+        except (TypeError, ValueError):
+            warnings.append(f"{key} 格式錯誤（{raw!r}），改用預設值 {f.default!r}")
+            values[f.name] = f.default
+    _validate(values, warnings)
+    values["warnings"] = tuple(warnings)
+    return Config(**values)
+
+
+def reload_config(current, path=CONFIG_PATH, environ=None):
+    """
+    重新讀取設定，只套用 RELOADABLE 欄位
+    Returns:
+        (新的 Config, {欄位: 新值}, [變更了但需要重啟才生效的欄位])
+    """
+    fresh = load_config(path, environ)
+    changes = {name: getattr(fresh, name) for name in RELOADABLE if getattr(fresh, name) != getattr(current, name)}
+    ignored = [
+        f.name for f, _ in _settable_fields()
+        if f.name not in RELOADABLE and getattr(fresh, f.name) != getattr(current, f.name)
+    ]
+    return replace(current, **changes), changes, ignored
+
+
+class ConfigWatcher:
+    """以修改時間輪詢 config.json（不需要額外套件）"""
+
+    def __init__(self, path=CONFIG_PATH, interval=10):
+        self.path = path
+        self.interval = interval
+        self._mtime = self._stat()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def changed(self):
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        return True
+
+    async def watch(self, on_change):
+        """檔案變更時呼叫 on_change()；不會結束"""
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                try:
+                    on_change()
+                except Exception as e:
+                    print(f"⚠️ 套用新設定失敗: {e}")
@@ -0,0 +1,129 @@
+"""
+LLM 生成結果快取（內容定址）
+
+鍵為 模型、system prompt、生成參數與輸入文字 的 SHA-256，
+同一篇新聞在重試、重啟或 manual 重跑時直接沿用上次的生成結果，不再花 API 費用與等待時間。
+新聞的輸入文字以「網址 + 原始內文」計算（見 autopost.article_source），不受壓縮結果變動影響。
+
+- 記憶體 LRU + 選擇性的磁碟目錄（每筆一個 JSON 檔）
+- 超過 max_age 的結果視為過期；超過 max_entries 時淘汰最舊的
+- enabled=False 時完全略過（想要每次都有不同文案時使用）
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+def generation_key(model, system_prompt, params, text):
+    """計算快取鍵：任何一項改變都會得到不同的鍵"""
+    payload = json.dumps(
+        {"model": model, "system": system_prompt, "params": params, "input": text},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """以內容雜湊為鍵的生成結果快取
+
+    Args:
+        path: 磁碟快取目錄；None 表示只存在記憶體
+        max_entries: 最多保留筆數（記憶體與磁碟相同）
+        max_age: 保留秒數，None 表示不依時間淘汰
+        enabled: False 時 get 一律未命中、put 不儲存
+    """
+
+    def __init__(self, path=None, max_entries=500, max_age=7 * 24 * 3600, enabled=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)，依存入時間排序
+        if path:
+            try:
+                os.makedirs(path, exist_ok=True)
+                self._load_index()
+            except OSError as e:
+                print(f"⚠️ 無法使用生成快取目錄，改用記憶體: {e}")
+                self.path = None
+
+    def _file_for(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def _expired(self, stored_at, now=None):
+        return self.max_age is not None and stored_at < (now or time.time()) - self.max_age
+
+    def _load_index(self):
+        # 啟動時只讀取檔名與修改時間，內容在第一次命中時才載入
+        found = []
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                full = os.path.join(self.path, name)
+                found.append((os.path.getmtime(full), name[:-5]))
+        for stored_at, key in sorted(found):
+            self._entries[key] = (stored_at, None)
+        self._evict()
+
+    def get(self, key):
+        """回傳快取的生成結果；未命中、過期或停用時回傳 None"""
+        if not self.enabled:
+            return None
+        item = self._entries.get(key)
+        if item is None or self._expired(item[0]):
+            self.misses += 1
+            return None
+        stored_at, value = item
+        if value is None:
+            try:
+                with open(self._file_for(key), "r", encoding="utf-8") as f:
+                    value = json.load(f)["value"]
+            except (OSError, ValueError, KeyError):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries[key] = (stored_at, value)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        stored_at = time.time()
+        self._entries.pop(key, None)
+        self._entries[key] = (stored_at, value)
+        if self.path:
+            tmp_path = self._file_for(key) + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"stored_at": stored_at, "value": value}, f, ensure_ascii=False)
+                os.replace(tmp_path, self._file_for(key))
+            except OSError as e:
+                print(f"⚠️ 寫入生成快取失敗: {e}")
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        """淘汰過期與超出筆數上限的最舊紀錄（記憶體與磁碟一起）"""
+        now = time.time()
+        while self._entries:
+            key, (stored_at, _) = next(iter(self._entries.items()))
+            if not self._expired(stored_at, now) and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            if self.path:
+                try:
+                    os.remove(self._file_for(key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"命中 {self.hits} / 未命中 {self.misses}（命中率 {rate:.0%}，{len(self._entries)} 筆）"
@@ -0,0 +1,166 @@
+"""
+可抽換的 HTML 解析後端
+
+依序優先使用 selectolax（lexbor/modest）→ lxml → 內建 html.parser。
+回傳的文件物件提供爬蟲用到的 BeautifulSoup 子集：
+select()、find_all(tags, class_=...)、find()、get()、get_text()、.text、.name
+
+可用環境變數 HTML_PARSER_BACKEND 指定（auto / selectolax / lxml / html.parser）。
+不論使用哪個後端，<script>、<style>、<noscript>、<template> 的內容都不會出現在文字中。
+"""
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:  # 舊版 selectolax 只有 modest 引擎
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser
+    except ImportError:
+        _SelectolaxParser = None
+
+try:
+    import lxml  # noqa: F401
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+# 不屬於內文的標籤（與 stream_parser 相同）；selectolax 的 text() 會包含它們的內容，
+# BeautifulSoup 只排除 script/style/template，noscript 需要另外移除
+_NON_TEXT_TAGS = ("script", "style", "noscript", "template")
+
+
+def available_backends():
+    """目前環境可用的後端（依優先順序）"""
+    found = []
+    if _SelectolaxParser is not None:
+        found.append("selectolax")
+    if _HAS_LXML:
+        found.append("lxml")
+    found.append("html.parser")
+    return found
+
+
+def _resolve(name):
+    name = (name or "auto").strip().lower()
+    if name == "auto":
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"不支援的 HTML 解析後端: {name}（可用：{', '.join(BACKENDS)}）")
+    if name not in available_backends():
+        print(f"⚠️ HTML 解析後端 {name} 未安裝，改用 html.parser")
+        return "html.parser"
+    return name
+
+
+_default_backend = _resolve(os.getenv("HTML_PARSER_BACKEND"))
+
+
+def get_default_backend():
+    return _default_backend
+
+
+def set_default_backend(name):
+    """切換預設後端，回傳實際採用的後端名稱"""
+    global _default_backend
+    _default_backend = _resolve(name)
+    return _default_backend
+
+
+def parse_html(html, backend=None):
+    """解析 HTML，回傳具 BeautifulSoup 子集介面的文件物件"""
+    backend = _resolve(backend) if backend else _default_backend
+    if backend == "selectolax":
+        tree = _SelectolaxParser(html)
+        tree.strip_tags(list(_NON_TEXT_TAGS))
+        return _SelectolaxNode(tree.root)
+    soup = BeautifulSoup(html, backend)
+    for tag in soup.find_all("noscript"):
+        tag.decompose()
+    return soup
+
+
+# ==================== selectolax 轉接層 ====================
+def _class_matches(class_value, predicate):
+    """模擬 BeautifulSoup 對 class_=函式 的比對：逐一檢查每個 class，再檢查整串"""
+    if class_value is None:
+        return bool(predicate(None))
+    tokens = class_value.split()
+    if any(predicate(token) for token in tokens):
+        return True
+    return len(tokens) > 1 and bool(predicate(class_value))
+
+
+def _unique(nodes):
+    """lexbor 對群組選擇器（a, b）會重複回傳同時符合多個選擇器的節點；BeautifulSoup 只回傳一次"""
+    seen = set()
+    unique = []
+    for node in nodes:
+        if node.mem_id not in seen:
+            seen.add(node.mem_id)
+            unique.append(node)
+    return unique
+
+
+class _SelectolaxNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def __bool__(self):
+        return self._node is not None
+
+    @property
+    def name(self):
+        return self._node.tag
+
+    @property
+    def text(self):
+        return self._node.text(deep=True)
+
+    def get_text(self, separator="", strip=False):
+        return self._node.text(deep=True, separator=separator, strip=strip)
+
+    def get(self, key, default=None):
+        value = self._node.attributes.get(key)
+        return default if value is None else value
+
+    def select(self, selector):
+        return [_SelectolaxNode(n) for n in _unique(self._node.css(selector))]
+
+    def select_one(self, selector):
+        node = self._node.css_first(selector)
+        return _SelectolaxNode(node) if node is not None else None
+
+    def find_all(self, name=None, attrs=None, class_=None, **kwargs):
+        attrs = {**(attrs or {}), **kwargs}
+        tags = [name] if isinstance(name, str) else list(name or ["*"])
+        selector = ", ".join(t + _attr_selector(attrs) for t in tags)
+        nodes = _unique(self._node.css(selector))
+        if class_ is not None:
+            if callable(class_):
+                nodes = [n for n in nodes if _class_matches(n.attributes.get("class"), class_)]
+            else:
+                nodes = [n for n in nodes if class_ in (n.attributes.get("class") or "").split()]
+        return [_SelectolaxNode(n) for n in nodes]
+
+    def find(self, name=None, attrs=None, class_=None, **kwargs):
+        attrs = {**(attrs or {}), **kwargs}
+        if class_ is None:
+            tag = name if isinstance(name, str) else "*"
+            return self.select_one(tag + _attr_selector(attrs))
+        found = self.find_all(name, attrs, class_=class_)
+        return found[0] if found else None
+
+
+def _attr_selector(attrs):
+    parts = []
+    for key, value in attrs.items():
+        value = str(value).replace('"', '\\"')
+        parts.append(f'[{key}="{value}"]')
+    return "".join(parts)
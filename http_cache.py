@@ -0,0 +1,110 @@
+"""
+HTTP 條件式請求快取（ETag / Last-Modified）
+
+每個 URL 保存驗證標頭與內容；下次請求帶上 If-None-Match / If-Modified-Since，
+伺服器回 304 時直接沿用快取內容與上次的解析結果，省下頻寬與解析 CPU。
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: str = None
+    last_modified: str = None
+    body: str = None
+    stored_at: float = field(default_factory=time.time)
+    # 解析結果只保存在記憶體（重啟後遇到 304 會從 body 重新解析）
+    parsed: object = None
+
+
+class HttpCache:
+    """以 URL 為鍵的驗證快取
+
+    Args:
+        path: 磁碟快取目錄；None 表示只存在記憶體
+        max_entries: 記憶體中最多保留的筆數（LRU）
+    """
+
+    def __init__(self, path=None, max_entries=256):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _file_for(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{digest}.json")
+
+    def get(self, url):
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            return entry
+        if not self.path:
+            return None
+        try:
+            with open(self._file_for(url), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = CacheEntry(
+            url=url,
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+            body=data.get("body"),
+            stored_at=data.get("stored_at", 0),
+        )
+        self._remember(entry)
+        return entry
+
+    def validators(self, url):
+        """回傳要附加在請求上的條件式標頭"""
+        entry = self.get(url)
+        headers = {}
+        if entry is None or entry.body is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url, headers, body):
+        """依回應標頭儲存；伺服器未提供任何驗證標頭時不快取"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            self._entries.pop(url, None)
+            return None
+        entry = CacheEntry(url=url, etag=etag, last_modified=last_modified, body=body)
+        self._remember(entry)
+        if self.path:
+            tmp_path = self._file_for(url) + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "url": url,
+                        "etag": etag,
+                        "last_modified": last_modified,
+                        "body": body,
+                        "stored_at": entry.stored_at,
+                    }, f, ensure_ascii=False)
+                os.replace(tmp_path, self._file_for(url))
+            except OSError as e:
+                print(f"⚠️ 寫入 HTTP 快取失敗: {e}")
+        return entry
+
+    def _remember(self, entry):
+        self._entries[entry.url] = entry
+        self._entries.move_to_end(entry.url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
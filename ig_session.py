@@ -0,0 +1,226 @@
+"""
+Instagram 登入狀態管理
+
+- 最近一次驗證成功的時間會被記住，TTL 內直接視為已登入，不再打私有 API
+- 只有 TTL 過期或實際請求收到 LoginRequired 時才重新驗證／登入
+- 驗證被速率限制 (429) 時不重新登入（只會再多打私有 API），暫停 rate_limit_backoff 秒後再試
+- IG_SETTINGS_JSON 與 settings 檔只解析一次，之後都使用記憶體中的 dict
+- 每篇貼文最多一次 account_info()（TTL 過期時），加上上傳本身；上傳成功也算一次驗證
+- instagrapi 在真的要呼叫 IG 時才匯入
+"""
+import json
+import os
+import time
+
+
+def parse_settings_json(raw):
+    """解析 IG_SETTINGS_JSON（Railway 變數可能被單引號包住）；格式錯誤回傳 None"""
+    if not raw:
+        return None
+    cleaned = raw.strip()
+    if cleaned.startswith("'") and cleaned.endswith("'"):
+        cleaned = cleaned[1:-1]
+    try:
+        settings = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        print(f"⚠️ IG_SETTINGS_JSON 格式錯誤: {e}")
+        print("提示：請確認 Railway 變數中的 JSON 格式正確，建議改用 IG_SESSIONID")
+        return None
+    return settings if isinstance(settings, dict) else None
+
+
+def is_instagrapi_settings(settings):
+    """只接受 instagrapi 產生過的結構，避免異常 key（如 pinned_channels_info）"""
+    return isinstance(settings, dict) and "authorization_data" in settings and "device_settings" in settings
+
+
+def is_rate_limited(error):
+    msg = str(error)
+    return "429" in msg or "MaxRetryError" in msg
+
+
+class IGSession:
+    """包裝 instagrapi Client 的登入狀態
+
+    Args:
+        client: instagrapi.Client
+        username / password / sessionid: 登入資訊
+        settings: 已解析的 settings dict（IG_SETTINGS_JSON）；None 時改讀 settings_path
+        settings_path: settings 檔（登入成功後也寫到這裡）
+        use_local_files: False 時不讀寫 settings 檔
+        ttl: 驗證成功後多久內不再驗證（秒）
+        rate_limit_backoff: 驗證被速率限制後暫停多久（秒）
+    """
+
+    def __init__(self, client, username=None, password=None, sessionid=None, settings=None,
+                 settings_path=None, use_local_files=True, ttl=30 * 60, rate_limit_backoff=15 * 60):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.sessionid = sessionid
+        self.settings_path = settings_path or os.path.join("downloads", "instagrapi_settings.json")
+        self.use_local_files = use_local_files
+        self.ttl = ttl
+        self.rate_limit_backoff = rate_limit_backoff
+        self.settings = settings if is_instagrapi_settings(settings) else None
+        if self.settings is None and settings is None and use_local_files:
+            self.settings = self._read_settings_file()
+        self._verified_at = None
+        self._limited_until = None
+        self.api_calls = 0  # 驗證與登入用掉的私有 API 次數（不含上傳）
+
+    def _read_settings_file(self):
+        try:
+            with open(self.settings_path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ 載入 IG 設定檔失敗: {e}")
+            return None
+        if is_instagrapi_settings(settings):
+            print(f"✅ 已載入 IG 設定檔: {self.settings_path}")
+            return settings
+        return None
+
+    @property
+    def is_fresh(self):
+        return self._verified_at is not None and time.monotonic() - self._verified_at < self.ttl
+
+    def mark_verified(self):
+        self._verified_at = time.monotonic()
+
+    def invalidate(self):
+        self._verified_at = None
+
+    def _saved_sessionid(self):
+        if self.sessionid:
+            return self.sessionid
+        if self.settings:
+            return self.settings.get("authorization_data", {}).get("sessionid")
+        return None
+
+    def _save_settings(self):
+        try:
+            self.settings = self.client.get_settings()
+        except Exception:
+            return
+        if not self.use_local_files:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.settings_path) or ".", exist_ok=True)
+            self.client.dump_settings(self.settings_path)
+            print(f"✅ 已儲存 IG 設定至: {self.settings_path}")
+        except Exception as e:
+            print(f"⚠️ 儲存 IG 設定失敗: {e}")
+
+    def _verify(self):
+        """
+        以私有 API 驗證一次登入狀態（避免 public lookup 導致 429）
+        Returns:
+            True：已登入；False：需要重新登入；None：被速率限制（無法判斷）
+        """
+        from instagrapi.exceptions import LoginRequired
+
+        self.api_calls += 1
+        try:
+            self.client.account_info()
+            return True
+        except LoginRequired:
+            return False
+        except Exception as e:
+            if is_rate_limited(e):
+                print(f"⚠️ IG 驗證被速率限制 (429)：{str(e)[:80]}")
+                return None
+            # account_info 不可用時，以 sessionid 作為弱驗證
+            return bool(getattr(self.client, "sessionid", None))
+
+    def login(self):
+        """依序嘗試 settings + sessionid、帳密登入；成功即視為已驗證（不再另外驗證）"""
+        if self.settings:
+            try:
+                self.client.set_settings(self.settings)
+            except Exception as e:
+                print(f"⚠️ 載入 IG 設定失敗: {e}")
+
+        sessionid = self._saved_sessionid()
+        if sessionid:
+            self.api_calls += 1
+            try:
+                self.client.login_by_sessionid(sessionid)
+                print("✅ Instagram 透過 sessionid 登入成功")
+                self.mark_verified()
+                self._save_settings()
+                return True
+            except Exception as e:
+                if is_rate_limited(e):
+                    print(f"⚠️ IG 請求被速率限制 (429)：{e}")
+                    return False
+                print(f"⚠️ sessionid 登入失敗: {e}")
+
+        if not (self.username and self.password):
+            print("⚠️ 無法登入 IG（缺少可用的 sessionid 或密碼）")
+            print("建議：在 Railway 設定 IG_SESSIONID 或 IG_SETTINGS_JSON")
+            return False
+
+        self.api_calls += 1
+        try:
+            # 重用已載入的裝置指紋與設定以降低挑戰機率
+            self.client.login(self.username, self.password)
+        except Exception as e:
+            if is_rate_limited(e):
+                print(f"⚠️ IG 請求被速率限制 (429)：{e}")
+                return False
+            print(f"⚠️ Instagram 登入失敗: {e}")
+            print("建議解決方案：")
+            print("1. 在本機完成登入後，從 downloads/instagrapi_settings.json 取得 sessionid")
+            print("2. 在 Railway 設定 IG_SESSIONID 變數（而非完整 JSON）")
+            print("3. 若持續失敗，設定 IG_PROXY 使用代理伺服器")
+            return False
+
+        print("✅ Instagram 登入成功")
+        self.mark_verified()
+        self._save_settings()
+        sid = (self.settings or {}).get("authorization_data", {}).get("sessionid")
+        if sid:
+            print("\n💡 建議：將以下 sessionid 設定到 Railway 的 IG_SESSIONID 變數：")
+            print(f"   {sid}\n")
+        return True
+
+    def ensure(self):
+        """
+        確保可以上傳：TTL 內直接回傳 True；過期時驗證一次，確定未登入才重新登入。
+        被速率限制時回傳 False，並在 rate_limit_backoff 秒內不再呼叫 IG
+        Returns:
+            是否為已登入狀態
+        """
+        if self.is_fresh:
+            return True
+        if self._limited_until is not None and time.monotonic() < self._limited_until:
+            remaining = self._limited_until - time.monotonic()
+            print(f"⏸️ IG 速率限制暫停中（剩 {remaining / 60:.0f} 分鐘），這次不發 IG")
+            return False
+        verified = self._verify()
+        if verified is None:
+            self._limited_until = time.monotonic() + self.rate_limit_backoff
+            return False
+        self._limited_until = None
+        if verified:
+            self.mark_verified()
+            return True
+        return self.login()
+
+    def call(self, func, *args, **kwargs):
+        """執行需要登入的 IG 請求；收到 LoginRequired 時重新登入並重試一次，成功即更新驗證時間"""
+        from instagrapi.exceptions import LoginRequired
+
+        try:
+            result = func(*args, **kwargs)
+        except LoginRequired:
+            print("⚠️ IG 回應 login_required，重新登入後重試一次...")
+            self.invalidate()
+            if not self.login():
+                raise
+            result = func(*args, **kwargs)
+        self.mark_verified()
+        return result
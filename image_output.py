@@ -0,0 +1,110 @@
+"""
+圖片編碼與暫存
+
+- 圖片直接編碼成記憶體中的 JPEG（品質、色度取樣、optimize 可調），並記錄大小與編碼時間
+- 上傳套件只接受檔案路徑時，才寫到受管理的暫存目錄，用完立即刪除；
+  行程中途結束留下的檔案會在下次啟動時清掉
+"""
+import io
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# Pillow 的 subsampling 參數：0 = 4:4:4、1 = 4:2:2、2 = 4:2:0
+SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    width: int
+    height: int
+    elapsed: float  # 編碼耗時（秒）
+    format: str = "JPEG"
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def summary(self):
+        return f"{self.width}x{self.height} {self.format} {self.size / 1024:.0f} KB，編碼 {self.elapsed * 1000:.0f} ms"
+
+
+def encode_jpeg(img, quality=90, subsampling="4:2:0", optimize=True, progressive=False):
+    """
+    把 PIL Image 編碼成記憶體中的 JPEG
+    Args:
+        subsampling: "4:4:4" / "4:2:2" / "4:2:0"
+    Returns:
+        EncodedImage
+    """
+    if subsampling not in SUBSAMPLING:
+        raise ValueError(f"不支援的色度取樣: {subsampling}（可用：{', '.join(SUBSAMPLING)}）")
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    img.convert("RGB").save(
+        buffer,
+        "JPEG",
+        quality=quality,
+        subsampling=SUBSAMPLING[subsampling],
+        optimize=optimize,
+        progressive=progressive,
+    )
+    return EncodedImage(
+        data=buffer.getvalue(),
+        width=img.width,
+        height=img.height,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+class ScratchDir:
+    """受管理的暫存目錄：只放本行程寫出的暫存檔
+
+    Args:
+        path: 目錄路徑
+        prefix: 暫存檔檔名前綴（清理時只刪除此前綴的檔案）
+    """
+
+    def __init__(self, path, prefix="upload-"):
+        self.path = path
+        self.prefix = prefix
+
+    def cleanup(self):
+        """刪除先前行程遺留的暫存檔，回傳刪除數量"""
+        removed = 0
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            print(f"⚠️ 無法讀取暫存目錄 {self.path}: {e}")
+            return 0
+        for name in names:
+            if not name.startswith(self.prefix):
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"🧹 已清除 {removed} 個遺留的暫存檔")
+        return removed
+
+    @contextmanager
+    def spill(self, data, suffix=".jpg"):
+        """把資料寫成暫存檔並回傳路徑，離開 with 區塊時刪除"""
+        os.makedirs(self.path, exist_ok=True)
+        file_path = os.path.join(self.path, f"{self.prefix}{uuid.uuid4().hex}{suffix}")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        try:
+            yield file_path
+        finally:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
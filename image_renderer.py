@@ -0,0 +1,224 @@
+"""
+Instagram 貼文圖片繪製
+
+- 字體路徑只搜尋一次（必要時才下載 Noto Sans TC），各字級的字體物件以快取重用
+- 頂部 LOGO 與底部提示文字是固定的，每種畫布尺寸只預先繪製一次成遮罩（只保留有字的區域）
+- 每篇貼文只需要：填滿背景色 → 以遮罩貼上靜態文字 → 繪製標題（依字寬換行，見 text_layout）
+"""
+import os
+import random
+import threading
+import urllib.request
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+import text_layout
+
+CANVAS_SIZE = 1080
+
+# 常見系統字體路徑（Railway Aptfile 安裝後的路徑在前）
+FONT_PATHS = [
+    # Railway/Ubuntu 透過 Aptfile 安裝的 Noto CJK
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto-cjk/NotoSansTC-Regular.otf",
+    "/usr/share/fonts/truetype/noto/NotoSansTC-Regular.ttf",
+    # Windows
+    "C:/Windows/Fonts/msjh.ttc",      # 微軟正黑體
+    "C:/Windows/Fonts/kaiu.ttf",       # 標楷體
+    "C:/Windows/Fonts/mingliu.ttc",    # 細明體
+    # Mac
+    "/System/Library/Fonts/PingFang.ttc",  # Mac 蘋方體
+    # 專案內建字體
+    "fonts/NotoSansTC-Regular.ttf",
+    "fonts/NotoSansTC-Regular.otf",
+]
+
+# 找不到系統字體時的下載來源（按優先順序嘗試）
+FONT_URLS = [
+    # Google Fonts CDN (最穩定)
+    "https://raw.githubusercontent.com/google/fonts/main/ofl/notosanstc/NotoSansTC%5Bwght%5D.ttf",
+    # GitHub Noto CJK 倉庫
+    "https://github.com/notofonts/noto-cjk/raw/main/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
+    # jsDelivr CDN 備援
+    "https://cdn.jsdelivr.net/gh/notofonts/noto-cjk/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
+]
+
+_UNRESOLVED = object()
+_font_path = _UNRESOLVED
+_font_lock = threading.Lock()
+
+
+def _download_font():
+    fonts_dir = "fonts"
+    os.makedirs(fonts_dir, exist_ok=True)
+    font_file = os.path.join(fonts_dir, "NotoSansTC-Regular.ttf")
+    if os.path.exists(font_file):
+        return font_file
+
+    print("⬇️ 下載繁體中文字體 Noto Sans TC...")
+    for url in FONT_URLS:
+        try:
+            print(f"  嘗試來源: {url[:50]}...")
+            urllib.request.urlretrieve(url, font_file)
+            # 驗證檔案大小（避免下載到錯誤頁面）
+            if os.path.getsize(font_file) > 100000:  # 至少 100KB
+                print(f"✅ 字體已下載至: {font_file}")
+                return font_file
+            os.remove(font_file)
+        except Exception as e:
+            print(f"  ⚠️ 此來源失敗: {e}")
+            if os.path.exists(font_file):
+                os.remove(font_file)
+    raise Exception("所有字體下載來源均失敗")
+
+
+def find_font_path():
+    """回傳可用的繁體中文字體路徑（整個行程只搜尋一次）；None 表示只能用 Pillow 內建字體"""
+    global _font_path
+    if _font_path is not _UNRESOLVED:
+        return _font_path
+    with _font_lock:
+        if _font_path is not _UNRESOLVED:
+            return _font_path
+        for path in FONT_PATHS:
+            try:
+                ImageFont.truetype(path, 10)
+            except OSError:
+                continue
+            _font_path = path
+            return path
+        # Railway/Linux 環境：下載 Noto Sans TC（多重備援）
+        try:
+            _font_path = _download_font()
+        except Exception as e:
+            print(f"⚠️ 無法載入中文字體: {e}")
+            print("建議：請在 Railway 手動設定 apt buildpack 安裝 fonts-noto-cjk")
+            _font_path = None
+        return _font_path
+
+
+def set_font_path(path):
+    """指定字體檔（None 表示重新搜尋）；已快取的字體與靜態圖層會失效"""
+    global _font_path
+    _font_path = _UNRESOLVED if path is None else path
+    get_font.cache_clear()
+    ImageRenderer._static_layers.clear()
+
+
+@lru_cache(maxsize=32)
+def get_font(size):
+    """取得指定字級的繁體中文字體（依字級快取）"""
+    path = find_font_path()
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError as e:
+            print(f"⚠️ 無法載入字體 {path}: {e}")
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1 的內建字體沒有字級
+        return ImageFont.load_default()
+
+
+def text_width(draw, text, font):
+    try:
+        bbox = draw.textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0]
+    except Exception:
+        return len(text) * font.size // 2 if hasattr(font, "size") else len(text) * 20
+
+
+def random_background():
+    """隨機淺色背景 (RGB 值範圍 200-255)"""
+    return (random.randint(200, 255), random.randint(200, 255), random.randint(200, 255))
+
+
+class ImageRenderer:
+    """正方形貼文圖片：頂部 LOGO、置中標題、底部提示
+
+    Args:
+        size: 畫布邊長（px）；LOGO/標題/頁尾的位置與字級依 1080 等比例縮放
+        logo_text: 頂部 LOGO 文字
+        footer_text: 底部提示文字
+        text_color: 文字顏色
+    """
+
+    # (size, logo_text, footer_text, 字體路徑) -> [(左上角座標, L 模式遮罩)]，所有實例共用
+    _static_layers = {}
+
+    def __init__(self, size=CANVAS_SIZE, logo_text="陳醫師談", footer_text="查看文章底下連結了解更多",
+                 text_color=(40, 40, 40)):
+        self.size = size
+        self.logo_text = logo_text
+        self.footer_text = footer_text
+        self.text_color = text_color
+        self.scale = size / CANVAS_SIZE
+        self.title_size = round(85 * self.scale)
+        self.min_title_size = round(48 * self.scale)
+        self.margin = round(60 * self.scale)  # 標題左右留白
+        self.max_lines = 8
+
+    def _scaled(self, value):
+        return round(value * self.scale)
+
+    def static_layer(self):
+        """LOGO 與底部提示的文字遮罩（每種尺寸只繪製一次）
+
+        只保留有字的矩形區域，貼上時不必處理整張畫布。
+        """
+        key = (self.size, self.logo_text, self.footer_text, find_font_path())
+        layer = self._static_layers.get(key)
+        if layer is not None:
+            return layer
+
+        layer = []
+        for text, font_size, y in ((self.logo_text, 50, 40), (self.footer_text, 40, 950)):
+            if not text:
+                continue
+            mask = Image.new("L", (self.size, self.size), 0)
+            d = ImageDraw.Draw(mask)
+            font = get_font(self._scaled(font_size))
+            x = (self.size - text_width(d, text, font)) // 2
+            d.text((x, self._scaled(y)), text, fill=255, font=font)
+            bbox = mask.getbbox()
+            if bbox:
+                layer.append((bbox[:2], mask.crop(bbox)))
+
+        self._static_layers[key] = layer
+        return layer
+
+    def layout(self, title_text):
+        """只排版不繪製（dry-run）：回傳 text_layout.Layout，可用 .fits 檢查標題是否放得下"""
+        return text_layout.fit_text(
+            title_text,
+            get_font,
+            max_width=self.size - 2 * self.margin,
+            font_size=self.title_size,
+            min_font_size=self.min_title_size,
+            max_lines=self.max_lines,
+        )
+
+    def render(self, title_text, bg_color=None):
+        """
+        繪製一張貼文圖片
+        Args:
+            title_text: 圖片上的短標題
+            bg_color: 背景色，None 表示隨機淺色
+        Returns:
+            RGB 模式的 PIL Image
+        """
+        img = Image.new("RGB", (self.size, self.size), color=bg_color or random_background())
+        for offset, mask in self.static_layer():
+            img.paste(self.text_color, offset + (offset[0] + mask.width, offset[1] + mask.height), mask)
+
+        d = ImageDraw.Draw(img)
+        layout = self.layout(title_text)
+        font_title = get_font(layout.font_size)
+
+        # 計算總高度以垂直置中，標題往下移給 LOGO 留出空間
+        start_y = (self.size - layout.height) // 2 - self._scaled(50)
+        for i, (line, width) in enumerate(zip(layout.lines, layout.widths)):
+            x = round((self.size - width) / 2)
+            d.text((x, start_y + i * layout.line_height), line, fill=self.text_color, font=font_title)
+        return img
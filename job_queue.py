@@ -0,0 +1,231 @@
+"""
+分段處理的持久化工作佇列
+
+一則新聞依序經過 extract（抓文章）→ generate（OpenAI 生成）→ render（繪製 IG 圖片）→ publish（發文），
+每段完成後把產出寫回同一筆工作 (checkpoint)，下一段的 worker 再接手。
+
+- 以 SQLite 保存，path 為 None（或無法開檔）時使用記憶體資料庫
+- 重啟後從上次完成的階段繼續，已生成的文案與圖片不會重做（不會重複付費呼叫 OpenAI）
+- 某段失敗只重試該段（指數退避），超過次數才放棄
+- 發文中途被中斷的工作不會自動重發（無法確定是否已經發出），標記為失敗
+"""
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+STAGES = ("extract", "generate", "render", "publish")
+DONE = "done"
+
+# 工作狀態
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    url TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    image BLOB,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (stage, status, available_at);
+"""
+
+
+@dataclass
+class Job:
+    url: str
+    stage: str
+    payload: dict = field(default_factory=dict)
+    image: bytes = None
+    attempts: int = 0
+    created_at: float = 0.0
+
+
+class JobQueue:
+    """
+    Args:
+        path: SQLite 檔路徑；None 表示只存在記憶體
+        max_attempts: 同一階段最多嘗試次數
+        retry_delay: 第一次重試前等待秒數（之後每次加倍）
+        max_age: 新聞在佇列中超過此秒數仍未發出即視為過時，None 表示不限
+    """
+
+    def __init__(self, path=None, max_attempts=3, retry_delay=30, max_age=48 * 3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_age = max_age
+        self._db = self._connect(path)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    @staticmethod
+    def _connect(path):
+        if path:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                return sqlite3.connect(path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ 無法開啟工作佇列 {path}，改用記憶體: {e}")
+        return sqlite3.connect(":memory:")
+
+    def close(self):
+        self._db.close()
+
+    def _update(self, url, **values):
+        values["updated_at"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in values)
+        self._db.execute(f"UPDATE jobs SET {columns} WHERE url = ?", (*values.values(), url))
+        self._db.commit()
+
+    def __contains__(self, url):
+        return self._db.execute("SELECT 1 FROM jobs WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, url, stage="extract", payload=None):
+        """新增工作；同一網址已存在（不論狀態）時不重複新增"""
+        now = time.time()
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO jobs (url, stage, status, payload, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, stage, PENDING, json.dumps(payload or {}, ensure_ascii=False), now, now, now),
+        )
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    def claim(self, stage):
+        """
+        取出該階段最舊、可執行的一筆工作並標記為執行中（過時的工作直接放棄）
+        Returns:
+            Job 或 None
+        """
+        now = time.time()
+        if self.max_age is not None:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?"
+                " WHERE status = ? AND created_at < ?",
+                (SKIPPED, "過時", now, PENDING, now - self.max_age),
+            )
+            if cursor.rowcount:
+                print(f"🗑️ 放棄 {cursor.rowcount} 則過時的新聞")
+            self._db.commit()
+        row = self._db.execute(
+            "SELECT url, stage, payload, image, attempts, created_at FROM jobs"
+            " WHERE stage = ? AND status = ? AND available_at <= ?"
+            " ORDER BY created_at LIMIT 1",
+            (stage, PENDING, now),
+        ).fetchone()
+        if row is None:
+            return None
+        self._update(row[0], status=RUNNING)
+        return Job(url=row[0], stage=row[1], payload=json.loads(row[2]), image=row[3], attempts=row[4],
+                   created_at=row[5])
+
+    def checkpoint(self, job, next_stage, payload=None, image=None):
+        """保存這一階段的產出並交給下一階段"""
+        job.payload.update(payload or {})
+        values = {
+            "stage": next_stage,
+            "status": PENDING,
+            "payload": json.dumps(job.payload, ensure_ascii=False),
+            "attempts": 0,
+            "error": None,
+            "available_at": time.time(),
+        }
+        if image is not None:
+            values["image"] = image
+        self._update(job.url, **values)
+        job.stage = next_stage
+
+    def complete(self, job, note=None):
+        """工作完成（圖片不再需要，一併清掉）"""
+        self._update(job.url, stage=DONE, status=DONE, error=note, image=None)
+
+    def skip(self, job, reason):
+        """不需要處理的工作（例如近似重複），不再重試"""
+        self._update(job.url, status=SKIPPED, error=reason, image=None)
+
+    def retry(self, job, error):
+        """
+        這一階段失敗：稍後重試同一階段，超過次數則放棄
+        Returns:
+            是否還會重試
+        """
+        attempts = job.attempts + 1
+        if attempts >= self.max_attempts:
+            self._update(job.url, status=FAILED, attempts=attempts, error=str(error)[:500])
+            return False
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        self._update(job.url, status=PENDING, attempts=attempts, error=str(error)[:500],
+                     available_at=time.time() + delay)
+        return True
+
+    def recover(self):
+        """
+        啟動時呼叫：上次執行中斷的工作回到待處理；
+        發文階段中斷的無法確定是否已發出，標記為失敗避免重複發文
+        Returns:
+            回到待處理的筆數
+        """
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ? AND stage = ?",
+            (FAILED, "發文中斷，可能已發布", now, RUNNING, "publish"),
+        )
+        cursor = self._db.execute(
+            "UPDATE jobs SET status = ?, available_at = ?, updated_at = ? WHERE status = ?",
+            (PENDING, now, now, RUNNING),
+        )
+        self._db.commit()
+        return cursor.rowcount
+
+    def pending(self, stages=STAGES):
+        """尚未完成（待處理或執行中）的工作數"""
+        marks = ", ".join("?" for _ in stages)
+        row = self._db.execute(
+            f"SELECT COUNT(*) FROM jobs WHERE stage IN ({marks}) AND status IN (?, ?)",
+            (*stages, PENDING, RUNNING),
+        ).fetchone()
+        return row[0]
+
+    def unpublished(self):
+        """還沒交給發文的工作數（不含正在發文中的）"""
+        row = self._db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE (stage != ? AND status IN (?, ?)) OR (stage = ? AND status = ?)",
+            ("publish", PENDING, RUNNING, "publish", PENDING),
+        ).fetchone()
+        return row[0]
+
+    def counts(self):
+        """{階段: 未完成筆數}"""
+        rows = self._db.execute(
+            "SELECT stage, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY stage", (PENDING, RUNNING)
+        ).fetchall()
+        return {stage: count for stage, count in rows}
+
+    def completed_since(self, since):
+        """since 之後完成發文的時間（unix 時間，由舊到新）"""
+        rows = self._db.execute(
+            "SELECT updated_at FROM jobs WHERE status = ? AND updated_at >= ? ORDER BY updated_at", (DONE, since)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, max_age=7 * 86400):
+        """刪除已結束（完成/失敗/略過）超過 max_age 秒的工作"""
+        cursor = self._db.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?",
+            (DONE, FAILED, SKIPPED, time.time() - max_age),
+        )
+        self._db.commit()
+        return cursor.rowcount
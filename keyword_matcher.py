@@ -0,0 +1,87 @@
+"""
+多關鍵字比對（Aho-Corasick 自動機）
+
+一次掃過文字即可找出所有命中的關鍵字與位置，取代逐一 `keyword in text` 的線性掃描。
+"""
+
+
+class KeywordMatcher:
+    """預先編譯的 Aho-Corasick 自動機
+
+    Args:
+        keywords: 關鍵字列表（空字串會被忽略，重複者只保留第一個）
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        outputs = [()]
+
+        # 1) 建立 trie
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(())
+                state = nxt
+            outputs[state] = outputs[state] + (index,)
+
+        # 2) BFS 計算 failure link，並把 goto 展開成完整的轉移表（DFA），
+        #    比對時每個字元只需一次 dict 查詢，不必沿 failure link 回溯
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            table = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                table[ch] = nxt
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+            delta[state] = table
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def find_all(self, text):
+        """回傳所有命中的 (keyword, start) ，依結束位置排序（可重疊）"""
+        if not text:
+            return []
+        delta = self._delta
+        outputs = self._outputs
+        keywords = self.keywords
+        hits = []
+        state = 0
+        for pos, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    keyword = keywords[index]
+                    hits.append((keyword, pos - len(keyword) + 1))
+        return hits
+
+    def search(self, text) -> bool:
+        """只判斷是否有任一關鍵字命中（命中即停）"""
+        if not text:
+            return False
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.keywords)
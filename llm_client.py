@@ -0,0 +1,116 @@
+"""
+共用的 OpenAI 非同步連線
+
+- 整個行程只建立一個 AsyncOpenAI（第一次使用時才建立），重用 SDK 內建的 keep-alive 連線池
+- 逾時可設定（連線逾時與整體逾時分開）
+- 429 / 5xx / 連線錯誤自行重試：優先依照伺服器回傳的 Retry-After，
+  否則以指數退避加隨機抖動；SDK 內建重試關閉（max_retries=0），避免重試次數相乘
+- openai 套件匯入約需 0.5 秒，第一次建立連線時才匯入
+"""
+import asyncio
+import email.utils
+import random
+import time
+
+_settings = {
+    "api_key": None,
+    "timeout": 60.0,
+    "connect_timeout": 10.0,
+    "max_retries": 3,
+}
+_client = None
+
+# 退避時間上限（秒），Retry-After 過大時也以此為上限
+MAX_BACKOFF = 60.0
+
+
+def configure(**settings):
+    """設定 api_key / timeout / connect_timeout / max_retries 等；已建立的連線會在下次使用時重建"""
+    global _client
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"未知的 OpenAI 連線設定: {', '.join(sorted(unknown))}")
+    _settings.update({k: v for k, v in settings.items() if v is not None})
+    _client = None
+
+
+def get_client():
+    """取得共用的 AsyncOpenAI；第一次呼叫時才建立"""
+    global _client
+    if _client is None:
+        import openai
+
+        _client = openai.AsyncOpenAI(
+            api_key=_settings["api_key"],
+            timeout=openai.Timeout(_settings["timeout"], connect=_settings["connect_timeout"]),
+            max_retries=0,
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
+
+
+def _retry_after(error):
+    """從錯誤回應的標頭取出建議等待秒數（retry-after-ms / retry-after 秒數或 HTTP 日期）"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error):
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        # APITimeoutError 是 APIConnectionError 的子類別
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 408 or error.status_code == 409 or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt, error=None):
+    """第 attempt 次（從 1 開始）失敗後要等待的秒數"""
+    suggested = _retry_after(error) if error is not None else None
+    if suggested is not None:
+        return min(suggested, MAX_BACKOFF)
+    return min(MAX_BACKOFF, 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+
+async def chat_completion(**kwargs):
+    """呼叫 chat.completions.create，遇到可重試的錯誤會依 Retry-After / 指數退避重試"""
+    client = get_client()
+    attempt = 0
+    while True:
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            attempt += 1
+            if not _is_retryable(e) or attempt > _settings["max_retries"]:
+                raise
+            delay = backoff_delay(attempt, e)
+            status = getattr(e, "status_code", None) or type(e).__name__
+            print(f"⏳ OpenAI 暫時無法使用 ({status})，{delay:.1f} 秒後重試（第 {attempt} 次）")
+            await asyncio.sleep(delay)
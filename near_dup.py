@@ -0,0 +1,207 @@
+"""
+跨媒體近似重複新聞偵測（MinHash + LSH banding）
+
+同一則健康新聞常在數小時內出現在三立、聯合、中央社、自由等不同網址，
+只比對網址擋不住。這裡以內文的字元 shingle 計算 MinHash 簽章，
+用 LSH 分段 (banding) 找出候選，再以估計的 Jaccard 相似度確認，
+在呼叫 OpenAI 之前就擋下已發過的同一則新聞。
+
+記憶體有上限（筆數與時間視窗），可選擇以附加寫入日誌持久化。
+"""
+import hashlib
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 去除空白與標點，只保留文字與數字
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _shingles(text, k):
+    normalized = _NON_WORD.sub("", text or "").lower()
+    if len(normalized) <= k:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+
+def _stable_hash(shingle):
+    # 不使用內建 hash()：每個行程的種子不同，持久化後無法比對
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _choose_bands(num_perm, threshold):
+    """挑選 bands × rows = num_perm，使 LSH 的 S 曲線門檻 (1/b)^(1/r) 最接近 threshold"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """以 MinHash 簽章保存近期已發新聞，查詢相似度超過門檻者
+
+    Args:
+        path: 日誌檔路徑；None 表示只存在記憶體
+        threshold: 估計 Jaccard 相似度門檻（0~1）
+        window: 保留秒數（時間視窗）
+        max_items: 最多保留筆數
+        num_perm: MinHash 排列數（簽章長度）
+        shingle_size: 字元 shingle 長度
+    """
+
+    def __init__(self, path=None, threshold=0.5, window=72 * 3600, max_items=5000,
+                 num_perm=64, shingle_size=3):
+        self.path = path
+        self.threshold = threshold
+        self.window = window
+        self.max_items = max_items
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+
+        rng = random.Random(20251222)  # 固定種子：簽章必須跨重啟可比對
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._items = OrderedDict()  # url -> (ts, signature)，依加入時間排序
+        self._buckets = [{} for _ in range(self.bands)]
+        self._log_lines = 0
+        if path:
+            self._load()
+
+    # ---------- 簽章 ----------
+    def signature(self, text):
+        hashes = [_stable_hash(s) for s in _shingles(text, self.shingle_size)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows] for i in range(self.bands)]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """估計 Jaccard 相似度：相同位置數值相等的比例"""
+        same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+        return same / len(sig_a)
+
+    # ---------- 查詢 / 新增 ----------
+    def find_duplicate(self, text=None, signature=None):
+        """
+        Returns:
+            (url, similarity) 最相似的已保存新聞；沒有超過門檻者回傳 None
+        """
+        self.evict_expired()
+        signature = signature or self.signature(text)
+        if signature is None:
+            return None
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        best = None
+        for url in candidates:
+            score = self.similarity(signature, self._items[url][1])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (url, score)
+        return best
+
+    def add(self, url, text=None, signature=None, ts=None):
+        signature = signature or self.signature(text)
+        if signature is None:
+            return
+        ts = time.time() if ts is None else ts
+        self._insert(url, ts, signature)
+        if self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(self._format_line(url, ts, signature))
+                self._log_lines += 1
+            except OSError as e:
+                print(f"⚠️ 寫入新聞指紋失敗: {e}")
+        self.evict_expired()
+
+    def __len__(self):
+        return len(self._items)
+
+    # ---------- 內部 ----------
+    def _insert(self, url, ts, signature):
+        if url in self._items:
+            self._remove(url)
+        self._items[url] = (ts, signature)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(url)
+
+    def _remove(self, url):
+        _, signature = self._items.pop(url)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(url)
+                if not members:
+                    del bucket[key]
+
+    def evict_expired(self):
+        """淘汰超出時間視窗或筆數上限的最舊紀錄"""
+        cutoff = time.time() - self.window
+        while self._items:
+            url, (ts, _) = next(iter(self._items.items()))
+            if ts >= cutoff and len(self._items) <= self.max_items:
+                break
+            self._remove(url)
+        if self.path and self._log_lines > 2 * max(len(self._items), 64):
+            self._compact()
+
+    def _format_line(self, url, ts, signature):
+        return f"{ts:.0f}\t{url}\t{','.join(format(v, 'x') for v in signature)}\n"
+
+    def _load(self):
+        rows = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue
+                    try:
+                        signature = tuple(int(v, 16) for v in parts[2].split(","))
+                        rows.append((float(parts[0]), parts[1], signature))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"⚠️ 讀取新聞指紋失敗，改用記憶體: {e}")
+            self.path = None
+            return
+        self._log_lines = len(rows)
+        rows.sort(key=lambda r: r[0])
+        for ts, url, signature in rows:
+            # 簽章長度不同代表 num_perm 設定改過，舊紀錄無法比對
+            if len(signature) == self.num_perm:
+                self._insert(url, ts, signature)
+        self.evict_expired()
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for url, (ts, signature) in self._items.items():
+                    f.write(self._format_line(url, ts, signature))
+            os.replace(tmp_path, self.path)
+            self._log_lines = len(self._items)
+        except OSError as e:
+            print(f"⚠️ 整理新聞指紋失敗: {e}")
@@ -0,0 +1,103 @@
+"""
+預先生成好的貼文佇列
+
+批次模式先把多篇新聞的標題、內文與標籤一次生成好放進佇列，
+發文迴圈直接取用，發文時不必等待 OpenAI。
+
+- 以 JSON 檔保存（寫入時先寫暫存檔再取代），path 為 None 時只存在記憶體
+- 每筆以新聞網址為鍵，同一網址只會排入一次
+- 超過 max_age 的貼文視為過時新聞，取出時會丟棄
+"""
+import json
+import os
+import time
+
+
+class PostQueue:
+    """先進先出的待發貼文佇列
+
+    每筆為 dict：url, title, text, hashtags, article_text, created_at
+
+    Args:
+        path: JSON 檔路徑；None 表示只存在記憶體
+        max_age: 貼文保留秒數，None 表示永久保留
+    """
+
+    def __init__(self, path=None, max_age=48 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._items = []
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 讀取貼文佇列失敗，改用空佇列: {e}")
+            return
+        self._items = [item for item in data if isinstance(item, dict) and item.get("url")]
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._items, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 寫入貼文佇列失敗: {e}")
+
+    def _expired(self, item, now=None):
+        return self.max_age is not None and item.get("created_at", 0) < (now or time.time()) - self.max_age
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, url):
+        return any(item["url"] == url for item in self._items)
+
+    def push(self, url, title, text, hashtags, article_text=None):
+        """排入一篇已生成的貼文；同一網址已在佇列中時不重複排入"""
+        if url in self:
+            return False
+        self._items.append({
+            "url": url,
+            "title": title,
+            "text": text,
+            "hashtags": hashtags,
+            "article_text": article_text,
+            "created_at": time.time(),
+        })
+        self._save()
+        return True
+
+    def pop(self, skip=None):
+        """
+        取出最舊的一篇（過期或 skip(url) 為 True 者直接丟棄）
+        Returns:
+            dict 或 None
+        """
+        now = time.time()
+        changed = False
+        result = None
+        while self._items:
+            item = self._items.pop(0)
+            changed = True
+            if self._expired(item, now):
+                print(f"🗑️ 佇列中的貼文已過時，丟棄：{item['url']}")
+                continue
+            if skip is not None and skip(item["url"]):
+                continue
+            result = item
+            break
+        if changed:
+            self._save()
+        return result
@@ -0,0 +1,123 @@
+"""
+多平台發文：每個平台一個獨立的非同步 worker 與佇列
+
+- 同一篇貼文同時派送到所有已註冊的平台，總耗時約等於最慢的平台，而不是各平台相加
+- 某個平台卡住（例如 IG 上傳前等待、重試）只會排住自己的佇列，不影響其他平台
+- 每個平台有各自的逾時，結果以 PublishResult 回傳
+- 逾時只是不再等待，執行緒中的上傳可能仍在進行並成功，因此結果記為「未知」(unknown)，呼叫端不應重發
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class Post:
+    """要發布的一篇貼文"""
+    text: str
+    image_title: str = None
+    news_url: str = None
+    hashtags: str = None
+    image: object = None  # 預先繪製好的 IG 圖片（image_output.EncodedImage），None 表示發文時再繪製
+
+
+@dataclass
+class PublishResult:
+    """單一平台的發文結果"""
+    platform: str
+    ok: bool
+    elapsed: float = 0.0
+    error: str = None
+    unknown: bool = False  # 逾時：可能仍在背景完成，不可重發
+
+    def summary(self):
+        if self.unknown:
+            status = f"❓ {self.error or '結果未知'}"
+        else:
+            status = "✅" if self.ok else f"❌ {self.error or '失敗'}"
+        return f"{self.platform} {status} ({self.elapsed:.1f}s)"
+
+
+class Publisher:
+    """
+    用法：
+        publisher = Publisher()
+        publisher.register("Facebook", post_to_facebook_handler, timeout=60)
+        results = await publisher.publish(Post(text="..."))
+
+    handler 為 async def handler(post) -> bool；回傳 False 或拋出例外都視為失敗
+    """
+
+    def __init__(self):
+        self._handlers = {}  # 平台名稱 -> (handler, timeout)
+        self._queues = {}
+        self._workers = {}
+
+    @property
+    def platforms(self):
+        return list(self._handlers)
+
+    def register(self, platform, handler, timeout=None):
+        """註冊平台；timeout 為單篇發文的秒數上限（None 表示不限）"""
+        self._handlers[platform] = (handler, timeout)
+
+    def _ensure_workers(self):
+        for platform in self._handlers:
+            worker = self._workers.get(platform)
+            if worker is None or worker.done():
+                self._queues.setdefault(platform, asyncio.Queue())
+                self._workers[platform] = asyncio.create_task(self._worker(platform))
+
+    async def _worker(self, platform):
+        handler, timeout = self._handlers[platform]
+        queue = self._queues[platform]
+        while True:
+            post, future = await queue.get()
+            started = time.monotonic()
+            try:
+                ok = await asyncio.wait_for(handler(post), timeout)
+                result = PublishResult(platform, bool(ok))
+            except asyncio.TimeoutError:
+                result = PublishResult(platform, False, error=f"逾時 {timeout:g} 秒，結果未知", unknown=True)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                result = PublishResult(platform, False, error=str(e)[:200])
+            result.elapsed = time.monotonic() - started
+            if not future.done():
+                future.set_result(result)
+            queue.task_done()
+
+    async def publish(self, post, platforms=None):
+        """
+        把貼文同時派送到所有平台並等待結果
+        Args:
+            platforms: 只派送給這些平台；None 表示所有已註冊的平台
+        Returns:
+            {平台名稱: PublishResult}
+        """
+        targets = [p for p in self._handlers if platforms is None or p in platforms]
+        if not targets:
+            return {}
+        self._ensure_workers()
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for platform in targets:
+            future = loop.create_future()
+            self._queues[platform].put_nowait((post, future))
+            futures[platform] = future
+        results = await asyncio.gather(*futures.values())
+        results = dict(zip(futures, results))
+        print("📊 發文結果：" + "、".join(r.summary() for r in results.values()))
+        return results
+
+    async def close(self):
+        """停止所有 worker（佇列中尚未處理的貼文會被放棄）"""
+        workers = [w for w in self._workers.values() if not w.done()]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
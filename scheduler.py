@@ -0,0 +1,199 @@
+"""
+發文時段規劃
+
+原本每次發文後才 sleep 一段隨機時間，醒來後才開始抓新聞、呼叫 OpenAI，
+所以每篇的實際間隔 = 隨機延遲 + 抓取與生成耗時。這裡改為事先排好未來的發文時段 (slot)：
+
+- 相鄰時段的間隔為隨機延遲 (jitter)，由呼叫端提供（例如 compute_delay）
+- 落在靜音時段（例如 23 點到 7 點）的時段順延到靜音結束後
+- 每天（當地日期）最多發 max_per_day 篇，超過則排到隔天
+- 提前 lead time 開始準備內容；lead time 會依實際準備耗時自動拉長
+- 記錄實際發文時間與時段的落差 (drift)
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+# 預設以台灣時間判斷靜音時段與每日上限（雲端主機通常是 UTC）
+TAIWAN_TZ = timezone(timedelta(hours=8))
+
+
+def parse_quiet_hours(value):
+    """
+    "23-7" -> (23, 7)；空值或格式錯誤回傳 None
+    起訖相同視為沒有靜音時段
+    """
+    if not value:
+        return None
+    try:
+        start, end = (int(part) % 24 for part in str(value).split("-", 1))
+    except ValueError:
+        print(f"⚠️ QUIET_HOURS 格式錯誤（應為 起-訖，例如 23-7）：{value}")
+        return None
+    return None if start == end else (start, end)
+
+
+@dataclass
+class Slot:
+    at: float  # 預定發文時間（unix 時間）
+
+    def describe(self, tz=TAIWAN_TZ):
+        return datetime.fromtimestamp(self.at, tz).strftime("%m-%d %H:%M:%S")
+
+
+class Scheduler:
+    """
+    Args:
+        delay: 回傳相鄰兩篇間隔秒數的函式
+        quiet_hours: (起, 訖) 當地時間的整點，例如 (23, 7)；None 表示全天可發
+        max_per_day: 每天最多幾篇；None 或 0 表示不限
+        lead_time: 至少提前幾秒開始準備內容
+        history: 已發文的 unix 時間（例如從工作佇列取得），用於每日上限與第一個時段
+        tz: 判斷靜音時段與日期的時區
+    """
+
+    def __init__(self, delay, quiet_hours=None, max_per_day=None, lead_time=10 * 60, history=(),
+                 tz=TAIWAN_TZ, clock=time.time):
+        self.delay = delay
+        self.quiet_hours = quiet_hours
+        self.max_per_day = max_per_day or None
+        self.lead_time = lead_time
+        self.tz = tz
+        self.clock = clock
+        self._posted = sorted(history)
+        self._planned = []
+        self._prep_times = deque(maxlen=20)
+        self._drifts = deque(maxlen=50)
+
+    # ---------- 時段規劃 ----------
+    def _local(self, ts):
+        return datetime.fromtimestamp(ts, self.tz)
+
+    def _quiet_end(self, ts):
+        """ts 落在靜音時段時回傳靜音結束的時間，否則 None"""
+        if not self.quiet_hours:
+            return None
+        start, end = self.quiet_hours
+        local = self._local(ts)
+        hour = local.hour
+        in_quiet = start <= hour < end if start < end else (hour >= start or hour < end)
+        if not in_quiet:
+            return None
+        end_at = local.replace(hour=end, minute=0, second=0, microsecond=0)
+        if end_at <= local:
+            end_at += timedelta(days=1)
+        return end_at.timestamp()
+
+    def _day_count(self, ts):
+        day = self._local(ts).date()
+        return sum(1 for t in self._posted + [s.at for s in self._planned] if self._local(t).date() == day)
+
+    def _next_day(self, ts):
+        local = self._local(ts)
+        return (local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+    def _fit(self, ts):
+        """把候選時間移出靜音時段，並遵守每日上限"""
+        for _ in range(366):
+            quiet_end = self._quiet_end(ts)
+            if quiet_end is not None:
+                # 靜音結束後加一點隨機，避免每天都在整點發文
+                ts = quiet_end + random.uniform(0, 15 * 60)
+                continue
+            if self.max_per_day and self._day_count(ts) >= self.max_per_day:
+                ts = self._next_day(ts) + random.uniform(0, 15 * 60)
+                continue
+            return ts
+        return ts
+
+    def _extend(self):
+        now = self.clock()
+        if self._planned:
+            base = self._planned[-1].at + self.delay()
+        elif self._posted:
+            base = self._posted[-1] + self.delay()
+        else:
+            base = now
+        self._planned.append(Slot(self._fit(max(base, now))))
+
+    def plan(self, count=1):
+        """接下來 count 個發文時段（已排好的時段不會再變動）"""
+        while len(self._planned) < count:
+            self._extend()
+        return self._planned[:count]
+
+    def next_slot(self):
+        return self.plan(1)[0]
+
+    def replan(self):
+        """延遲或靜音設定改變後重新排時段"""
+        self._planned.clear()
+
+    # ---------- 準備時間 ----------
+    @property
+    def effective_lead(self):
+        """提前準備的秒數：設定值，或最近最長準備耗時的 1.5 倍（取較大者）"""
+        if not self._prep_times:
+            return self.lead_time
+        return max(self.lead_time, 1.5 * max(self._prep_times))
+
+    def observe_prep(self, seconds):
+        """記錄一篇從開始準備到可以發文的耗時"""
+        self._prep_times.append(seconds)
+
+    def prep_time(self, index=0):
+        """第 index 個時段應該開始準備內容的時間"""
+        return self.plan(index + 1)[index].at - self.effective_lead
+
+    async def wait_until(self, ts):
+        while True:
+            remaining = ts - self.clock()
+            if remaining <= 0:
+                return
+            # 分段睡眠，時段被重新規劃時也能及時醒來
+            await asyncio.sleep(min(remaining, 60))
+
+    async def wait_for_prep(self, index=0):
+        await self.wait_until(self.prep_time(index))
+
+    async def wait_for_slot(self):
+        """等到下一個時段；回傳該時段"""
+        while True:
+            slot = self.next_slot()
+            remaining = slot.at - self.clock()
+            if remaining <= 0:
+                return slot
+            await asyncio.sleep(min(remaining, 60))
+
+    # ---------- 發文紀錄 ----------
+    def record_post(self, at=None):
+        """
+        記錄實際發文並消耗目前的時段
+        Returns:
+            drift 秒數（實際發文時間 - 預定時間）
+        """
+        at = self.clock() if at is None else at
+        slot = self.next_slot()
+        self._planned.pop(0)
+        drift = at - slot.at
+        self._drifts.append(drift)
+        self._posted.append(at)
+        cutoff = at - 2 * 86400
+        self._posted = [t for t in self._posted if t >= cutoff]
+        # 晚到（或發文本身耗時太久）連下一個時段都已經過了：後面的時段重新排，避免連發
+        if self._planned and self._planned[0].at <= max(at, self.clock()):
+            self._planned.clear()
+        return drift
+
+    def drift_stats(self):
+        """{"count", "mean", "max"}（秒）"""
+        if not self._drifts:
+            return {"count": 0, "mean": 0.0, "max": 0.0}
+        return {
+            "count": len(self._drifts),
+            "mean": sum(self._drifts) / len(self._drifts),
+            "max": max(self._drifts),
+        }
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+本地 OpenAI 替身伺服器（測試批次模式用，不會產生任何費用）
+
+支援：
+    POST /v1/chat/completions
+    POST /v1/files                 （purpose=batch 的 JSONL 上傳）
+    GET  /v1/files/{id}/content
+    POST /v1/batches
+    GET  /v1/batches/{id}
+
+每個請求都回傳固定格式的 JSON 貼文（標題取自使用者訊息開頭），
+batch 建立後經過 --delay 秒才會變成 completed。
+
+用法：
+    python scripts/fake_openai_server.py --port 8765 --delay 3
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 MODE=batch python autopost.py
+"""
+import argparse
+import itertools
+import json
+import time
+
+from aiohttp import web
+
+_ids = itertools.count(1)
+files = {}
+batches = {}
+
+
+def _next_id(prefix):
+    return f"{prefix}-{next(_ids)}"
+
+
+def fake_completion(body):
+    user = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+    first_line = (user.strip().splitlines() or ["測試"])[0]
+    post = {
+        "title": first_line[:12] or "測試標題",
+        "text": f"（測試）{first_line[:40]}",
+        "hashtags": ["#測試", "#健康"],
+    }
+    return {
+        "id": _next_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": json.dumps(post, ensure_ascii=False)},
+        }],
+        "usage": {"prompt_tokens": len(user), "completion_tokens": 30, "total_tokens": len(user) + 30},
+    }
+
+
+def _file_object(file_id, purpose, size):
+    return {
+        "id": file_id, "object": "file", "bytes": size, "created_at": int(time.time()),
+        "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed",
+    }
+
+
+async def chat_completions(request):
+    return web.json_response(fake_completion(await request.json()))
+
+
+async def upload_file(request):
+    form = await request.post()
+    upload = form["file"]
+    data = upload.file.read()
+    file_id = _next_id("file")
+    files[file_id] = data
+    return web.json_response(_file_object(file_id, form.get("purpose", "batch"), len(data)))
+
+
+async def file_content(request):
+    data = files.get(request.match_info["file_id"])
+    if data is None:
+        return web.json_response({"error": {"message": "file not found"}}, status=404)
+    return web.Response(body=data, content_type="application/octet-stream")
+
+
+def _run_batch(batch):
+    """把輸入檔的每一行轉成輸出行"""
+    output = []
+    for line in files[batch["input_file_id"]].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        output.append(json.dumps({
+            "id": _next_id("batch_req"),
+            "custom_id": row["custom_id"],
+            "response": {"status_code": 200, "request_id": _next_id("req"), "body": fake_completion(row["body"])},
+            "error": None,
+        }, ensure_ascii=False))
+    output_id = _next_id("file")
+    files[output_id] = ("\n".join(output) + "\n").encode("utf-8")
+    batch.update(
+        status="completed",
+        output_file_id=output_id,
+        completed_at=int(time.time()),
+        request_counts={"total": len(output), "completed": len(output), "failed": 0},
+    )
+
+
+async def create_batch(request):
+    body = await request.json()
+    if body.get("input_file_id") not in files:
+        return web.json_response({"error": {"message": "input file not found"}}, status=400)
+    batch_id = _next_id("batch")
+    batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": body.get("endpoint"),
+        "input_file_id": body["input_file_id"],
+        "completion_window": body.get("completion_window", "24h"),
+        "status": "validating",
+        "created_at": int(time.time()),
+        "output_file_id": None,
+        "error_file_id": None,
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+    }
+    return web.json_response(batches[batch_id])
+
+
+async def retrieve_batch(request):
+    batch = batches.get(request.match_info["batch_id"])
+    if batch is None:
+        return web.json_response({"error": {"message": "batch not found"}}, status=404)
+    delay = request.app["delay"]
+    if batch["status"] != "completed":
+        if time.time() - batch["created_at"] >= delay:
+            _run_batch(batch)
+        else:
+            batch["status"] = "in_progress"
+    return web.json_response(batch)
+
+
+def create_app(delay=3.0):
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["delay"] = delay
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/files", upload_file)
+    app.router.add_get("/v1/files/{file_id}/content", file_content)
+    app.router.add_post("/v1/batches", create_batch)
+    app.router.add_get("/v1/batches/{batch_id}", retrieve_batch)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 替身伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=3.0, help="batch 完成前的等待秒數")
+    args = parser.parse_args()
+    print(f"🧪 OpenAI 替身伺服器：http://{args.host}:{args.port}/v1")
+    web.run_app(create_app(args.delay), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
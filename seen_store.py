@@ -0,0 +1,122 @@
+"""
+已發文網址索引：以正規化網址為鍵、記憶體雜湊表 + 附加寫入 (append-only) 日誌
+
+- 查詢 O(1)，超過 TTL 的紀錄視為未看過並在整理時淘汰
+- path 為 None 時只存在記憶體（例如 USE_LOCAL_FILES=false 的雲端部署）
+- 日誌每行為 "<unix 時間>\t<正規化網址>"，過期紀錄過多時會重寫壓縮
+"""
+import os
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 追蹤用參數，不影響文章內容
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid"}
+
+
+def canonicalize_url(url):
+    """正規化網址：小寫 scheme/host、去除預設埠、fragment 與追蹤參數，並排序 query"""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class SeenStore:
+    """已看過（已發文）的網址集合
+
+    Args:
+        path: 日誌檔路徑；None 表示只存在記憶體
+        ttl: 紀錄保留秒數，None 表示永久保留
+    """
+
+    def __init__(self, path=None, ttl=14 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._seen = {}
+        self._log_lines = 0
+        self._adds_since_evict = 0
+        if path:
+            self._load()
+
+    def _expired(self, ts, now=None):
+        return self.ttl is not None and ts < (now or time.time()) - self.ttl
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    ts, _, key = line.rstrip("\n").partition("\t")
+                    if not key:
+                        continue
+                    try:
+                        self._seen[key] = max(float(ts), self._seen.get(key, 0))
+                    except ValueError:
+                        continue
+                    self._log_lines += 1
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"⚠️ 讀取已發文紀錄失敗，改用記憶體: {e}")
+            self.path = None
+            return
+        self.evict_expired()
+
+    def __contains__(self, url):
+        ts = self._seen.get(canonicalize_url(url))
+        return ts is not None and not self._expired(ts)
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, url, ts=None):
+        key = canonicalize_url(url)
+        if not key:
+            return
+        ts = time.time() if ts is None else ts
+        self._seen[key] = ts
+        self._adds_since_evict += 1
+        if self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(f"{ts:.0f}\t{key}\n")
+                self._log_lines += 1
+            except OSError as e:
+                print(f"⚠️ 寫入已發文紀錄失敗: {e}")
+        # 定期淘汰過期紀錄；日誌中重複或過期的行超過一半時也會重寫
+        if self._adds_since_evict >= 256 or self._log_lines > 2 * max(len(self._seen), 64):
+            self.evict_expired()
+
+    def evict_expired(self):
+        """淘汰過期紀錄；日誌有多餘行數時重寫"""
+        now = time.time()
+        self._adds_since_evict = 0
+        for key in [k for k, ts in self._seen.items() if self._expired(ts, now)]:
+            del self._seen[key]
+        if self.path and self._log_lines > len(self._seen):
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, ts in self._seen.items():
+                    f.write(f"{ts:.0f}\t{key}\n")
+            os.replace(tmp_path, self.path)
+            self._log_lines = len(self._seen)
+        except OSError as e:
+            print(f"⚠️ 整理已發文紀錄失敗: {e}")
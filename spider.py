@@ -1,194 +1,418 @@
-﻿from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-import aiohttp
+﻿from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from urllib.parse import urljoin
+import asyncio
+import codecs
+import random
+import time
 import re
 
-# 你可以自己擴充這些關鍵字
+from html_backend import parse_html
+from http_cache import HttpCache
+from keyword_matcher import KeywordMatcher
+from spider_client import SpiderClient
+from stream_parser import AnchorStreamParser
+
+# 你可以自己擴充這些關鍵字（執行中要修改請呼叫 set_keywords() 以重建比對自動機）
 KEYWORDS = [
     "醫療", "健康", "醫師", "醫院", "診所", "疫苗", "流感", "癌症", "中醫",
     "健保", "過敏", "感冒", "糖尿病", "血壓", "減肥", "保健", "作息",
     "壓力", "焦慮", "失眠", "健身", "飲食", "營養", "養生", "睡眠",
-    "運動", "瑜珈", "伸展", "放鬆", "心理", "療癒", "生活","衛生","醫:","營養師","脂肪","心臟","肺炎","新冠","肺炎","新冠肺炎","阿茲海默"
-    "肺癌","中風","骨質疏鬆","關節炎","自律神經","憂鬱症","失智症","帕金森氏症","腦中風","心肌梗塞","高血壓","高血脂","痛風","肝炎","腎臟病","胃潰瘍","腸胃炎","過動症","過敏性鼻炎"
-    "哮喘","乳癌","子宮頸癌","大腸癌","攝護腺癌","甲狀腺","更年期","月經不調","不孕症","試管嬰兒","避孕","性病","愛滋病","牙周病","蛀牙","視力","聽力","失聰","白內障","青光眼"
-    "罹癌","猝死","安眠藥","抗生素","止痛藥","疫苗接種","流感疫苗","新冠疫苗","基因檢測","健康檢查","體檢","健保卡","醫療保險"
+    "運動", "瑜珈", "伸展", "放鬆", "心理", "療癒", "生活", "衛生", "醫:", "營養師", "脂肪", "心臟", "肺炎", "新冠", "新冠肺炎", "阿茲海默",
+    "肺癌", "中風", "骨質疏鬆", "關節炎", "自律神經", "憂鬱症", "失智症", "帕金森氏症", "腦中風", "心肌梗塞", "高血壓", "高血脂", "痛風", "肝炎", "腎臟病", "胃潰瘍", "腸胃炎", "過動症", "過敏性鼻炎",
+    "哮喘", "乳癌", "子宮頸癌", "大腸癌", "攝護腺癌", "甲狀腺", "更年期", "月經不調", "不孕症", "試管嬰兒", "避孕", "性病", "愛滋病", "牙周病", "蛀牙", "視力", "聽力", "失聰", "白內障", "青光眼",
+    "罹癌", "猝死", "安眠藥", "抗生素", "止痛藥", "疫苗接種", "流感疫苗", "新冠疫苗", "基因檢測", "健康檢查", "體檢", "健保卡", "醫療保險"
 ]
 
-# 新聞來源設定
+# 新聞來源設定（宣告式規格，由 fetch_source_candidate 這個通用引擎執行）
+#   tag:          日誌前綴
+#   selectors:    依序嘗試的選擇規則，第一個有結果的規則生效
+#                 {"css": "..."} 或
+#                 {"tags": [...], "class_contains": [...], "class_contains_i": [...]}
+#                 （class 含任一子字串即符合；_i 為不分大小寫）
+#   path_filter:  完整網址須包含其中任一子字串（可省略）
+#   path_regex:   完整網址須符合的正規表示式（可省略）
+#   verify_ssl:   是否驗證 SSL 憑證（預設 True）
+#   encoding:     強制的網頁編碼（預設依回應標頭）
+#   min_interval: 同一來源兩次請求的最短間隔秒數（預設 0）
+#   stream:       是否預設使用串流提前結束模式（預設依 SpiderClient.stream_listings）
+#   stream_href:  串流模式下辨識新聞連結的網址子字串（預設沿用 path_filter）
 NEWS_SOURCES = {
     "setn": {
         "name": "三立新聞網",
+        "tag": "SETN",
         "url": "https://www.setn.com/ViewAll.aspx",
-        "health_section": "https://health.setn.com/"
+        "health_section": "https://health.setn.com/",
+        "selectors": [
+            {"css": 'div.news-item a, div.newsItems a, h3.view-li-title a, article a[href*="/news/"]'},
+        ],
+        "path_filter": ["/news/", "/News/"],
     },
     "udn": {
         "name": "聯合新聞網",
+        "tag": "UDN",
         "url": "https://health.udn.com/health/index",  # 元氣網健康頻道
-        "health_section": "https://health.udn.com/health/index"
+        "health_section": "https://health.udn.com/health/index",
+        # UDN 的文章列表通常在 dt 或 h2 標籤中；備選方案：找所有連結
+        "selectors": [
+            {"tags": ["dt", "h2", "h3"], "class_contains": ["story", "title"]},
+            {"css": 'a[href*="/story/"]'},
+        ],
+        "stream_href": ["/story/"],
     },
     "cna": {
         "name": "中央社",
+        "tag": "CNA",
         "url": "https://www.cna.com.tw/list/ahel.aspx",  # 生活頻道
-        "health_section": "https://www.cna.com.tw/list/ahel.aspx"
+        "health_section": "https://www.cna.com.tw/list/ahel.aspx",
+        "selectors": [
+            {"tags": ["h2", "div", "a"], "class_contains_i": ["title"], "class_contains": ["mainList"]},
+            {"css": 'a[href*="/news/"], div.listInfo a'},
+        ],
+        "stream_href": ["/news/"],
+        "verify_ssl": False,  # 憑證鏈不完整，忽略 SSL 驗證
     },
     "ltn": {
         "name": "自由時報",
+        "tag": "LTN",
         "url": "https://health.ltn.com.tw/",  # 健康網
-        "health_section": "https://health.ltn.com.tw/"
+        "health_section": "https://health.ltn.com.tw/",
+        "selectors": [
+            {"tags": ["h3", "h2", "div"], "class_contains_i": ["title"], "class_contains": ["text"]},
+            {"css": 'a[href*="/article/"]'},
+        ],
+        "stream_href": ["/article/"],
     },
     "tvbs": {
         "name": "TVBS新聞網",
+        "tag": "TVBS",
         "url": "https://health.tvbs.com.tw/",
-        "health_section": "https://health.tvbs.com.tw/"
-    }
+        "health_section": "https://health.tvbs.com.tw/",
+        # 文章網址為 /<分類>/<數字編號>，例如 /medical/358123
+        "selectors": [
+            {"tags": ["h2", "h3", "div"], "class_contains_i": ["title"]},
+            {"css": 'a[href*="health.tvbs.com.tw/"], a[href^="/"]'},
+        ],
+        "path_regex": r"health\.tvbs\.com\.tw/[a-z_-]+/\d+",
+        "min_interval": 2,
+    },
 }
 
-def is_health_related(text: str) -> bool:
-    if not text:
-        return False
-    for keyword in KEYWORDS:
-        if keyword in text:
-            return True
-    return False
+def create_spider_client(cache_path=None, **kwargs) -> SpiderClient:
+    """建立共用的爬蟲用戶端
+    SSL 政策與請求間隔取自 NEWS_SOURCES 的 verify_ssl / min_interval；列表頁使用條件式請求快取
+    （cache_path 為 None 時只存在記憶體）
+    """
+    ssl_policy = {code: cfg.get("verify_ssl", True) for code, cfg in NEWS_SOURCES.items()}
+    ssl_policy.update(kwargs.pop("ssl_policy", None) or {})
+    rate_limits = {code: cfg["min_interval"] for code, cfg in NEWS_SOURCES.items() if cfg.get("min_interval")}
+    rate_limits.update(kwargs.pop("rate_limits", None) or {})
+    kwargs.setdefault("cache", HttpCache(cache_path))
+    return SpiderClient(ssl_policy=ssl_policy, rate_limits=rate_limits, **kwargs)
 
 
-async def getnews(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, timeout=20) as inner_response:
-            if inner_response.status == 200:
-                inner_html = await inner_response.text()
+@asynccontextmanager
+async def _client_scope(client=None):
+    """有傳入 client 就直接使用；否則建立一次性的 client 並在結束時關閉"""
+    if client is not None:
+        yield client
+        return
+    async with create_spider_client() as temp_client:
+        yield temp_client
 
-                soup = BeautifulSoup(inner_html, 'html.parser')
 
-                # 抓文章本體
-                word = soup.find_all('article')
+_matcher = None
 
-                titles1 = []
-                for title_tag in word:
-                    title1 = title_tag.text.strip()
-                    remove = "我是廣告 請繼續往下閱讀"
-                    title1 = title1.replace(remove, "")
 
-                    lines = title1.splitlines()
-                    title1 = '\n'.join(line for line in lines if line.strip())
-                    titles1.append(title1)
+def _keyword_matcher() -> KeywordMatcher:
+    """取得關鍵字自動機（第一次使用時建立；修改關鍵字請呼叫 set_keywords）"""
+    global _matcher
+    if _matcher is None:
+        _matcher = KeywordMatcher(KEYWORDS)
+    return _matcher
 
-                return titles1
 
-            else:
-                print(f"無法獲取網頁內容，狀態碼：{inner_response.status}")
-                return ["讀取失敗"]
+def set_keywords(keywords):
+    """替換關鍵字列表（去除重複）並重建自動機"""
+    global _matcher
+    KEYWORDS[:] = dict.fromkeys(k for k in keywords if k)
+    _matcher = KeywordMatcher(KEYWORDS)
+    return _matcher
 
 
-async def setn_fetch_url(url):
-    """抓取三立新聞網健康相關新聞"""
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=20) as response:
-                if response.status != 200:
-                    print('[SETN] 網頁載入失敗:', response.status)
-                    return None
-                html = await response.text()
-        except Exception as ex:
-            print('[SETN] 請求失敗:', ex)
-            return None
-
-    soup = BeautifulSoup(html, 'html.parser')
+def match_keywords(text: str):
+    """回傳 text 中命中的所有 (keyword, start)"""
+    return _keyword_matcher().find_all(text)
 
-    # 針對健康專區的選擇器
-    articles = soup.select('div.news-item a, div.newsItems a, h3.view-li-title a, article a[href*="/news/"]')
-    
-    if not articles:
-        print("[SETN] 找不到新聞標題")
-        return None
 
-    fallback_url = None
-
-    for a_tag in articles:
-        if not a_tag:
-            continue
+def is_health_related(text: str) -> bool:
+    return _keyword_matcher().search(text)
+
+
+# ==================== 單篇文章：一次下載、一次解析 ====================
+@dataclass
+class Article:
+    """fetch_article 的結構化結果"""
+    url: str
+    status: int
+    paragraphs: list = field(default_factory=list)  # 清理後的內文段落
+    title: str = None
+    image: str = None  # og:image / twitter:image
+    published_at: str = None
+    canonical_url: str = None
+
+    @property
+    def ok(self):
+        return self.status == 200
+
+    @cached_property
+    def text(self):
+        """段落以空白串接，供生成內文與標籤共用"""
+        return " ".join(self.paragraphs)
+
+
+def _meta_content(soup, *keys):
+    """依序以 property / name / itemprop 找 <meta>，回傳第一個有值的 content"""
+    for key in keys:
+        for attr in ("property", "name", "itemprop"):
+            tag = soup.find("meta", attrs={attr: key})
+            if tag and tag.get("content"):
+                return tag.get("content").strip()
+    return None
 
-        title = a_tag.get_text(strip=True)
-        href = a_tag.get('href', '').strip()
 
-        if not href or len(title) < 5:
-            continue
+def parse_article(html, url, status=200):
+    """把文章頁解析成 Article（內文、縮圖、標題、發布時間、canonical）"""
+    soup = parse_html(html)
+
+    # 抓文章本體
+    paragraphs = []
+    for article_tag in soup.find_all('article'):
+        body = article_tag.text.strip()
+        remove = "我是廣告 請繼續往下閱讀"
+        body = body.replace(remove, "")
+
+        lines = body.splitlines()
+        body = '\n'.join(line for line in lines if line.strip())
+        paragraphs.append(body)
+
+    title = _meta_content(soup, "og:title", "twitter:title")
+    if not title:
+        title_tag = soup.find("title")
+        title = title_tag.get_text(strip=True) if title_tag else None
+
+    published_at = _meta_content(soup, "article:published_time", "pubdate", "datePublished", "date")
+    if not published_at:
+        time_tag = soup.find("time")
+        if time_tag:
+            published_at = time_tag.get("datetime") or time_tag.get_text(strip=True) or None
+
+    canonical_tag = soup.find("link", rel="canonical")
+    canonical_url = canonical_tag.get("href") if canonical_tag else None
+    canonical_url = canonical_url or _meta_content(soup, "og:url")
+    if canonical_url:
+        canonical_url = urljoin(url, canonical_url)
+
+    return Article(
+        url=url,
+        status=status,
+        paragraphs=paragraphs,
+        title=title,
+        image=_meta_content(soup, "og:image", "twitter:image"),
+        published_at=published_at,
+        canonical_url=canonical_url,
+    )
+
+
+async def fetch_article(url, client=None, refresh=False):
+    """
+    下載並解析單篇文章；成功的結果會記在 client 上，同一輪內重複呼叫不再下載
+    Args:
+        client: 共用的 SpiderClient（呼叫 client.new_cycle() 清除記憶）
+        refresh: True 時忽略記憶重新下載
+    Returns:
+        Article（下載失敗時 ok 為 False、paragraphs 為空）
+    """
+    if client is not None and not refresh:
+        memo = client.article_memo.get(url)
+        if memo is not None:
+            return memo
 
-        if href.startswith(('http://', 'https://')):
-            full_url = href
-        else:
-            full_url = urljoin(url, href)
+    async with _client_scope(client) as scoped:
+        async with scoped.get(url) as response:
+            if response.status != 200:
+                return Article(url=url, status=response.status)
+            html = await response.text()
 
-        # 過濾非新聞連結
-        if '/news/' not in full_url and '/News/' not in full_url:
-            continue
+    article = parse_article(html, url)
+    if client is not None:
+        client.article_memo[url] = article
+    return article
 
-        if fallback_url is None:
-            fallback_url = full_url
 
-        if is_health_related(title):
-            print(f"✅ [SETN] 命中健康新聞：{title}")
-            return full_url
-        else:
-            print(f"⏭️  [SETN] 跳過：{title}")
+async def getnews(url, client=None):
+    article = await fetch_article(url, client=client)
+    if not article.ok:
+        print(f"無法獲取網頁內容，狀態碼：{article.status}")
+        return ["讀取失敗"]
+    return article.paragraphs
 
-    print("⚠️ [SETN] 未找到健康相關新聞，使用第一篇")
-    return fallback_url
 
-async def fetch_news_preview(url):
+async def fetch_news_preview(url, client=None):
     """
     取得新聞 og:image（縮圖）
     """
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=20) as r:
-                html = await r.text()
-        except:
+    try:
+        article = await fetch_article(url, client=client)
+    except Exception:
+        return None
+    return article.image
+
+
+# ==================== 通用列表爬蟲引擎 ====================
+@dataclass
+class NewsCandidate:
+    """單一來源抓到的候選新聞"""
+    url: str
+    title: str
+    source: str
+    healthy: bool  # 標題是否命中健康關鍵字（False 代表是「第一篇」備援）
+    score: int = 0  # 命中的不重複關鍵字數
+    elapsed: float = 0.0
+
+
+class _CandidatePicker:
+    """逐筆檢查 (title, full_url)：第一篇健康新聞即命中，否則記住第一篇作為備援
+    提供 seen（SeenStore）時，已發過的新聞在下載文章前就會被略過；skip(url) 為 True 的新聞
+    （例如已在工作佇列中）同樣略過。備援固定是列表上的第一篇：列表上有健康新聞但都已略過，
+    或第一篇本身已略過時，這一輪不發（不會一路往下改發其他非健康新聞）
+    """
+
+    def __init__(self, tag, source, seen=None, skip=None):
+        self.tag = tag
+        self.source = source
+        self.seen = seen
+        self.skip = skip
+        self.fallback = None
+        self.first_skipped = False  # 列表第一篇已發過或處理中
+        self.offered = 0
+        self.skipped_seen = 0
+        self.skipped_healthy = 0
+
+    def offer(self, title, full_url):
+        """命中健康關鍵字時回傳 NewsCandidate，否則回傳 None"""
+        hits = match_keywords(title)
+        skipped = (self.seen is not None and full_url in self.seen) or (self.skip is not None and self.skip(full_url))
+        self.offered += 1
+        if self.offered == 1:
+            # 備援只考慮第一篇（在略過判斷之前記下）
+            self.first_skipped = skipped
+            if not skipped:
+                self.fallback = (title, full_url)
+        if skipped:
+            self.skipped_seen += 1
+            if hits:
+                self.skipped_healthy += 1
+            return None
+
+        if hits:
+            print(f"✅ [{self.tag}] 命中健康新聞：{title}")
+            score = len({keyword for keyword, _ in hits})
+            return NewsCandidate(full_url, title, self.source, healthy=True, score=score)
+        print(f"⏭️  [{self.tag}] 跳過：{title}")
+        return None
+
+    def finish(self):
+        if self.skipped_seen:
+            print(f"🔁 [{self.tag}] 略過 {self.skipped_seen} 則已發過或處理中的新聞")
+        if self.skipped_healthy:
+            print(f"💤 [{self.tag}] 健康新聞都已發過或處理中，這一輪不發")
+            return None
+        if self.first_skipped:
+            print(f"💤 [{self.tag}] 未找到健康相關新聞，第一篇已發過或處理中，這一輪不發")
             return None
+        if self.fallback is None:
+            return None
+        print(f"⚠️ [{self.tag}] 未找到健康相關新聞，使用第一篇")
+        return NewsCandidate(self.fallback[1], self.fallback[0], self.source, healthy=False)
 
-    soup = BeautifulSoup(html, "html.parser")
 
-    # 1. OG IMAGE
-    og_img = soup.find("meta", property="og:image")
-    if og_img and og_img.get("content"):
-        return og_img.get("content")
+def _pick_candidate(tag, source, entries, seen=None, skip=None):
+    """
+    從 (title, full_url) 列表中挑出第一篇未發過的健康新聞；列表上完全沒有健康新聞才退回第一篇
+    Returns:
+        NewsCandidate 或 None
+    """
+    picker = _CandidatePicker(tag, source, seen, skip)
+    for title, full_url in entries:
+        candidate = picker.offer(title, full_url)
+        if candidate:
+            return candidate
+    return picker.finish()
 
-    # 2. Twitter image
-    tw_img = soup.find("meta", property="twitter:image")
-    if tw_img and tw_img.get("content"):
-        return tw_img.get("content")
 
-    return None
+def _candidate_url(candidate):
+    return candidate.url if candidate else None
 
 
-# ==================== 聯合新聞網 UDN ====================
-async def udn_fetch_url(url):
-    """抓取聯合新聞網健康相關新聞"""
-    async with aiohttp.ClientSession() as session:
+async def _fetch_listing_entries(tag, source, url, client, parse):
+    """
+    下載列表頁並解析成 (title, full_url)；列表未變更 (304) 時直接沿用上次的解析結果
+    Args:
+        parse: parse(html, url) -> entries 或 None
+    """
+    spec = NEWS_SOURCES.get(source, {})
+    async with _client_scope(client) as client:
         try:
-            async with session.get(url, timeout=20) as response:
-                if response.status != 200:
-                    print(f'[UDN] 網頁載入失敗: {response.status}')
-                    return None
-                html = await response.text()
+            status, html, cache_entry = await client.get_conditional(
+                url, source=source, encoding=spec.get("encoding")
+            )
         except Exception as ex:
-            print(f'[UDN] 請求失敗: {ex}')
+            print(f'[{tag}] 請求失敗: {ex}')
             return None
-
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # UDN 的文章列表通常在 dt 或 h2 標籤中
-    articles = soup.find_all(['dt', 'h2', 'h3'], class_=lambda x: x and ('story' in x or 'title' in x))
-    
-    if not articles:
-        # 備選方案：找所有連結
-        articles = soup.select('a[href*="/story/"]')
-    
-    if not articles:
-        print("[UDN] 找不到新聞標題")
+    if html is None:
+        print(f'[{tag}] 網頁載入失敗: {status}')
         return None
 
-    fallback_url = None
+    if status == 304 and cache_entry.parsed is not None:
+        print(f"♻️ [{tag}] 列表未變更 (304)，沿用快取解析結果")
+        return cache_entry.parsed
+
+    entries = parse(html, url)
+    if cache_entry is not None:
+        cache_entry.parsed = entries
+    return entries
+
+
+def _class_rule(rule):
+    """把 class_contains / class_contains_i 轉成 find_all 的 class_ 判斷函式"""
+    needles = rule.get("class_contains", [])
+    needles_i = [n.lower() for n in rule.get("class_contains_i", [])]
+
+    def _match(x):
+        if not x:
+            return False
+        lowered = x.lower()
+        return any(n in x for n in needles) or any(n in lowered for n in needles_i)
+
+    return _match
+
+
+def _select_articles(soup, selectors):
+    for rule in selectors:
+        if "css" in rule:
+            articles = soup.select(rule["css"])
+        else:
+            articles = soup.find_all(rule["tags"], class_=_class_rule(rule))
+        if articles:
+            return articles
+    return []
+
+
+def _extract_entries(articles, url):
+    """把列表元素（或其內的第一個 <a>）轉成 (title, full_url)"""
+    entries = []
 
     for article in articles:
         a_tag = article.find('a') if article.name != 'a' else article
@@ -201,189 +425,334 @@ async def udn_fetch_url(url):
         if not href or len(title) < 5:
             continue
 
-        full_url = urljoin(url, href) if not href.startswith('http') else href
-
-        if fallback_url is None:
-            fallback_url = full_url
-
-        if is_health_related(title):
-            print(f"✅ [UDN] 命中健康新聞：{title}")
-            return full_url
-        else:
-            print(f"⏭️  [UDN] 跳過：{title}")
+        full_url = urljoin(url, href) if not href.startswith(('http://', 'https://')) else href
+        entries.append((title, full_url))
 
-    print("⚠️ [UDN] 未找到健康相關新聞，使用第一篇")
-    return fallback_url
+    return entries
 
 
-# ==================== 中央社 CNA ====================
-async def cna_fetch_url(url):
-    """抓取中央社健康相關新聞"""
-    async with aiohttp.ClientSession() as session:
-        try:
-            # 忽略 SSL 驗證問題
-            import ssl
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.get(url, timeout=20) as response:
-                    if response.status != 200:
-                        print(f'[CNA] 網頁載入失敗: {response.status}')
-                        return None
-                    html = await response.text()
-        except Exception as ex:
-            print(f'[CNA] 請求失敗: {ex}')
-            return None
+def parse_listing(source, html, url):
+    """依 NEWS_SOURCES[source] 的規格把列表頁解析成 (title, full_url) 列表"""
+    spec = NEWS_SOURCES[source]
+    tag = spec.get("tag", source.upper())
+    soup = parse_html(html)
 
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # CNA 的文章列表
-    articles = soup.find_all(['h2', 'div', 'a'], class_=lambda x: x and ('title' in x.lower() or 'mainList' in x))
-    
+    articles = _select_articles(soup, spec.get("selectors", []))
     if not articles:
-        articles = soup.select('a[href*="/news/"], div.listInfo a')
-    
-    if not articles:
-        print("[CNA] 找不到新聞標題")
+        print(f"[{tag}] 找不到新聞標題")
         return None
 
-    fallback_url = None
+    # 過濾非新聞連結
+    return [e for e in _extract_entries(articles, url) if _url_allowed(spec, e[1])]
 
-    for article in articles:
-        a_tag = article.find('a') if article.name != 'a' else article
-        if not a_tag:
-            continue
 
-        title = a_tag.get_text(strip=True)
-        href = a_tag.get('href', '').strip()
+def _url_allowed(spec, full_url, streaming=False):
+    """依規格的 path_filter / path_regex（串流時另看 stream_href）判斷是否為新聞連結"""
+    path_filter = spec.get("stream_href") if streaming else None
+    path_filter = path_filter or spec.get("path_filter")
+    if path_filter and not any(p in full_url for p in path_filter):
+        return False
+    path_regex = spec.get("path_regex")
+    if path_regex and not re.search(path_regex, full_url):
+        return False
+    return True
 
-        if not href or len(title) < 5:
-            continue
 
-        full_url = urljoin(url, href) if not href.startswith('http') else href
+def _can_stream(spec):
+    """串流模式沒有 DOM 可套 CSS 選擇器，必須靠網址規則辨識新聞連結"""
+    return bool(spec.get("stream_href") or spec.get("path_filter") or spec.get("path_regex"))
 
-        if fallback_url is None:
-            fallback_url = full_url
 
-        if is_health_related(title):
-            print(f"✅ [CNA] 命中健康新聞：{title}")
-            return full_url
-        else:
-            print(f"⏭️  [CNA] 跳過：{title}")
+_STREAM_FALLBACK = object()
 
-    print("⚠️ [CNA] 未找到健康相關新聞，使用第一篇")
-    return fallback_url
 
+async def _stream_listing_candidate(tag, source, url, client, skip=None):
+    """
+    串流模式：邊下載邊解析 <a>，找到健康新聞就停止讀取並關閉連線
+    全部讀完仍未命中時，回傳第一篇並把完整內容寫入條件式快取
+    Returns:
+        NewsCandidate、None，或 _STREAM_FALLBACK（需改用一般模式）
+    """
+    spec = NEWS_SOURCES[source]
 
-# ==================== 自由時報 LTN ====================
-async def ltn_fetch_url(url):
-    """抓取自由時報健康相關新聞"""
-    async with aiohttp.ClientSession() as session:
+    async with _client_scope(client) as client:
+        picker = _CandidatePicker(tag, source, client.seen, skip)
+        cache = client.cache
+        headers = cache.validators(url) if cache is not None else {}
+        await client.throttle(source)
         try:
-            async with session.get(url, timeout=20) as response:
+            async with client.get(url, source=source, headers=headers) as response:
+                if response.status == 304:
+                    cache_entry = cache.get(url)
+                    if cache_entry is not None and cache_entry.parsed is not None:
+                        print(f"♻️ [{tag}] 列表未變更 (304)，沿用快取解析結果")
+                        return _pick_candidate(tag, source, cache_entry.parsed, client.seen, skip)
+                    # 快取已淘汰：交給一般模式重抓
+                    return _STREAM_FALLBACK
                 if response.status != 200:
-                    print(f'[LTN] 網頁載入失敗: {response.status}')
+                    print(f'[{tag}] 網頁載入失敗: {response.status}')
                     return None
-                html = await response.text()
+
+                encoding = spec.get("encoding") or response.charset or "utf-8"
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                parser = AnchorStreamParser()
+                entries = []
+                body_parts = []
+                bytes_read = 0
+
+                def _offer_ready():
+                    for title, href in parser.drain():
+                        if not href or len(title) < 5:
+                            continue
+                        full_url = urljoin(url, href) if not href.startswith(('http://', 'https://')) else href
+                        if not _url_allowed(spec, full_url, streaming=True):
+                            continue
+                        entries.append((title, full_url))
+                        candidate = picker.offer(title, full_url)
+                        if candidate:
+                            return candidate
+                    return None
+
+                async for chunk in response.content.iter_chunked(16 * 1024):
+                    bytes_read += len(chunk)
+                    text = decoder.decode(chunk)
+                    body_parts.append(text)
+                    parser.feed(text)
+                    candidate = _offer_ready()
+                    if candidate:
+                        # 不再讀取剩餘內容，直接關閉這條連線
+                        response.close()
+                        print(f"⚡ [{tag}] 串流提前結束，只讀取 {bytes_read / 1024:.0f} KB")
+                        return candidate
+
+                tail = decoder.decode(b"", final=True)
+                body_parts.append(tail)
+                parser.feed(tail)
+                parser.close()
+                candidate = _offer_ready()
+                if candidate:
+                    return candidate
+
+                if cache is not None:
+                    cache.misses += 1
+                    cache_entry = cache.store(url, response.headers, "".join(body_parts))
+                    if cache_entry is not None:
+                        cache_entry.parsed = entries
         except Exception as ex:
-            print(f'[LTN] 請求失敗: {ex}')
+            print(f'[{tag}] 請求失敗: {ex}')
             return None
 
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # 自由時報的文章列表
-    articles = soup.find_all(['h3', 'h2', 'div'], class_=lambda x: x and ('title' in x.lower() or 'text' in x))
-    
-    if not articles:
-        articles = soup.select('a[href*="/article/"]')
-    
-    if not articles:
-        print("[LTN] 找不到新聞標題")
+    if not picker.offered:
+        print(f"[{tag}] 找不到新聞標題")
+    return picker.finish()
+
+
+async def fetch_source_candidate(source, url=None, client=None, stream=None, skip=None):
+    """
+    通用爬蟲引擎：下載 → 依規格選取 → 關鍵字過濾 → 備援第一篇
+    Args:
+        source: NEWS_SOURCES 的來源代碼
+        url: 列表頁網址（預設為規格中的 health_section）
+        stream: 是否使用串流提前結束模式（預設依 client.stream_listings 或規格中的 stream）
+        skip: skip(url) 為 True 的新聞不列入候選（client.seen 之外的額外條件）
+    Returns:
+        NewsCandidate 或 None
+    """
+    spec = NEWS_SOURCES[source]
+    tag = spec.get("tag", source.upper())
+    url = url or spec["health_section"]
+
+    if stream is None:
+        stream = spec.get("stream", getattr(client, "stream_listings", False))
+    if stream and _can_stream(spec):
+        candidate = await _stream_listing_candidate(tag, source, url, client, skip)
+        if candidate is not _STREAM_FALLBACK:
+            return candidate
+
+    entries = await _fetch_listing_entries(
+        tag, source, url, client, lambda html, page_url: parse_listing(source, html, page_url)
+    )
+    if entries is None:
         return None
+    return _pick_candidate(tag, source, entries, getattr(client, "seen", None), skip)
 
-    fallback_url = None
 
-    for article in articles:
-        a_tag = article.find('a') if article.name != 'a' else article
-        if not a_tag:
+async def fetch_listing_candidates(source, client=None, limit=None):
+    """
+    取得列表頁中所有未發過的健康新聞（批次預先生成用）
+    Args:
+        source: NEWS_SOURCES 的來源代碼
+        limit: 最多回傳幾則，None 表示不限
+    Returns:
+        依列表順序的 NewsCandidate 列表（只含命中健康關鍵字者）
+    """
+    spec = NEWS_SOURCES[source]
+    tag = spec.get("tag", source.upper())
+    url = spec["health_section"]
+
+    entries = await _fetch_listing_entries(
+        tag, source, url, client, lambda html, page_url: parse_listing(source, html, page_url)
+    )
+    seen = getattr(client, "seen", None)
+    candidates = []
+    for title, full_url in entries or []:
+        if seen is not None and full_url in seen:
             continue
+        if any(c.url == full_url for c in candidates):
+            continue
+        hits = match_keywords(title)
+        if hits:
+            score = len({keyword for keyword, _ in hits})
+            candidates.append(NewsCandidate(full_url, title, source, healthy=True, score=score))
+            if limit is not None and len(candidates) >= limit:
+                break
+    print(f"📋 [{tag}] 找到 {len(candidates)} 則未發過的健康新聞")
+    return candidates
+
+
+# 各來源的舊介面（保留相容性）
+async def setn_fetch_url(url, client=None, skip=None):
+    """抓取三立新聞網健康相關新聞"""
+    return _candidate_url(await fetch_source_candidate("setn", url, client=client, skip=skip))
 
-        title = a_tag.get_text(strip=True)
-        href = a_tag.get('href', '').strip()
 
-        if not href or len(title) < 5:
-            continue
+async def udn_fetch_url(url, client=None):
+    """抓取聯合新聞網健康相關新聞"""
+    return _candidate_url(await fetch_source_candidate("udn", url, client=client))
 
-        full_url = urljoin(url, href) if not href.startswith('http') else href
 
-        if fallback_url is None:
-            fallback_url = full_url
+async def cna_fetch_url(url, client=None):
+    """抓取中央社健康相關新聞"""
+    return _candidate_url(await fetch_source_candidate("cna", url, client=client))
 
-        if is_health_related(title):
-            print(f"✅ [LTN] 命中健康新聞：{title}")
-            return full_url
-        else:
-            print(f"⏭️  [LTN] 跳過：{title}")
 
-    print("⚠️ [LTN] 未找到健康相關新聞，使用第一篇")
-    return fallback_url
+async def ltn_fetch_url(url, client=None):
+    """抓取自由時報健康相關新聞"""
+    return _candidate_url(await fetch_source_candidate("ltn", url, client=client))
 
 
 # ==================== 統一介面：根據來源選擇爬蟲 ====================
-async def fetch_news_url(source="setn"):
+async def fetch_news_url(source="setn", client=None):
     """
     統一的新聞抓取介面
     Args:
-        source: 新聞來源代碼 (setn/udn/cna/ltn)
+        source: 新聞來源代碼（NEWS_SOURCES 的任一鍵）
+        client: 共用的 SpiderClient（省略則使用一次性連線）
     Returns:
         新聞URL或None
     """
+    return _candidate_url(await fetch_news_candidate(source, client=client))
+
+
+async def fetch_news_candidate(source="setn", client=None):
+    """
+    同 fetch_news_url，但回傳 NewsCandidate（含標題、是否命中健康關鍵字、耗時）
+    """
     if source not in NEWS_SOURCES:
         print(f"⚠️ 不支援的新聞來源: {source}")
         return None
     
     source_config = NEWS_SOURCES[source]
     url = source_config["health_section"]
-    
     print(f"\n📰 抓取 {source_config['name']} 新聞...")
-    
-    if source == "setn":
-        return await setn_fetch_url(url)
-    elif source == "udn":
-        return await udn_fetch_url(url)
-    elif source == "cna":
-        return await cna_fetch_url(url)
-    elif source == "ltn":
-        return await ltn_fetch_url(url)
-    else:
-        return None
+
+    started = time.monotonic()
+    candidate = await fetch_source_candidate(source, url, client=client)
+    if candidate:
+        candidate.elapsed = time.monotonic() - started
+    return candidate
 
 
 # ==================== 輪詢多個來源 ====================
-async def fetch_news_from_multiple_sources(sources=None):
+async def fetch_news_from_multiple_sources(sources=None, client=None, concurrent=False, deadline=30.0):
     """
     從多個新聞來源輪詢抓取
     Args:
         sources: 新聞來源列表，預設為所有來源
+        client: 共用的 SpiderClient（省略則本次輪詢內共用一個臨時連線池）
+        concurrent: True 時同時抓取所有來源，取第一個命中健康新聞的結果
+        deadline: concurrent 模式的整體時限（秒）
     Returns:
         (news_url, source_name) 或 (None, None)
     """
     if sources is None:
         sources = list(NEWS_SOURCES.keys())
     
-    import random
     random.shuffle(sources)  # 隨機順序避免總是同一家
+
+    if concurrent:
+        candidates = await fetch_news_candidates(sources, client=client, deadline=deadline)
+        if candidates:
+            best = candidates[0]
+            return best.url, NEWS_SOURCES[best.source]["name"]
+        return None, None
     
-    for source in sources:
+    async with _client_scope(client) as client:
+        for source in sources:
+            try:
+                news_url = await fetch_news_url(source, client=client)
+                if news_url:
+                    return news_url, NEWS_SOURCES[source]["name"]
+            except Exception as e:
+                print(f"⚠️ {NEWS_SOURCES[source]['name']} 抓取失敗: {e}")
+                continue
+
+    return None, None
+
+
+async def fetch_news_candidates(sources=None, client=None, deadline=30.0, first_healthy=True):
+    """
+    同時向所有來源發出請求（asyncio fan-out）
+    Args:
+        sources: 新聞來源列表，預設為所有來源
+        client: 共用的 SpiderClient
+        deadline: 整體時限（秒），逾時尚未完成的來源會被取消；None 表示不限
+        first_healthy: True 時一拿到命中健康關鍵字的結果就取消其餘請求；
+                       False 時等待全部來源（或時限到）後回傳所有候選
+    Returns:
+        依 (是否命中健康關鍵字, 分數, 到達順序) 排序的 NewsCandidate 列表
+    """
+    if sources is None:
+        sources = list(NEWS_SOURCES.keys())
+
+    candidates = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async with _client_scope(client) as client:
+        tasks = {
+            asyncio.create_task(fetch_news_candidate(source, client=client)): source
+            for source in sources
+        }
+        pending = set(tasks)
         try:
-            news_url = await fetch_news_url(source)
-            if news_url:
-                return news_url, NEWS_SOURCES[source]["name"]
-        except Exception as e:
-            print(f"⚠️ {NEWS_SOURCES[source]['name']} 抓取失敗: {e}")
-            continue
-    
-    return None, None
\ No newline at end of file
+            while pending:
+                remaining = None if deadline is None else deadline - (loop.time() - started)
+                if remaining is not None and remaining <= 0:
+                    names = ", ".join(NEWS_SOURCES[tasks[t]]["name"] for t in pending)
+                    print(f"⏱ 超過 {deadline:.0f} 秒時限，取消未完成的來源: {names}")
+                    break
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        candidate = task.result()
+                    except Exception as e:
+                        print(f"⚠️ {NEWS_SOURCES[tasks[task]]['name']} 抓取失敗: {e}")
+                        continue
+                    if candidate:
+                        candidates.append(candidate)
+
+                if first_healthy and any(c.healthy for c in candidates):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    # sort 為穩定排序，同分時保留到達順序
+    candidates.sort(key=lambda c: (c.healthy, c.score), reverse=True)
+    return candidates
@@ -0,0 +1,152 @@
+"""
+爬蟲共用的 HTTP 用戶端：整個輪詢週期共用同一個 aiohttp 連線池
+（keep-alive、每個主機的連線上限、DNS 快取、依來源設定 SSL 驗證）
+"""
+import asyncio
+import ssl
+import time
+
+import aiohttp
+
+
+class SpiderClient:
+    """長駐的爬蟲 HTTP 用戶端
+
+    Args:
+        limit: 連線池總連線數上限
+        limit_per_host: 每個主機的連線數上限
+        ttl_dns_cache: DNS 快取秒數
+        keepalive_timeout: 閒置連線保留秒數
+        timeout: 單次請求逾時秒數
+        ssl_policy: {來源代碼: 是否驗證 SSL}，未列出的來源預設驗證
+        cache: HttpCache，提供時 get_conditional 會送出條件式請求
+        rate_limits: {來源代碼: 兩次請求的最短間隔秒數}
+        stream_listings: 列表頁預設使用串流提前結束模式
+        seen: SeenStore，挑選新聞時略過已發過的網址
+    """
+
+    def __init__(self, *, limit=20, limit_per_host=4, ttl_dns_cache=300,
+                 keepalive_timeout=60, timeout=20, ssl_policy=None, cache=None,
+                 rate_limits=None, stream_listings=False, seen=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.ssl_policy = dict(ssl_policy or {})
+        self.cache = cache
+        self.rate_limits = dict(rate_limits or {})
+        self.stream_listings = stream_listings
+        self.seen = seen
+        # 本輪已解析的文章（fetch_article 使用），new_cycle() 時清除
+        self.article_memo = {}
+        self._last_request = {}
+        self._throttle_locks = {}
+        self._session = None
+        self._insecure_ctx = None
+
+    # ---------- 生命週期 ----------
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """延遲建立 session（必須在 event loop 內呼叫）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        self.session
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def new_cycle(self):
+        """開始新的輪詢週期：清除只在單輪內有效的記憶"""
+        self.article_memo.clear()
+
+    # ---------- SSL 政策 ----------
+    def ssl_for(self, source=None):
+        """回傳該來源請求要用的 ssl 參數（None 代表使用預設驗證）"""
+        if source is None or self.ssl_policy.get(source, True):
+            return None
+        if self._insecure_ctx is None:
+            # 部分站台（如中央社）憑證鏈不完整，僅針對指定來源關閉驗證
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            self._insecure_ctx = ctx
+        return self._insecure_ctx
+
+    # ---------- 請求間隔 ----------
+    async def throttle(self, source=None):
+        """同一來源的請求至少間隔 rate_limits[source] 秒"""
+        interval = self.rate_limits.get(source) if source else None
+        if not interval:
+            return
+        lock = self._throttle_locks.setdefault(source, asyncio.Lock())
+        async with lock:
+            wait = self._last_request.get(source, 0) + interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request[source] = time.monotonic()
+
+    # ---------- 請求 ----------
+    def get(self, url, source=None, **kwargs):
+        """回傳 session.get(...) 的 context manager，自動套用來源的 SSL 政策"""
+        ssl_arg = self.ssl_for(source)
+        if ssl_arg is not None:
+            kwargs.setdefault("ssl", ssl_arg)
+        return self.session.get(url, **kwargs)
+
+    async def get_text(self, url, source=None, encoding=None, **kwargs):
+        """GET 並回傳 (status, text)；非 200 時 text 為 None"""
+        await self.throttle(source)
+        async with self.get(url, source=source, **kwargs) as response:
+            if response.status != 200:
+                return response.status, None
+            return response.status, await response.text(encoding=encoding)
+
+    async def get_conditional(self, url, source=None, encoding=None, **kwargs):
+        """條件式 GET（If-None-Match / If-Modified-Since）
+
+        Returns:
+            (status, text, entry)：304 時 text 為快取內容、entry 為 CacheEntry；
+            非 200/304 時 text 為 None；未設定快取時 entry 為 None
+        """
+        if self.cache is None:
+            status, text = await self.get_text(url, source=source, encoding=encoding, **kwargs)
+            return status, text, None
+
+        await self.throttle(source)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(self.cache.validators(url))
+        async with self.get(url, source=source, headers=headers, **kwargs) as response:
+            if response.status == 304:
+                entry = self.cache.get(url)
+                if entry is not None and entry.body is not None:
+                    self.cache.hits += 1
+                    return 304, entry.body, entry
+            elif response.status != 200:
+                return response.status, None, None
+            else:
+                text = await response.text(encoding=encoding)
+                self.cache.misses += 1
+                return 200, text, self.cache.store(url, response.headers, text)
+
+        # 收到 304 但快取已被淘汰：改用一般請求重抓
+        status, text = await self.get_text(url, source=source, encoding=encoding, **kwargs)
+        if text is not None:
+            self.cache.misses += 1
+        return status, text, None
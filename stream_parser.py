@@ -0,0 +1,59 @@
+"""
+串流式列表頁解析：邊下載邊解析，每個 <a> 結束時就吐出 (title, href)
+
+以標準庫 html.parser 的增量 feed() 實作，不建立 DOM，
+讓爬蟲找到符合條件的新聞後即可停止讀取回應內容。
+"""
+from html.parser import HTMLParser
+
+
+class AnchorStreamParser(HTMLParser):
+    """逐塊餵入 HTML，收集已關閉的 <a> 標籤"""
+
+    _SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._href = None
+        self._parts = []
+        self._skip_depth = 0
+        self._ready = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if tag == "a":
+            # HTML 不允許巢狀 <a>，遇到新的 <a> 視同前一個已結束
+            self._flush()
+            self._href = dict(attrs).get("href") or ""
+            self._parts = []
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag == "a":
+            self._flush()
+
+    def handle_data(self, data):
+        if self._href is not None and not self._skip_depth:
+            # 與 BeautifulSoup get_text(strip=True) 相同：逐段 strip 後直接串接
+            stripped = data.strip()
+            if stripped:
+                self._parts.append(stripped)
+
+    def _flush(self):
+        if self._href is not None:
+            self._ready.append(("".join(self._parts), self._href.strip()))
+        self._href = None
+        self._parts = []
+
+    def drain(self):
+        """取出目前已完整解析的 (title, href)"""
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self):
+        super().close()
+        self._flush()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+測試各 HTML 解析後端的 parse_article 結果一致（不需網路）
+
+    python -m pytest -q test_html_backend.py
+"""
+import html_backend
+from spider import parse_article
+
+PAGE = """<html><head>
+<title>測試標題</title>
+<style>body{margin:0}</style>
+<script>window.dataLayer = [];</script>
+</head><body>
+<article>第一段 <script>googletag.cmd.push(function(){});</script>醫師說明<style>.x{color:red}</style>
+<noscript>請開啟 JavaScript</noscript><template>範本</template>第二段
+x</article>
+</body></html>"""
+
+
+def test_backends_extract_same_article_text():
+    original = html_backend.get_default_backend()
+    texts = {}
+    try:
+        for backend in html_backend.available_backends():
+            html_backend.set_default_backend(backend)
+            texts[backend] = parse_article(PAGE, "https://example.com/news/1").text
+    finally:
+        html_backend.set_default_backend(original)
+
+    print(texts)
+    assert len(set(texts.values())) == 1, texts
+    text = texts["html.parser"]
+    assert "醫師說明" in text and "第二段" in text
+    for leaked in ("googletag", "color:red", "JavaScript", "範本"):
+        assert leaked not in text
+
+
+
+def test_group_selector_returns_each_element_once():
+    page = '<div class="n"><h3 class="v"><a href="/news/1">一</a></h3></div><h3 class="v"><a href="/news/2">二</a></h3>'
+    for backend in html_backend.available_backends():
+        soup = html_backend.parse_html(page, backend)
+        assert [a.get("href") for a in soup.select("div.n a, h3.v a")] == ["/news/1", "/news/2"], backend
+
+
+if __name__ == "__main__":
+    test_backends_extract_same_article_text()
+    test_group_selector_returns_each_element_once()
+    print("✅ 各後端解析結果一致")
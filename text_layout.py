@@ -0,0 +1,193 @@
+"""
+標題排版：依實際字寬換行
+
+- 每個字體/字級的字元寬度 (advance) 只量一次，之後查表加總
+- 以動態規劃做最小參差 (minimum raggedness) 換行：各行剩餘寬度平方和加上斷點懲罰最小；
+  標點後換行沒有懲罰，空白處次之，中文字之間再次之，拆開數字與單位（如「65歲」）最不願意
+- 避頭尾：句末標點不放在行首、開括號不放在行尾；英數單字不拆開（除非單字本身比一行還寬）
+- 超過行數上限時自動縮小字級
+- 不需要畫布即可試排（dry-run），例如在生成標題後先檢查能否放進圖片
+"""
+import re
+from dataclasses import dataclass, field
+
+# 不可放在行首的標點（附著在前一個字）
+_CLOSING = set("，。、：；！？）」』】》〉,.:;!?)]}%…")
+# 不可放在行尾的符號（附著在後一個字）
+_OPENING = set("（「『【《〈([{")
+# 在這些標點之後換行最自然
+_BREAK_AFTER = set("，。、：；！？,:;!?")
+# 換行時刪除行尾的這些標點
+_DROP_AT_END = set("，、,")
+# 英數單字視為一個單位；空白與其他字元各自一個單位
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9.%+\-'/]*|\s+|.", re.S)
+
+
+class GlyphMetrics:
+    """單一字體（含字級）的字元寬度快取"""
+
+    def __init__(self, font):
+        self.font = font
+        self._widths = {}
+
+    def char_width(self, char):
+        width = self._widths.get(char)
+        if width is None:
+            width = self.font.getlength(char)
+            self._widths[char] = width
+        return width
+
+    def width(self, text):
+        return sum(self.char_width(c) for c in text)
+
+
+_metrics = {}
+
+
+def metrics_for(font):
+    """取得字體的 GlyphMetrics（同一字體檔、同字級共用）"""
+    path = getattr(font, "path", None)
+    key = (path, getattr(font, "size", None)) if path else id(font)
+    metrics = _metrics.get(key)
+    if metrics is None or (not path and metrics.font is not font):
+        metrics = GlyphMetrics(font)
+        _metrics[key] = metrics
+    return metrics
+
+
+@dataclass
+class Layout:
+    """排版結果"""
+    lines: list
+    widths: list = field(default_factory=list)  # 各行寬度（px）
+    font_size: int = 0
+    line_height: int = 0
+    fits: bool = True  # False 代表已縮到最小字級仍超過行數，lines 已截斷
+
+    @property
+    def height(self):
+        return len(self.lines) * self.line_height
+
+
+def _clean_line(text):
+    text = text.strip()
+    if text and text[-1] in _DROP_AT_END:
+        text = text[:-1]
+    return text
+
+
+def _tokens(paragraph, metrics, max_width):
+    """拆成不可再分的排版單位，並套用避頭尾規則"""
+    raw = []
+    for token in _TOKEN.findall(paragraph):
+        # 比一行還寬的英數單字只好逐字拆開
+        if len(token) > 1 and not token.isspace() and metrics.width(token) > max_width:
+            raw.extend(token)
+        else:
+            raw.append(token)
+
+    tokens = []
+    carry = ""
+    for token in raw:
+        if token in _OPENING:
+            carry += token
+            continue
+        token = carry + token
+        carry = ""
+        if tokens and token[0] in _CLOSING and not tokens[-1].isspace():
+            tokens[-1] += token
+        else:
+            tokens.append(token)
+    if carry:
+        tokens.append(carry)
+    return tokens
+
+
+def _is_alnum(token):
+    return token[:1].isascii() and token[:1].isalnum() or token[-1:].isascii() and token[-1:].isalnum()
+
+
+def _break_cost(before, after, penalty):
+    """在 before 與 after 兩個單位之間換行的懲罰"""
+    if before.rstrip()[-1:] in _BREAK_AFTER:
+        return 0
+    if before.isspace() or after.isspace():
+        return penalty / 2
+    if _is_alnum(before) or _is_alnum(after):
+        return penalty * 2
+    return penalty
+
+
+def _break_paragraph(paragraph, metrics, max_width, break_penalty):
+    tokens = _tokens(paragraph, metrics, max_width)
+    n = len(tokens)
+    if n == 0:
+        return []
+
+    INF = float("inf")
+    best = [0.0] + [INF] * n
+    start_of = [0] * (n + 1)
+    for j in range(1, n + 1):
+        for i in range(j - 1, -1, -1):
+            if best[i] == INF:
+                continue
+            line = _clean_line("".join(tokens[i:j]))
+            width = metrics.width(line)
+            if width > max_width and j - i > 1:
+                break  # 再往前加只會更寬
+            slack = max(0.0, max_width - width)
+            penalty = 0 if j == n else _break_cost(tokens[j - 1], tokens[j], break_penalty)
+            cost = best[i] + slack * slack + penalty
+            if cost < best[j]:
+                best[j] = cost
+                start_of[j] = i
+
+    lines = []
+    j = n
+    while j > 0:
+        i = start_of[j]
+        line = _clean_line("".join(tokens[i:j]))
+        if line:
+            lines.append(line)
+        j = i
+    lines.reverse()
+    return lines
+
+
+def break_lines(text, font, max_width):
+    """依實際字寬換行（保留原本的換行符），回傳各行文字"""
+    metrics = metrics_for(font)
+    break_penalty = (0.35 * max_width) ** 2
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(_break_paragraph(paragraph, metrics, max_width, break_penalty))
+    return lines
+
+
+def fit_text(text, font_for_size, max_width, font_size=85, min_font_size=48, max_lines=8,
+             step=4, line_spacing=100 / 85):
+    """
+    在寬度與行數限制內排版，需要時逐步縮小字級
+    Args:
+        font_for_size: 字級 -> 字體物件 的函式（例如 image_renderer.get_font）
+        max_width: 每行可用寬度（px）
+        line_spacing: 行高 / 字級
+    Returns:
+        Layout（縮到 min_font_size 仍放不下時 fits=False，行數截斷為 max_lines）
+    """
+    size = font_size
+    while True:
+        font = font_for_size(size)
+        lines = break_lines(text, font, max_width)
+        if len(lines) <= max_lines or size <= min_font_size:
+            metrics = metrics_for(font)
+            fits = len(lines) <= max_lines
+            lines = lines[:max_lines]
+            return Layout(
+                lines=lines,
+                widths=[metrics.width(line) for line in lines],
+                font_size=size,
+                line_height=round(size * line_spacing),
+                fits=fits,
+            )
+        size = max(min_font_size, size - step)